@@ -0,0 +1,168 @@
+"""
+Care activity history for FloraFind
+care_activities grows by a row per completed task. Charts and totals read
+user_activity_daily instead: tasks and points per user, day and task type,
+bumped in the same transaction as each care_activities insert, so a year of
+history is at most a few hundred rows on the table's primary key. The current
+streak is the one user_stats.py keeps (O(1) per task); its rebuild and the
+badge backfill read the daily rollup too.
+
+The care_activities_compact job deletes raw rows older than
+ACTIVITY_RAW_RETENTION_DAYS that carry nothing the rollup lacks (no notes or
+photo), in primary-key chunks, never touching the days a running challenge
+still scores.
+
+    python jobs.py run care_activities_compact
+"""
+
+import datetime
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import config
+import db
+import jobs
+import user_stats
+from structured_logging import get_logger
+
+logger = get_logger('activity')
+
+COMPACT_JOB = 'care_activities_compact'
+COMPACT_CHUNK = 5000
+
+# /activity ranges: days covered and the bucket size of the series
+RANGES = {
+    'week': (7, 'day'),
+    'month': (30, 'day'),
+    'quarter': (91, 'week'),
+    'year': (365, 'month'),
+}
+DEFAULT_RANGE = 'week'
+
+# The rollup belongs to the plant's owner, whoever made the request
+RECORD_ACTIVITY = """
+    INSERT INTO user_activity_daily (user_id, activity_date, task_type, tasks, points)
+    SELECT user_id, %s, %s, 1, %s FROM user_plants WHERE user_plant_id = %s
+    ON DUPLICATE KEY UPDATE tasks = tasks + 1, points = points + VALUES(points)
+"""
+DAILY_ACTIVITY = """
+    SELECT activity_date, task_type, tasks, points FROM user_activity_daily
+    WHERE user_id = %s AND activity_date >= %s
+    ORDER BY activity_date
+"""
+
+
+def record(cursor, user_plant_id: int, task_type: str, day: datetime.date, points: int):
+    """Count a completed care task in its owner's daily rollup (the caller commits with the care_activities row)"""
+    cursor.execute(RECORD_ACTIVITY, (day, task_type, points, user_plant_id))
+
+
+# Charts
+
+def bucket_start(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start: datetime.date, granularity: str) -> datetime.date:
+    if granularity == 'week':
+        return start + datetime.timedelta(days=7)
+    if granularity == 'month':
+        return (start + datetime.timedelta(days=31)).replace(day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def series(rows: List[Tuple[datetime.date, str, int, int]], since: datetime.date, until: datetime.date,
+           granularity: str) -> List[Dict]:
+    """Buckets from `since` to `until` (empty ones included) summing (day, task_type, tasks, points) rows"""
+    buckets: Dict[datetime.date, Dict] = {}
+    start = bucket_start(since, granularity)
+    while start <= until:
+        buckets[start] = {"start": str(start), "tasks": 0, "points": 0, "by_task": Counter()}
+        start = _next_bucket(start, granularity)
+    for day, task_type, tasks, points in rows:
+        bucket = buckets.get(bucket_start(day, granularity))
+        if bucket is None:
+            continue
+        bucket["tasks"] += tasks
+        bucket["points"] += points
+        bucket["by_task"][task_type] += tasks
+    return [dict(bucket, by_task=dict(bucket["by_task"])) for bucket in buckets.values()]
+
+
+def history(user_id: int, range_name: str = DEFAULT_RANGE, today: Optional[datetime.date] = None) -> Dict:
+    """The user's care activity over `range_name` from the daily rollup, with points this month and the streak"""
+    today = today or datetime.date.today()
+    days, granularity = RANGES[range_name]
+    since = bucket_start(today - datetime.timedelta(days=days - 1), granularity)
+    month_start = today.replace(day=1)
+
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(DAILY_ACTIVITY, (user_id, min(since, month_start)))
+        rows = [(user_stats._as_date(row['activity_date']), row['task_type'], int(row['tasks']), int(row['points']))
+                for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+    in_range = [row for row in rows if row[0] >= since]
+    by_task = Counter()
+    for _, task_type, tasks, _ in in_range:
+        by_task[task_type] += tasks
+    stats = user_stats.get(user_id)
+    return {
+        "user_id": user_id,
+        "range": range_name,
+        "granularity": granularity,
+        "since": str(since),
+        "until": str(today),
+        "series": series(in_range, since, today, granularity),
+        "totals": {"tasks": sum(row[2] for row in in_range), "points": sum(row[3] for row in in_range),
+                   "by_task": dict(by_task)},
+        "points_this_month": sum(row[3] for row in rows if row[0] >= month_start),
+        "streak": {"current": stats.current_streak(today),
+                   "last_activity": str(stats.last_activity) if stats.last_activity else None},
+    }
+
+
+# Retention
+
+@jobs.register(COMPACT_JOB, interval_seconds=24 * 3600)
+def compact_care_activities(today: Optional[datetime.date] = None) -> Dict:
+    """Delete raw care_activities rows past retention that the daily rollup fully covers"""
+    today = today or datetime.date.today()
+    cutoff = today - datetime.timedelta(days=config.ACTIVITY_RAW_RETENTION_DAYS)
+
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    deleted = 0
+    try:
+        # Challenge scoring reads raw rows from each running challenge's start
+        cursor.execute("SELECT MIN(start_date) AS first_start FROM plant_challenges WHERE is_active AND end_date >= %s",
+                       (cutoff,))
+        row = cursor.fetchone()
+        if row and row['first_start'] is not None:
+            cutoff = min(cutoff, user_stats._as_date(row['first_start']))
+        cursor.execute("""SELECT MIN(activity_id) AS first_id, MAX(activity_id) AS last_id FROM care_activities
+                          WHERE completed_date < %s""", (cutoff,))
+        bounds = cursor.fetchone()
+        conn.commit()
+        if bounds and bounds['last_id'] is not None:
+            # Delete by primary-key range in chunks to keep each transaction and its locks short
+            for start in range(bounds['first_id'], bounds['last_id'] + 1, COMPACT_CHUNK):
+                cursor.execute("""DELETE FROM care_activities
+                                  WHERE activity_id >= %s AND activity_id < %s AND completed_date < %s
+                                    AND notes IS NULL AND photo_url IS NULL""",
+                               (start, start + COMPACT_CHUNK, cutoff))
+                deleted += cursor.rowcount
+                conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    logger.info("care_activities_compacted", cutoff=str(cutoff), deleted=deleted)
+    return {'cutoff': str(cutoff), 'deleted_rows': deleted}
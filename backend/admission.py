@@ -0,0 +1,303 @@
+"""
+Admission control for FloraFind
+Routes are grouped into classes (search, bulk, default). Each class has token
+buckets, one per user and one global, plus its own concurrency limit with a
+short bounded wait queue. A request over its rate is refused with 429. When
+the queue is full or the wait runs out, the request is refused with 503. Both
+carry Retry-After, so a burst of searches cannot take every worker thread
+from /complete_care_task and /my_garden. Search requests admitted while the
+search class is saturated run degraded: cached results if there are any,
+otherwise results without the per-plant metadata.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import config
+import metrics
+
+# Routes outside admission control: health checks and scraping must work under load
+EXEMPT_ROUTES = {'/', '/metrics'}
+ROUTE_CLASSES = {
+    '/query': 'search',
+    '/garden/import': 'bulk',
+    '/garden/export': 'bulk',
+}
+DEFAULT_CLASS = 'default'
+
+ADMISSION_REJECTED = metrics.Counter('florafind_admission_rejected_total', 'Requests refused by admission control by class and reason')
+ADMISSION_DEGRADED = metrics.Counter('florafind_admission_degraded_total', 'Requests admitted in degraded mode by class')
+
+
+class Rejected(Exception):
+    """The request is refused: 429 when over its rate, 503 when the route class is saturated"""
+
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token; returns 0 on success, else the seconds until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class BucketTable:
+    """One TokenBucket per key, keeping the `max_keys` most recently used"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> float:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+        return bucket.take()
+
+
+class ConcurrencyGate:
+    """At most `limit` requests in flight; up to `max_queue` more wait, first come first served"""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float) -> bool:
+        """Take a slot; returns whether the request had to wait. Raises Rejected."""
+        with self._condition:
+            if self.in_flight < self.limit and not self.waiting:
+                self.in_flight += 1
+                return False
+            if self.waiting >= self.max_queue:
+                raise Rejected(503, 'queue_full', timeout)
+            self.waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self.in_flight < self.limit, timeout):
+                    raise Rejected(503, 'queue_timeout', timeout)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+
+class AsyncConcurrencyGate:
+    """ConcurrencyGate for one event loop: a released slot is handed straight to the oldest waiter"""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._waiters = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return False
+        if len(self._waiters) >= self.max_queue:
+            raise Rejected(503, 'queue_full', timeout)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot arrived as we gave up
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                raise Rejected(503, 'queue_timeout', timeout) from None
+            raise
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+@dataclass
+class RouteClass:
+    name: str
+    max_concurrent: int
+    max_queue: int
+    queue_timeout: float
+    user_rate: float = 0.0     # requests/second per user; 0 = unlimited
+    user_burst: float = 0.0
+    global_rate: float = 0.0   # requests/second across all users in this worker; 0 = unlimited
+    global_burst: float = 0.0
+    degrade_at: int = 0        # in-flight requests at which admitted requests run degraded; 0 = never
+
+
+class Ticket:
+    """An admitted request; release() frees its slot (idempotent)"""
+
+    def __init__(self, route_class: RouteClass, gate, degraded: bool):
+        self.route_class = route_class
+        self.degraded = degraded
+        self._gate = gate
+
+    def release(self):
+        gate, self._gate = self._gate, None
+        if gate is not None:
+            gate.release()
+
+
+class AdmissionController:
+    def __init__(self, classes: Dict[str, RouteClass], route_classes: Dict[str, str] = None):
+        self.classes = classes
+        self.route_classes = dict(ROUTE_CLASSES if route_classes is None else route_classes)
+        self._user_buckets = {
+            name: BucketTable(c.user_rate, c.user_burst or c.user_rate, config.ADMISSION_MAX_TRACKED_USERS)
+            for name, c in classes.items() if c.user_rate > 0
+        }
+        self._global_buckets = {
+            name: TokenBucket(c.global_rate, c.global_burst or c.global_rate)
+            for name, c in classes.items() if c.global_rate > 0
+        }
+        self._gates = {name: ConcurrencyGate(c.max_concurrent, c.max_queue) for name, c in classes.items()}
+        self._async_gates = {name: AsyncConcurrencyGate(c.max_concurrent, c.max_queue) for name, c in classes.items()}
+
+    def classify(self, rule: Optional[str]) -> Optional[RouteClass]:
+        """The class a route belongs to, or None when it is not admission-controlled"""
+        if rule is None or rule in EXEMPT_ROUTES:
+            return None
+        return self.classes[self.route_classes.get(rule, DEFAULT_CLASS)]
+
+    def _check_rate(self, route_class: RouteClass, user_key: Optional[str]):
+        buckets = self._user_buckets.get(route_class.name)
+        if buckets is not None and user_key:
+            wait = buckets.take(user_key)
+            if wait:
+                raise Rejected(429, 'user_rate', wait)
+        bucket = self._global_buckets.get(route_class.name)
+        if bucket is not None:
+            wait = bucket.take()
+            if wait:
+                raise Rejected(429, 'global_rate', wait)
+
+    def _ticket(self, route_class: RouteClass, gate, waited: bool) -> Ticket:
+        degraded = bool(route_class.degrade_at) and (waited or gate.in_flight >= route_class.degrade_at)
+        if degraded:
+            ADMISSION_DEGRADED.inc(route_class=route_class.name)
+        return Ticket(route_class, gate, degraded)
+
+    def admit(self, rule: Optional[str], user_key: Optional[str] = None) -> Optional[Ticket]:
+        """Admit a request from a worker thread (blocks for a slot up to the class's queue timeout)"""
+        route_class = self.classify(rule)
+        if route_class is None:
+            return None
+        try:
+            self._check_rate(route_class, user_key)
+            gate = self._gates[route_class.name]
+            waited = gate.acquire(route_class.queue_timeout)
+        except Rejected as e:
+            ADMISSION_REJECTED.inc(route_class=route_class.name, reason=e.reason)
+            raise
+        return self._ticket(route_class, gate, waited)
+
+    async def admit_async(self, rule: Optional[str], user_key: Optional[str] = None) -> Optional[Ticket]:
+        """admit() for the event loop"""
+        route_class = self.classify(rule)
+        if route_class is None:
+            return None
+        try:
+            self._check_rate(route_class, user_key)
+            gate = self._async_gates[route_class.name]
+            waited = await gate.acquire(route_class.queue_timeout)
+        except Rejected as e:
+            ADMISSION_REJECTED.inc(route_class=route_class.name, reason=e.reason)
+            raise
+        return self._ticket(route_class, gate, waited)
+
+    def stats(self) -> Dict[tuple, float]:
+        samples = {}
+        for name in self.classes:
+            for mode, gate in (('sync', self._gates[name]), ('async', self._async_gates[name])):
+                samples[(('mode', mode), ('route_class', name), ('state', 'in_flight'))] = gate.in_flight
+                samples[(('mode', mode), ('route_class', name), ('state', 'waiting'))] = gate.waiting
+        return samples
+
+
+def default_classes() -> Dict[str, RouteClass]:
+    return {
+        'search': RouteClass(
+            'search', config.ADMISSION_SEARCH_CONCURRENCY, config.ADMISSION_SEARCH_QUEUE, config.ADMISSION_QUEUE_TIMEOUT,
+            user_rate=config.ADMISSION_SEARCH_USER_RATE, user_burst=config.ADMISSION_SEARCH_USER_BURST,
+            global_rate=config.ADMISSION_SEARCH_GLOBAL_RATE, global_burst=config.ADMISSION_SEARCH_GLOBAL_BURST,
+            degrade_at=config.ADMISSION_SEARCH_DEGRADE_AT or config.ADMISSION_SEARCH_CONCURRENCY),
+        'bulk': RouteClass(
+            'bulk', config.ADMISSION_BULK_CONCURRENCY, config.ADMISSION_BULK_QUEUE, config.ADMISSION_QUEUE_TIMEOUT,
+            user_rate=config.ADMISSION_BULK_USER_RATE, user_burst=config.ADMISSION_BULK_USER_BURST),
+        DEFAULT_CLASS: RouteClass(
+            DEFAULT_CLASS, config.ADMISSION_DEFAULT_CONCURRENCY, config.ADMISSION_DEFAULT_QUEUE, config.ADMISSION_QUEUE_TIMEOUT),
+    }
+
+
+_controller: Optional[AdmissionController] = None
+_lock = threading.Lock()
+
+
+def get_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        with _lock:
+            if _controller is None:
+                _controller = AdmissionController(default_classes())
+    return _controller
+
+
+def user_key(args, remote_addr: Optional[str]) -> str:
+    """Who a request counts against: its explicit user_id, else the client address"""
+    user_id = args.get('user_id')
+    return f'user:{user_id}' if user_id else f'addr:{remote_addr}'
+
+
+metrics.Gauge('florafind_admission_requests', 'Admitted and queued requests by route class',
+              callback=lambda: get_controller().stats() if _controller is not None else {})
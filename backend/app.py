@@ -1,120 +1,199 @@
-from flask import Flask, request, jsonify
+import startup  # first, so the startup report covers the remaining imports
+from flask import Flask, request, jsonify, g, Response, stream_with_context
 from flask_cors import CORS
 import db
 import datetime
+import time
 from datetime import timedelta
-from nlp_search import search_plants_nlp
+from nlp_search import search_plants_nlp, search_cursor_scope, SEARCH_CURSOR_LENGTH
 import mysql.connector
+import activity
+import admission
+import badges
+import care_schedule
+import care_tips
+import catalog
+import challenges
+import config
+import garden_io
+import http_cache
+import metrics
+import pagination
+import plant_health
+import queries
+import recommendations
+import search_analytics
+import similar_plants
+import suggestions
+import tips
+import user_stats
+from structured_logging import get_logger
+
+startup.record_phase('app_imports', time.perf_counter() - startup.PROCESS_STARTED)
 
 app = Flask(__name__)
 CORS(app)
+logger = get_logger('app')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def admit_request():
+    """Admission control: refuse (429/503) or admit, possibly degraded, before the route runs"""
+    if not config.ADMISSION_ENABLED:
+        return None
+    rule = request.url_rule.rule if request.url_rule else None
+    try:
+        g.admission = admission.get_controller().admit(rule, admission.user_key(request.args, request.remote_addr))
+    except admission.Rejected as e:
+        return admission_rejected(e)
+    return None
+
+def admission_rejected(rejection):
+    logger.warning("request_rejected", path=request.path, status=rejection.status, reason=rejection.reason)
+    message = "Too many requests" if rejection.status == 429 else "Server busy"
+    response = jsonify({"error": f"{message}, please retry shortly", "reason": rejection.reason,
+                        "retry_after": rejection.retry_after})
+    response.status_code = rejection.status
+    response.headers['Retry-After'] = str(rejection.retry_after)
+    return response
+
+@app.teardown_request
+def release_admission(exc):
+    ticket = g.pop('admission', None)
+    if ticket is not None:
+        ticket.release()
+
+def request_degraded():
+    """True when admission control admitted this request in degraded mode"""
+    ticket = g.get('admission')
+    return bool(ticket and ticket.degraded)
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if config.METRICS_ENABLED:
+        metrics.REQUEST_LATENCY.observe(elapsed, route=route, method=request.method)
+        metrics.REQUEST_COUNT.inc(route=route, method=request.method, status=response.status_code)
+    if config.SERVER_TIMING_ENABLED:
+        header = metrics.server_timing_header(elapsed)
+        if header:
+            response.headers['Server-Timing'] = header
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/", methods=["GET"])
+@http_cache.cached('home')
 def home():
-    print("Home endpoint called")
+    logger.debug("home_called")
     return jsonify({
         "message": "FloraFind API - Your Plant Care Companion",
         "version": "1.0",
         "features": ["Plant Search", "Garden Management", "Care Calendar", "Community"]
     })
 
+def build_query_response(user_query, search_results):
+    """Turn search results into the /query payload and status code"""
+    if 'error' in search_results:
+        return {
+            "error": "Search failed", 
+            "details": search_results['error'],
+            "fallback_suggestions": ["tulsi", "neem", "rose", "mint", "aloe vera"]
+        }, 500
+
+    plants = search_results.get('plants', [])
+    search_analysis = search_results.get('search_analysis', {})
+
+    if not plants:
+        # What users who searched with the same modifiers went on to plant
+        smart_suggestions, suggestion_source = suggestions.suggest(search_analysis.get('modifiers', []))
+
+        return {
+            "message": f"No plants found for '{user_query}'. Here are some suggestions based on your search:",
+            "suggestions": smart_suggestions,
+            "suggestion_source": suggestion_source,
+            "search_analysis": search_analysis,
+            "search_tips": [
+                "Try: 'easy summer plants for beginners'",
+                "Search: 'indoor medicinal herbs'",
+                "Ask: 'drought tolerant flowering plants'",
+                "Query: 'air purifying plants for home'"
+            ]
+        }, 200
+
+    # Get NLP analysis details if available
+    nlp_analysis = search_results.get('nlp_analysis', {})
+
+    payload = {
+        "plants": plants,
+        "count": len(plants),
+        "next_cursor": search_results.get('next_cursor'),
+        "search_analysis": search_analysis,
+        "nlp_processing": {
+            "intent_detected": search_analysis.get('intent', 'search'),
+            "plant_mentions": search_analysis.get('plant_mentions', []),
+            "care_aspects_found": search_analysis.get('care_aspects', []),
+            "query_modifiers": search_analysis.get('modifiers', [])
+        },
+        "nlp_analysis_details": nlp_analysis
+    }
+    if search_results.get('degraded'):
+        # Served under load: from the recent-results cache, or without per-plant metadata
+        payload["degraded"] = search_results['degraded']
+    return payload, 200
+
 @app.route("/query", methods=["GET"])
 def query_plants():
     try:
         user_query = request.args.get("q", "").strip()
         user_id = request.args.get("user_id", 1, type=int)
+        search_type = request.args.get("search_type", "text")
+        if search_type not in queries.SEARCH_TYPES:
+            search_type = "text"
         
-        print(f"NLP Enhanced Query received: '{user_query}'")
+        logger.info("query_received", user_id=user_id, query_length=len(user_query))
         
         if not user_query:
             return jsonify({"error": "Please provide a query"}), 400
         
-        # Database configuration for NLP search
-        db_config = {
-            'host': 'localhost',
-            'database': 'florafind',
-            'user': 'root',
-            'password': 'anushka'  # Updated to match db.py
-        }
+        page_cursor = request.args.get("cursor")
+        limit = pagination.page_size(request.args.get("limit", type=int))
+        try:
+            after = pagination.decode_cursor(page_cursor, search_cursor_scope(user_query), length=SEARCH_CURSOR_LENGTH)
+        except pagination.InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Use advanced NLP search
-        search_results = search_plants_nlp(user_query, db_config)
+        # Use advanced NLP search (cached or without metadata when search is saturated)
+        search_results = search_plants_nlp(user_query, config.DB_CONFIG, after, limit, degraded=request_degraded())
         
-        # Log search
+        # Log search (first page only, so paging does not count as more searches)
         try:
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO search_logs (user_id, query, results_count) VALUES (%s, %s, %s)", 
-                          (user_id, user_query, len(search_results.get('plants', []))))
-            conn.commit()
-            cursor.close()
-            conn.close()
+            if not page_cursor:
+                with metrics.stage('search_log'):
+                    conn = db.get_connection()
+                    cursor = conn.cursor()
+                    cursor.execute(queries.INSERT_SEARCH_LOG, 
+                                  (user_id, user_query, len(search_results.get('plants', [])), search_type))
+                    conn.commit()
+                    cursor.close()
+                    conn.close()
         except Exception as e:
-            print(f"Logging error: {e}")
-        
-        if 'error' in search_results:
-            return jsonify({
-                "error": "Search failed", 
-                "details": search_results['error'],
-                "fallback_suggestions": ["tulsi", "neem", "rose", "mint", "aloe vera"]
-            }), 500
-        
-        plants = search_results.get('plants', [])
-        search_analysis = search_results.get('search_analysis', {})
-        
-        if not plants:
-            # Smart suggestions based on NLP analysis
-            suggestions = {
-                "summer": ["zinnia", "portulaca", "vinca", "sunflower", "marigold"],
-                "winter": ["rose", "lavender", "mint"],
-                "beginner": ["tulsi", "mint", "aloe vera", "snake plant", "peace lily"],
-                "indoor": ["snake plant", "peace lily", "aloe vera", "tulsi"],
-                "medicinal": ["tulsi", "neem", "aloe vera", "lemon balm", "chamomile"]
-            }
-            
-            # Use NLP analysis to provide better suggestions
-            smart_suggestions = ["tulsi", "neem", "rose", "mint", "sunflower"]
-            
-            for modifier_type, modifier_value in search_analysis.get('modifiers', []):
-                if modifier_type == 'difficulty' and modifier_value in suggestions:
-                    smart_suggestions = suggestions[modifier_value]
-                elif modifier_type == 'season' and modifier_value in suggestions:
-                    smart_suggestions = suggestions[modifier_value]
-                elif modifier_type == 'type' and modifier_value in suggestions:
-                    smart_suggestions = suggestions[modifier_value]
-            
-            return jsonify({
-                "message": f"No plants found for '{user_query}'. Here are some suggestions based on your search:",
-                "suggestions": smart_suggestions,
-                "search_analysis": search_analysis,
-                "search_tips": [
-                    "Try: 'easy summer plants for beginners'",
-                    "Search: 'indoor medicinal herbs'",
-                    "Ask: 'drought tolerant flowering plants'",
-                    "Query: 'air purifying plants for home'"
-                ]
-            })
+            logger.warning("search_log_failed", error=str(e))
         
-        # Get NLP analysis details if available
-        nlp_analysis = search_results.get('nlp_analysis', {})
-        
-        return jsonify({
-            "plants": plants,
-            "count": len(plants),
-            "search_analysis": search_analysis,
-            "nlp_processing": {
-                "intent_detected": search_analysis.get('intent', 'search'),
-                "plant_mentions": search_analysis.get('plant_mentions', []),
-                "care_aspects_found": search_analysis.get('care_aspects', []),
-                "query_modifiers": search_analysis.get('modifiers', [])
-            },
-            "nlp_analysis_details": nlp_analysis
-        })
+        payload, status = build_query_response(user_query, search_results)
+        return jsonify(payload), status
         
     except Exception as e:
-        print(f"NLP Query error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("query_failed", error=str(e))
         return jsonify({
             "error": "Advanced search temporarily unavailable", 
             "details": str(e),
@@ -125,7 +204,7 @@ def query_plants():
 def add_to_garden():
     try:
         data = request.get_json()
-        print(f"Add to garden request: {data}")
+        logger.info("add_to_garden", user_id=(data or {}).get('user_id'), plant_id=(data or {}).get('plant_id'))
         
         if not data or 'user_id' not in data or 'plant_id' not in data:
             return jsonify({"error": "Missing user_id or plant_id"}), 400
@@ -154,46 +233,161 @@ def add_to_garden():
         
         user_plant_id = cursor.lastrowid
         
-        # Create basic care schedule
+        # Create a watering schedule from the plant's frequency for this season
+        [(frequency_days, next_due_date)] = care_schedule.initial_schedules(cursor, [data['plant_id']])
         cursor.execute("""INSERT INTO care_schedules 
                          (user_plant_id, task_type, frequency_days, next_due_date) 
                          VALUES (%s, %s, %s, %s)""",
-                      (user_plant_id, 'watering', 3, 
-                       datetime.date.today() + timedelta(days=3)))
+                      (user_plant_id, 'watering', frequency_days, next_due_date))
         
+        stats = user_stats.update(cursor, data['user_id'], plants=True)
+        badges_earned = badges.on_plants_added(cursor, data['user_id'], [data['plant_id']], stats)
+        if badges_earned:
+            stats = user_stats.update(cursor, data['user_id'], points=True, badges=True)
         conn.commit()
         cursor.close()
         conn.close()
+        user_stats.publish(data['user_id'], stats)
         
         return jsonify({
             "success": True, 
             "user_plant_id": user_plant_id, 
-            "message": "Plant added to your garden successfully!"
+            "message": "Plant added to your garden successfully!",
+            "badges_earned": badges_earned
         })
         
     except Exception as e:
-        print(f"Add to garden error: {str(e)}")
+        logger.exception("add_to_garden_failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
+def garden_plant_entry(row):
+    return {
+        "plant_info": {
+            "user_plant_id": row['user_plant_id'],
+            "plant_id": row['plant_id'],
+            "name": row['name'],
+            "nickname": row['plant_nickname'] or row['name'],
+            "scientific_name": row['scientific_name'],
+            "health_score": row['current_health_score'] or 100,
+            "location": row['location_in_garden'],
+            "date_planted": str(row['date_planted']),
+            "eco_impact_score": row['eco_impact_score'] or 0,
+            "notes": row['notes']
+        },
+        "care_schedule": []
+    }
+
+def iter_garden_plants(rows):
+    """Group joined user_plants/care_schedules rows (ordered by user_plant_id) into one entry per garden plant"""
+    today = datetime.date.today()
+    current = None
+    for row in rows:
+        if current is None or current['plant_info']['user_plant_id'] != row['user_plant_id']:
+            if current is not None:
+                yield current
+            current = garden_plant_entry(row)
+        
+        if row['task_type']:
+            current['care_schedule'].append({
+                "task": row['task_type'],
+                "next_due": str(row['next_due_date']),
+                "frequency_days": row['frequency_days'],
+                "overdue": row['next_due_date'] < today if row['next_due_date'] else False
+            })
+    
+    if current is not None:
+        yield current
+
+def group_garden_rows(rows):
+    return list(iter_garden_plants(rows))
+
+GARDEN_STREAM_FETCH_SIZE = 500
+
+def stream_garden(user_id):
+    """Write the garden JSON incrementally from an unbuffered cursor, so memory stays flat"""
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        # Run the query before the response starts, so failures still become a 500
+        cursor.execute(queries.USER_GARDEN, (user_id,))
+    except Exception:
+        cursor.close()
+        conn.close()
+        raise
+    
+    def fetch_rows():
+        while True:
+            rows = cursor.fetchmany(GARDEN_STREAM_FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+    
+    def generate():
+        try:
+            total_plants, total_eco_impact = 0, 0
+            yield '{"garden": ['
+            for plant in iter_garden_plants(fetch_rows()):
+                yield (', ' if total_plants else '') + app.json.dumps(plant)
+                total_plants += 1
+                total_eco_impact += plant['plant_info']['eco_impact_score']
+            yield '], "total_plants": %d, "total_eco_impact": %s}' % (total_plants, app.json.dumps(total_eco_impact))
+        finally:
+            try:
+                # A client that disconnects mid-stream leaves rows unread on the connection
+                for _ in fetch_rows():
+                    pass
+                cursor.close()
+            finally:
+                conn.close()
+    
+    return generate()
+
+def garden_page(user_id, after, limit):
+    """One keyset page of a garden; returns (garden_list, next_cursor)"""
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # Ask for one extra plant to find out whether there is another page
+        cursor.execute(queries.USER_GARDEN_PAGE, (user_id, after[0] if after else 0, limit + 1))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    return split_garden_page(user_id, group_garden_rows(rows), limit)
+
+def split_garden_page(user_id, garden_list, limit):
+    """Drop the look-ahead plant; returns (garden_list, next_cursor)"""
+    next_cursor = None
+    if len(garden_list) > limit:
+        garden_list = garden_list[:limit]
+        next_cursor = pagination.encode_cursor([garden_list[-1]['plant_info']['user_plant_id']], f'garden:{user_id}')
+    return garden_list, next_cursor
+
 @app.route("/my_garden/<int:user_id>", methods=["GET"])
 def get_user_garden(user_id):
     try:
-        print(f"Getting garden for user {user_id}")
+        logger.debug("get_garden", user_id=user_id)
+        
+        if request.args.get("stream", type=int):
+            return Response(stream_with_context(stream_garden(user_id)), mimetype="application/json")
+        
+        if "limit" in request.args or "cursor" in request.args:
+            try:
+                after = pagination.decode_cursor(request.args.get("cursor"), f'garden:{user_id}', length=1)
+            except pagination.InvalidCursor as e:
+                return jsonify({"error": str(e)}), 400
+            limit = pagination.page_size(request.args.get("limit", type=int))
+            garden_list, next_cursor = garden_page(user_id, after, limit)
+            return jsonify({
+                "garden": garden_list,
+                "count": len(garden_list),
+                "next_cursor": next_cursor
+            })
         
         conn = db.get_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("""
-            SELECT up.user_plant_id, up.plant_nickname, up.location_in_garden, 
-                   up.date_planted, up.current_health_score, up.notes,
-                   p.plant_id, p.name, p.scientific_name, p.eco_impact_score,
-                   cs.task_type, cs.next_due_date, cs.frequency_days
-            FROM user_plants up 
-            JOIN plants p ON up.plant_id = p.plant_id 
-            LEFT JOIN care_schedules cs ON up.user_plant_id = cs.user_plant_id 
-            WHERE up.user_id = %s
-            ORDER BY up.user_plant_id
-        """, (user_id,))
+        cursor.execute(queries.USER_GARDEN, (user_id,))
         
         results = cursor.fetchall()
         cursor.close()
@@ -207,36 +401,7 @@ def get_user_garden(user_id):
                 "message": "Your garden is empty. Add some plants to get started!"
             })
         
-        # Group by plant
-        garden = {}
-        for row in results:
-            plant_id = row['user_plant_id']
-            if plant_id not in garden:
-                garden[plant_id] = {
-                    "plant_info": {
-                        "user_plant_id": row['user_plant_id'],
-                        "plant_id": row['plant_id'],
-                        "name": row['name'],
-                        "nickname": row['plant_nickname'] or row['name'],
-                        "scientific_name": row['scientific_name'],
-                        "health_score": row['current_health_score'] or 100,
-                        "location": row['location_in_garden'],
-                        "date_planted": str(row['date_planted']),
-                        "eco_impact_score": row['eco_impact_score'] or 0,
-                        "notes": row['notes']
-                    },
-                    "care_schedule": []
-                }
-            
-            if row['task_type']:
-                garden[plant_id]['care_schedule'].append({
-                    "task": row['task_type'],
-                    "next_due": str(row['next_due_date']),
-                    "frequency_days": row['frequency_days'],
-                    "overdue": row['next_due_date'] < datetime.date.today() if row['next_due_date'] else False
-                })
-        
-        garden_list = list(garden.values())
+        garden_list = group_garden_rows(results)
         
         return jsonify({
             "garden": garden_list,
@@ -245,14 +410,85 @@ def get_user_garden(user_id):
         })
         
     except Exception as e:
-        print(f"Garden error: {str(e)}")
+        logger.exception("get_garden_failed", user_id=user_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/my_garden/<int:user_id>/reschedule", methods=["POST"])
+def reschedule_garden(user_id):
+    try:
+        logger.info("reschedule_garden", user_id=user_id)
+        updated = care_schedule.rebalance_user(user_id)
+        return jsonify({"success": True, "season": care_schedule.season_for(), "updated": updated})
+        
+    except Exception as e:
+        logger.exception("reschedule_garden_failed", user_id=user_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/my_garden/<int:user_id>/health", methods=["GET"])
+def garden_health(user_id):
+    try:
+        days = min(max(request.args.get("days", 30, type=int), 1), plant_health.MAX_HISTORY_DAYS)
+        logger.debug("garden_health", user_id=user_id, days=days)
+        return jsonify({"user_id": user_id, "days": days, "plants": plant_health.history(user_id, days)})
+        
+    except Exception as e:
+        logger.exception("garden_health_failed", user_id=user_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/garden/import", methods=["POST"])
+def import_garden():
+    try:
+        user_id = request.args.get("user_id", type=int)
+        if user_id is None and request.is_json:
+            body = request.get_json(silent=True)
+            if isinstance(body, dict):
+                user_id = body.get("user_id")
+        if user_id is None:
+            return jsonify({"error": "Missing user_id"}), 400
+        
+        try:
+            rows, invalid = garden_io.parse_import(request.get_data(as_text=True), request.content_type)
+        except garden_io.InvalidImport as e:
+            return jsonify({"error": str(e)}), 400
+        logger.info("import_garden", user_id=user_id, rows=len(rows), invalid=len(invalid))
+        
+        result = garden_io.import_rows(user_id, rows, invalid)
+        return jsonify(result.to_dict())
+        
+    except Exception as e:
+        logger.exception("import_garden_failed", error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/garden/export", methods=["GET"])
+def export_garden():
+    try:
+        user_id = request.args.get("user_id", type=int)
+        export_format = request.args.get("format", "csv").lower()
+        if user_id is None:
+            return jsonify({"error": "Missing user_id"}), 400
+        if export_format not in ("csv", "json"):
+            return jsonify({"error": "format must be csv or json"}), 400
+        logger.debug("export_garden", user_id=user_id, format=export_format)
+        
+        rows = garden_io.open_export(user_id)
+        if export_format == "json":
+            body, mimetype = garden_io.export_json(rows), "application/json"
+        else:
+            body, mimetype = garden_io.export_csv(rows), "text/csv"
+        return Response(stream_with_context(body), mimetype=mimetype, headers={
+            "Content-Disposition": f"attachment; filename=garden-{user_id}.{export_format}"
+        })
+        
+    except Exception as e:
+        logger.exception("export_garden_failed", user_id=request.args.get("user_id"), error=str(e))
         return jsonify({"error": str(e)}), 500
 
 @app.route("/complete_care_task", methods=["POST"])
 def complete_care_task():
     try:
         data = request.get_json()
-        print(f"Complete care task: {data}")
+        logger.info("complete_care_task", user_plant_id=(data or {}).get('user_plant_id'),
+                    task_type=(data or {}).get('task_type'))
         
         if not data or 'user_plant_id' not in data or 'task_type' not in data:
             return jsonify({"error": "Missing user_plant_id or task_type"}), 400
@@ -260,6 +496,15 @@ def complete_care_task():
         conn = db.get_connection()
         cursor = conn.cursor()
         
+        # Points, streak and badges all go to the plant's owner, as the daily activity rollup does
+        cursor.execute("SELECT user_id FROM user_plants WHERE user_plant_id = %s", (data['user_plant_id'],))
+        owner = cursor.fetchone()
+        if not owner:
+            cursor.close()
+            conn.close()
+            return jsonify({"error": "Garden plant not found"}), 404
+        user_id = owner[0]
+        
         # Points mapping
         points_map = {
             'watering': 10,
@@ -276,57 +521,67 @@ def complete_care_task():
                          VALUES (%s, %s, %s, %s)""",
                       (data['user_plant_id'], data['task_type'], 
                        datetime.date.today(), points_earned))
+        activity.record(cursor, data['user_plant_id'], data['task_type'], datetime.date.today(), points_earned)
         
         # Update user points
-        user_id = data.get('user_id', 1)
         cursor.execute("UPDATE users SET plant_health_points = plant_health_points + %s WHERE user_id = %s", 
                       (points_earned, user_id))
         
+        # Next occurrence from the plant's data, the season and any per-season override on the schedule
+        cursor.execute(queries.CARE_TASK_CONTEXT, (data['task_type'], data['user_plant_id']))
+        context = cursor.fetchone()
+        columns = ('seasonal_adjustment', 'location', 'watering_frequency_summer',
+                   'watering_frequency_monsoon', 'watering_frequency_winter')
+        context = dict(zip(columns, context)) if context else {}
+        
+        next_frequency = care_schedule.frequency_days(data['task_type'], context,
+                                                      seasonal_adjustment=context.get('seasonal_adjustment'),
+                                                      location=context.get('location'))
+        next_due_date = datetime.date.today() + timedelta(days=next_frequency)
+        
         # Remove completed task from schedule and create next occurrence
         cursor.execute("""DELETE FROM care_schedules 
                          WHERE user_plant_id = %s AND task_type = %s""",
                       (data['user_plant_id'], data['task_type']))
         
-        # Create next task with appropriate frequency
-        frequency_map = {
-            'watering': 3,
-            'fertilizing': 30,
-            'pruning': 90,
-            'repotting': 365
-        }
-        
-        next_frequency = frequency_map.get(data['task_type'], 7)
-        next_due_date = datetime.date.today() + timedelta(days=next_frequency)
-        
         cursor.execute("""INSERT INTO care_schedules 
-                         (user_plant_id, task_type, frequency_days, next_due_date) 
-                         VALUES (%s, %s, %s, %s)""",
-                      (data['user_plant_id'], data['task_type'], next_frequency, next_due_date))
+                         (user_plant_id, task_type, frequency_days, next_due_date, seasonal_adjustment) 
+                         VALUES (%s, %s, %s, %s, %s)""",
+                      (data['user_plant_id'], data['task_type'], next_frequency, next_due_date,
+                       context.get('seasonal_adjustment')))
         
         # Update plant health
         cursor.execute("UPDATE user_plants SET current_health_score = LEAST(100, current_health_score + 5) WHERE user_plant_id = %s", 
                       (data['user_plant_id'],))
+        plant_health.record_health(cursor, {data['user_plant_id']: 0}, datetime.date.today())
         
+        stats = user_stats.update(cursor, user_id, points=True, activity_day=datetime.date.today())
+        badges_earned = badges.on_care_task(cursor, user_id, data['task_type'], datetime.date.today(), stats)
+        if badges_earned:
+            stats = user_stats.update(cursor, user_id, points=True, badges=True)
         conn.commit()
         cursor.close()
         conn.close()
+        user_stats.publish(user_id, stats)
         
         return jsonify({
             "success": True, 
             "points_earned": points_earned, 
             "message": f"Great job! +{points_earned} points!",
-            "next_due_date": str(next_due_date)
+            "next_due_date": str(next_due_date),
+            "badges_earned": badges_earned
         })
         
     except Exception as e:
-        print(f"Complete task error: {str(e)}")
+        logger.exception("complete_care_task_failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
 @app.route("/add_care_task", methods=["POST"])
 def add_care_task():
     try:
         data = request.get_json()
-        print(f"Adding care task: {data}")
+        logger.info("add_care_task", user_plant_id=(data or {}).get('user_plant_id'),
+                    task_type=(data or {}).get('task_type'))
         
         if not data or not all(k in data for k in ['user_plant_id', 'task_type', 'frequency_days']):
             return jsonify({"error": "Missing required fields: user_plant_id, task_type, frequency_days"}), 400
@@ -367,13 +622,14 @@ def add_care_task():
         })
         
     except Exception as e:
-        print(f"Add care task error: {str(e)}")
+        logger.exception("add_care_task_failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
 @app.route("/care_calendar/<int:plant_id>", methods=["GET"])
+@http_cache.cached('care_calendar')
 def get_care_calendar(plant_id):
     try:
-        print(f"Getting care calendar for plant {plant_id}")
+        logger.debug("get_care_calendar", plant_id=plant_id)
         
         conn = db.get_connection()
         cursor = conn.cursor(dictionary=True)
@@ -386,166 +642,300 @@ def get_care_calendar(plant_id):
             conn.close()
             return jsonify({"error": "Plant not found"}), 404
         
-        # Current season
-        current_month = datetime.datetime.now().month
-        if current_month in [12, 1, 2]:
-            season = "winter"
-        elif current_month in [6, 7, 8]:
-            season = "summer"
-        else:
-            season = "spring"
+        http_cache.set_last_modified(plant.get('updated_at'))
         
-        care_schedule = {
+        # Current care tips season and its slice of the plant's parsed tips; watering follows the care schedule's season
+        season = care_tips.season_for()
+        seasonal_tips = care_tips.get_index().season_slice(plant_id, season)
+        watering_days = care_schedule.frequency_days('watering', plant)
+        
+        calendar = {
             "plant_name": plant['name'],
             "current_season": season,
             "watering": {
-                "frequency_days": 3,
-                "next_due": (datetime.datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+                "frequency_days": watering_days,
+                "next_due": (datetime.datetime.now() + timedelta(days=watering_days)).strftime("%Y-%m-%d")
             },
             "eco_impact_score": plant.get('eco_impact_score', 0),
             "difficulty_level": plant.get('difficulty_level', 'beginner'),
             "care_tips": {
                 season: {
-                    "watering": "Water every 3 days",
                     "sunlight": "Provide adequate sunlight",
-                    "care": plant.get('care_instructions', 'Basic care needed')
+                    "care": plant.get('care_instructions', 'Basic care needed'),
+                    **seasonal_tips["tips"],
+                    # After the parsed advice, so it always agrees with watering.frequency_days
+                    "watering": f"Water every {watering_days} days"
                 }
-            }
+            },
+            "quick_tips": seasonal_tips["quick_tips"]
         }
         
         cursor.close()
         conn.close()
         
-        return jsonify(care_schedule)
+        return jsonify(calendar)
+        
+    except Exception as e:
+        logger.exception("care_calendar_failed", plant_id=plant_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/similar/<int:plant_id>", methods=["GET"])
+@http_cache.cached('similar')
+def get_similar_plants(plant_id):
+    try:
+        limit = max(1, min(request.args.get("limit", 10, type=int) or 10, config.SIMILAR_PLANTS_K))
+        
+        # Neighbours are precomputed by the similar_plants job
+        similar = similar_plants.similar_to(plant_id, limit)
+        if not similar and catalog.get_catalog().get(plant_id) is None:
+            return jsonify({"error": "Plant not found"}), 404
+        
+        return jsonify({"plant_id": plant_id, "similar": similar})
+        
+    except Exception as e:
+        logger.exception("similar_plants_failed", plant_id=plant_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/recommendations/<int:user_id>", methods=["GET"])
+def get_recommendations(user_id):
+    try:
+        limit = pagination.page_size(request.args.get("limit", 10, type=int))
+        
+        # Related plants are precomputed nightly by the plant_cooccurrence job
+        recommended = recommendations.for_user(user_id, limit)
+        logger.debug("recommendations_found", user_id=user_id, count=len(recommended))
+        
+        return jsonify({"user_id": user_id, "recommendations": recommended})
+        
+    except Exception as e:
+        logger.exception("recommendations_failed", user_id=user_id, error=str(e))
+        return jsonify({"recommendations": [], "error": str(e)}), 500
+
+@app.route("/tips", methods=["GET"])
+@http_cache.cached('care_tips')
+def get_care_tips():
+    try:
+        plant_ref = (request.args.get("plant") or "").strip()
+        season = (request.args.get("season") or care_tips.season_for()).strip().lower()
+        if season not in care_tips.SEASONS and season != care_tips.ALL_SEASONS:
+            return jsonify({"error": f"Unknown season {season!r}"}), 400
+        category = request.args.get("category")
+        if category is not None and category not in care_tips.CATEGORIES:
+            return jsonify({"error": f"Unknown category {category!r}"}), 400
+        urgent = request.args.get("urgent", type=lambda value: value.lower() in ('1', 'true', 'yes'))
+        
+        plant = None
+        if plant_ref:
+            current = catalog.get_catalog()
+            plant = current.get(int(plant_ref)) if plant_ref.isdigit() else current.find_by_name(plant_ref)
+            if plant is None:
+                return jsonify({"error": "Plant not found"}), 404
+        
+        # Parsed care_tips_detailed for the plant (every section for season=all), then quick tips
+        index = care_tips.get_index()
+        plant_id = plant.plant_id if plant else None
+        parsed = index.plant(plant_id) if plant else None
+        if parsed is None:
+            tips = {}
+        elif season == care_tips.ALL_SEASONS:
+            tips = parsed.to_dict()
+        else:
+            tips = parsed.for_season(season)
+        
+        return jsonify({
+            "plant": {"plant_id": plant.plant_id, "name": plant.name} if plant else None,
+            "season": season,
+            "tips": tips,
+            "quick_tips": [tip.to_dict() for tip in index.quick_tips(plant_id, season, category, urgent)]
+        })
         
     except Exception as e:
-        print(f"Care calendar error: {str(e)}")
+        logger.exception("care_tips_failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
 @app.route("/community/challenges", methods=["GET"])
+@http_cache.cached('challenges')
 def get_challenges():
     try:
-        print("Getting community challenges")
+        logger.debug("get_challenges")
         
         conn = db.get_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("""SELECT * FROM plant_challenges 
-                         WHERE is_active = 1 AND end_date >= CURDATE() 
-                         ORDER BY start_date ASC""")
+        cursor.execute(queries.ACTIVE_CHALLENGES)
         challenges = cursor.fetchall()
         
         # Convert dates to strings
         for challenge in challenges:
+            http_cache.set_last_modified(challenge.get('created_at'))
             challenge['start_date'] = str(challenge['start_date'])
             challenge['end_date'] = str(challenge['end_date'])
         
         cursor.close()
         conn.close()
         
-        print(f"Found {len(challenges)} challenges")
+        logger.debug("challenges_found", count=len(challenges))
         
         return jsonify({"challenges": challenges})
         
     except Exception as e:
-        print(f"Challenges error: {str(e)}")
+        logger.exception("challenges_failed", error=str(e))
+        http_cache.no_store()
         return jsonify({"challenges": [], "error": str(e)})
 
+@app.route("/community/challenges/<int:challenge_id>/standings", methods=["GET"])
+@http_cache.cached('standings')
+def get_challenge_standings(challenge_id):
+    try:
+        try:
+            after = pagination.decode_cursor(request.args.get("cursor"), f'standings:{challenge_id}', length=2)
+        except pagination.InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        limit = pagination.page_size(request.args.get("limit", type=int))
+        
+        # Rankings are precomputed by the challenge_scoring job
+        challenge, standings, next_cursor = challenges.standings(challenge_id, after, limit)
+        if challenge is None:
+            return jsonify({"error": "Challenge not found"}), 404
+        
+        return jsonify({
+            "challenge": challenge,
+            "standings": standings,
+            "next_cursor": next_cursor
+        })
+        
+    except Exception as e:
+        logger.exception("challenge_standings_failed", challenge_id=challenge_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/leaderboard", methods=["GET"])
 def get_leaderboard():
     try:
-        print("Getting leaderboard")
+        logger.debug("get_leaderboard")
         
         conn = db.get_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("""SELECT u.username, u.plant_health_points, u.level,
-                               COUNT(up.user_plant_id) as total_plants
-                         FROM users u 
-                         LEFT JOIN user_plants up ON u.user_id = up.user_id 
-                         GROUP BY u.user_id
-                         ORDER BY u.plant_health_points DESC 
-                         LIMIT 10""")
+        cursor.execute(queries.LEADERBOARD)
         
         leaderboard = cursor.fetchall()
         cursor.close()
         conn.close()
         
-        print(f"Found {len(leaderboard)} users in leaderboard")
+        logger.debug("leaderboard_found", count=len(leaderboard))
         
         return jsonify({"leaderboard": leaderboard})
         
     except Exception as e:
-        print(f"Leaderboard error: {str(e)}")
+        logger.exception("leaderboard_failed", error=str(e))
         return jsonify({"leaderboard": [], "error": str(e)})
 
 @app.route("/community/submit_tip", methods=["POST"])
 def submit_tip():
     try:
         data = request.get_json()
-        print(f"Submitting tip: {data}")
+        logger.info("submit_tip", user_id=(data or {}).get('user_id'), plant_name=(data or {}).get('plant_name'))
         
         if not data or not all(k in data for k in ['user_id', 'plant_name', 'care_tip']):
             return jsonify({"error": "Missing required fields"}), 400
         
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""INSERT INTO plant_submissions 
-                         (user_id, plant_name, care_tip, location) 
-                         VALUES (%s, %s, %s, %s)""",
-                      (data['user_id'], data['plant_name'], 
-                       data['care_tip'], data.get('location', '')))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        # Near-duplicates of an open tip for the same plant are refused
+        submission_id, duplicate = tips.submit(data['user_id'], data['plant_name'],
+                                               data['care_tip'], data.get('location', ''))
+        if duplicate:
+            return jsonify({
+                "error": "A very similar tip for this plant has already been submitted.",
+                "duplicate_of": duplicate[0],
+                "similarity": round(duplicate[1], 2)
+            }), 409
         
         return jsonify({
             "success": True, 
+            "submission_id": submission_id,
             "message": "Thank you for sharing your plant wisdom! Your tip has been submitted."
         })
         
     except Exception as e:
-        print(f"Submit tip error: {str(e)}")
+        logger.exception("submit_tip_failed", error=str(e))
         return jsonify({"error": str(e)}), 500
 
-@app.route("/user_stats/<int:user_id>", methods=["GET"])
-def get_user_stats(user_id):
+@app.route("/community/tips", methods=["GET"])
+def get_tips():
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor(dictionary=True)
+        plant_name = request.args.get("plant")
+        plant_id = request.args.get("plant_id", type=int)
+        if plant_id is not None:
+            entry = catalog.get_catalog().get(plant_id)
+            if entry is None:
+                return jsonify({"error": "Plant not found"}), 404
+            plant_name = entry.name
+        if not plant_name:
+            return jsonify({"error": "Missing plant or plant_id"}), 400
+        limit = pagination.page_size(request.args.get("limit", type=int))
+        
+        return jsonify({"plant": plant_name, "tips": tips.approved_tips(plant_name, limit)})
+        
+    except Exception as e:
+        logger.exception("tips_failed", error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/community/tips/<int:submission_id>/vote", methods=["POST"])
+def vote_tip(submission_id):
+    try:
+        vote = (request.get_json(silent=True) or {}).get("vote")
+        if vote not in ("up", "down"):
+            return jsonify({"error": "vote must be 'up' or 'down'"}), 400
         
-        # Get user stats
-        cursor.execute("SELECT plant_health_points, level FROM users WHERE user_id = %s", (user_id,))
-        user_stats = cursor.fetchone()
+        # Counted in memory and written to plant_submissions in the next batch
+        tip = tips.record_vote(submission_id, vote == "up")
+        if tip is None:
+            return jsonify({"error": "Tip not found"}), 404
         
-        if not user_stats:
-            # Create default user if not exists
-            cursor.execute("INSERT INTO users (user_id, username, plant_health_points, level) VALUES (%s, %s, %s, %s)",
-                          (user_id, f"User{user_id}", 0, 1))
-            conn.commit()
-            user_stats = {"plant_health_points": 0, "level": 1}
+        return jsonify({"success": True, "tip": tip})
         
-        # Get badge count
-        cursor.execute("SELECT COUNT(*) as badge_count FROM user_badges WHERE user_id = %s", (user_id,))
-        badge_result = cursor.fetchone()
-        badge_count = badge_result['badge_count'] if badge_result else 0
+    except Exception as e:
+        logger.exception("vote_tip_failed", submission_id=submission_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/analytics/search", methods=["GET"])
+def get_search_analytics():
+    try:
+        granularity = request.args.get("granularity", "day")
+        if granularity not in search_analytics.GRANULARITIES:
+            return jsonify({"error": "granularity must be 'hour' or 'day'"}), 400
+        days = min(max(request.args.get("days", 7, type=int), 1), 365)
+        limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
         
-        cursor.close()
-        conn.close()
+        return jsonify(search_analytics.get_search_analytics(granularity, days, limit))
         
-        return jsonify({
-            "points": user_stats['plant_health_points'],
-            "level": user_stats['level'],
-            "badges": badge_count
-        })
+    except Exception as e:
+        logger.exception("search_analytics_failed", error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/user_stats/<int:user_id>", methods=["GET"])
+def get_user_stats(user_id):
+    try:
+        return jsonify(user_stats.get(user_id).to_dict())
         
     except Exception as e:
-        print(f"User stats error: {str(e)}")
-        return jsonify({"points": 0, "level": 1, "badges": 0})
+        logger.exception("user_stats_failed", user_id=user_id, error=str(e))
+        return jsonify(user_stats.default_stats(user_id).to_dict())
+
+@app.route("/activity/<int:user_id>", methods=["GET"])
+def get_activity(user_id):
+    try:
+        range_name = request.args.get("range", activity.DEFAULT_RANGE)
+        if range_name not in activity.RANGES:
+            return jsonify({"error": f"range must be one of: {', '.join(activity.RANGES)}"}), 400
+        logger.debug("get_activity", user_id=user_id, range=range_name)
+        return jsonify(activity.history(user_id, range_name))
+        
+    except Exception as e:
+        logger.exception("activity_failed", user_id=user_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
 
 if __name__ == "__main__":
-    print("FloraFind API starting...")
-    print("Features: Plant Search | Garden Management | Care Calendar | Community")
-    app.run(debug=True, port=5000, host='127.0.0.1')
+    logger.info("api_starting", features=["Plant Search", "Garden Management", "Care Calendar", "Community"])
+    if config.WARM_UP_ON_START:
+        startup.warm_up()
+    app.run(debug=config.DEBUG, port=config.PORT, host=config.HOST)
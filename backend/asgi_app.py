@@ -0,0 +1,318 @@
+"""
+ASGI API for FloraFind
+Async variants of the read-heavy routes, backed by aiomysql so one worker can
+overlap many DB-bound requests. CPU-bound NLP runs on a bounded thread pool.
+Any route without an async variant is served by the Flask app (app.py).
+
+    FLORAFIND_SERVER_MODE=async python serve.py
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+from quart import Quart, Response, g, jsonify, request
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+
+import admission
+import app as flask_app
+import async_db
+import catalog
+import config
+import http_cache
+import metrics
+import pagination
+import queries
+import user_stats
+from nlp_search import get_search_engine, result_cache, search_cursor_scope, SEARCH_CURSOR_LENGTH
+from structured_logging import get_logger
+
+logger = get_logger('asgi')
+
+quart_app = cors(Quart(__name__))
+
+_nlp_executor = ThreadPoolExecutor(max_workers=config.NLP_EXECUTOR_WORKERS, thread_name_prefix='nlp')
+_nlp_pending = 0
+
+
+class NLPBusy(Exception):
+    """Raised when more NLP work is queued than FLORAFIND_NLP_MAX_PENDING allows"""
+
+
+async def run_nlp(func, *args):
+    """Run CPU-bound work off the event loop, shedding load once the queue is full"""
+    global _nlp_pending
+    if _nlp_pending >= config.NLP_EXECUTOR_MAX_PENDING:
+        metrics.NLP_REJECTED.inc()
+        raise NLPBusy()
+    _nlp_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_nlp_executor, func, *args)
+    finally:
+        _nlp_pending -= 1
+
+
+metrics.Gauge('florafind_nlp_executor_pending', 'NLP jobs queued or running on the async executor',
+              callback=lambda: {(): _nlp_pending})
+metrics.Gauge('florafind_async_db_pool_connections', 'Async database pool connections by state',
+              callback=async_db._pool_stats)
+
+
+@quart_app.before_request
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@quart_app.before_request
+async def admit_request():
+    if not config.ADMISSION_ENABLED:
+        return None
+    rule = request.url_rule.rule if request.url_rule else None
+    try:
+        g.admission = await admission.get_controller().admit_async(
+            rule, admission.user_key(request.args, request.remote_addr))
+    except admission.Rejected as e:
+        logger.warning("request_rejected", path=request.path, status=e.status, reason=e.reason)
+        message = "Too many requests" if e.status == 429 else "Server busy"
+        return jsonify({"error": f"{message}, please retry shortly", "reason": e.reason,
+                        "retry_after": e.retry_after}), e.status, {'Retry-After': str(e.retry_after)}
+    return None
+
+
+@quart_app.teardown_request
+async def release_admission(exc):
+    ticket = getattr(g, 'admission', None)
+    if ticket is not None:
+        ticket.release()
+
+
+@quart_app.after_request
+async def record_request_metrics(response):
+    started = getattr(g, 'request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if config.METRICS_ENABLED:
+        metrics.REQUEST_LATENCY.observe(elapsed, route=route, method=request.method)
+        metrics.REQUEST_COUNT.inc(route=route, method=request.method, status=response.status_code)
+    if config.SERVER_TIMING_ENABLED:
+        response.headers['Server-Timing'] = f'total;dur={elapsed * 1000:.1f}'
+    return response
+
+
+@quart_app.after_serving
+async def shutdown():
+    await async_db.close_pool()
+    _nlp_executor.shutdown(wait=False)
+
+
+@quart_app.route("/metrics", methods=["GET"])
+async def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@quart_app.route("/", methods=["GET"])
+@http_cache.cached('home')
+async def home():
+    return jsonify({
+        "message": "FloraFind API - Your Plant Care Companion",
+        "version": "1.0",
+        "features": ["Plant Search", "Garden Management", "Care Calendar", "Community"]
+    })
+
+
+@quart_app.route("/query", methods=["GET"])
+async def query_plants():
+    try:
+        user_query = request.args.get("q", "").strip()
+        user_id = request.args.get("user_id", 1, type=int)
+        search_type = request.args.get("search_type", "text")
+        if search_type not in queries.SEARCH_TYPES:
+            search_type = "text"
+
+        logger.info("query_received", user_id=user_id, query_length=len(user_query))
+
+        if not user_query:
+            return jsonify({"error": "Please provide a query"}), 400
+
+        page_cursor = request.args.get("cursor")
+        limit = pagination.page_size(request.args.get("limit", type=int))
+        try:
+            after = pagination.decode_cursor(page_cursor, search_cursor_scope(user_query), length=SEARCH_CURSOR_LENGTH)
+        except pagination.InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+
+        engine = get_search_engine(config.DB_CONFIG)
+        ticket = getattr(g, 'admission', None)
+        degraded = bool(ticket and ticket.degraded)
+        try:
+            search_results = result_cache.get(user_query, after, limit) if degraded else None
+            if search_results is None:
+                processed_query = await run_nlp(engine.prepare_query, user_query)
+                excluding = engine.excluding_catalog(processed_query)
+                if excluding is not None and excluding.matches(await async_db.fetchone(catalog.CATALOG_VERSION)):
+                    rows = []
+                else:
+                    sql, params = engine.build_search_sql(processed_query, after, limit)
+                    with metrics.stage('sql'):
+                        rows = await async_db.fetchall(sql, params)
+                rows, next_cursor = engine.split_page(list(rows), processed_query, limit)
+                search_results = await run_nlp(engine.build_search_response, rows, processed_query, next_cursor, degraded)
+                if not degraded:
+                    result_cache.put(user_query, after, limit, search_results)
+        except NLPBusy:
+            return jsonify({"error": "Search is busy, please retry shortly"}), 503
+        except Exception as e:
+            logger.exception("semantic_search_failed", error=str(e))
+            search_results = {'plants': [], 'error': str(e)}
+
+        try:
+            if not page_cursor:
+                with metrics.stage('search_log'):
+                    await async_db.execute(queries.INSERT_SEARCH_LOG,
+                                           (user_id, user_query, len(search_results.get('plants', [])), search_type))
+        except Exception as e:
+            logger.warning("search_log_failed", error=str(e))
+
+        payload, status = flask_app.build_query_response(user_query, search_results)
+        return jsonify(payload), status
+
+    except Exception as e:
+        logger.exception("query_failed", error=str(e))
+        return jsonify({
+            "error": "Advanced search temporarily unavailable",
+            "details": str(e),
+            "fallback_suggestions": ["tulsi", "neem", "rose", "mint", "aloe vera"]
+        }), 500
+
+
+async def stream_garden(user_id):
+    """Garden JSON written incrementally from a server-side cursor"""
+    total_plants, total_eco_impact = 0, 0
+    yield b'{"garden": ['
+    async for plant in _group_garden_stream(async_db.iterate(queries.USER_GARDEN, (user_id,))):
+        yield ((', ' if total_plants else '') + quart_app.json.dumps(plant)).encode('utf-8')
+        total_plants += 1
+        total_eco_impact += plant['plant_info']['eco_impact_score']
+    tail = '], "total_plants": %d, "total_eco_impact": %s}' % (total_plants, quart_app.json.dumps(total_eco_impact))
+    yield tail.encode('utf-8')
+
+
+async def _group_garden_stream(rows):
+    """Async version of app.iter_garden_plants: rows of one plant are grouped as they arrive"""
+    batch, current_id = [], None
+    async for row in rows:
+        if batch and row['user_plant_id'] != current_id:
+            for plant in flask_app.iter_garden_plants(batch):
+                yield plant
+            batch = []
+        batch.append(row)
+        current_id = row['user_plant_id']
+    for plant in flask_app.iter_garden_plants(batch):
+        yield plant
+
+
+@quart_app.route("/my_garden/<int:user_id>", methods=["GET"])
+async def get_user_garden(user_id):
+    try:
+        if request.args.get("stream", type=int):
+            return Response(stream_garden(user_id), mimetype="application/json")
+
+        if "limit" in request.args or "cursor" in request.args:
+            try:
+                after = pagination.decode_cursor(request.args.get("cursor"), f'garden:{user_id}', length=1)
+            except pagination.InvalidCursor as e:
+                return jsonify({"error": str(e)}), 400
+            limit = pagination.page_size(request.args.get("limit", type=int))
+            rows = await async_db.fetchall(queries.USER_GARDEN_PAGE, (user_id, after[0] if after else 0, limit + 1))
+            garden_list, next_cursor = flask_app.split_garden_page(user_id, flask_app.group_garden_rows(rows), limit)
+            return jsonify({
+                "garden": garden_list,
+                "count": len(garden_list),
+                "next_cursor": next_cursor
+            })
+
+        results = await async_db.fetchall(queries.USER_GARDEN, (user_id,))
+
+        if not results:
+            return jsonify({
+                "garden": [],
+                "total_plants": 0,
+                "total_eco_impact": 0,
+                "message": "Your garden is empty. Add some plants to get started!"
+            })
+
+        garden_list = flask_app.group_garden_rows(results)
+
+        return jsonify({
+            "garden": garden_list,
+            "total_plants": len(garden_list),
+            "total_eco_impact": sum(plant['plant_info']['eco_impact_score'] for plant in garden_list)
+        })
+
+    except Exception as e:
+        logger.exception("get_garden_failed", user_id=user_id, error=str(e))
+        return jsonify({"error": str(e)}), 500
+
+
+@quart_app.route("/community/challenges", methods=["GET"])
+@http_cache.cached('challenges')
+async def get_challenges():
+    try:
+        challenges = await async_db.fetchall(queries.ACTIVE_CHALLENGES)
+
+        for challenge in challenges:
+            http_cache.set_last_modified(challenge.get('created_at'))
+            challenge['start_date'] = str(challenge['start_date'])
+            challenge['end_date'] = str(challenge['end_date'])
+
+        return jsonify({"challenges": challenges})
+
+    except Exception as e:
+        logger.exception("challenges_failed", error=str(e))
+        http_cache.no_store()
+        return jsonify({"challenges": [], "error": str(e)})
+
+
+@quart_app.route("/leaderboard", methods=["GET"])
+async def get_leaderboard():
+    try:
+        leaderboard = await async_db.fetchall(queries.LEADERBOARD)
+        return jsonify({"leaderboard": leaderboard})
+
+    except Exception as e:
+        logger.exception("leaderboard_failed", error=str(e))
+        return jsonify({"leaderboard": [], "error": str(e)})
+
+
+@quart_app.route("/user_stats/<int:user_id>", methods=["GET"])
+async def get_user_stats(user_id):
+    try:
+        return jsonify((await user_stats.get_async(user_id)).to_dict())
+
+    except Exception as e:
+        logger.exception("user_stats_failed", user_id=user_id, error=str(e))
+        return jsonify(user_stats.default_stats(user_id).to_dict())
+
+
+_wsgi_fallback = WsgiToAsgi(flask_app.app)
+_async_routes = quart_app.url_map.bind('')
+
+
+def _has_async_route(path, method):
+    try:
+        _async_routes.match(path, method=method)
+    except HTTPException:
+        return False
+    return True
+
+
+async def application(scope, receive, send):
+    """ASGI entry point: async routes first, everything else through the Flask app"""
+    if scope['type'] == 'http' and not _has_async_route(scope['path'], scope['method']):
+        await _wsgi_fallback(scope, receive, send)
+    else:
+        await quart_app(scope, receive, send)
@@ -0,0 +1,91 @@
+# async_db.py
+"""
+Async MySQL access for the ASGI routes
+One aiomysql pool per worker process, created on first use inside the event loop
+"""
+
+import asyncio
+
+import aiomysql
+
+import config
+
+_pool = None
+_pool_lock = None
+
+
+async def get_pool():
+    """Lazily create the worker's async connection pool"""
+    global _pool, _pool_lock
+    if _pool is None:
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await aiomysql.create_pool(
+                    host=config.DB_CONFIG['host'],
+                    user=config.DB_CONFIG['user'],
+                    password=config.DB_CONFIG['password'],
+                    db=config.DB_CONFIG['database'],
+                    minsize=config.ASYNC_DB_POOL_MIN,
+                    maxsize=config.ASYNC_DB_POOL_MAX,
+                    autocommit=True,
+                )
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+async def fetchall(sql, params=None):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(sql, params)
+            return await cursor.fetchall()
+
+
+async def fetchone(sql, params=None):
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(sql, params)
+            return await cursor.fetchone()
+
+
+async def iterate(sql, params=None, size=500):
+    """Yield rows from an unbuffered server-side cursor, `size` at a time"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+            await cursor.execute(sql, params)
+            while True:
+                rows = await cursor.fetchmany(size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield row
+
+
+async def execute(sql, params=None):
+    """Run a write statement; returns the affected row count"""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(sql, params)
+            return cursor.rowcount
+
+
+def _pool_stats():
+    if _pool is None:
+        return {}
+    return {
+        (('state', 'idle'),): _pool.freesize,
+        (('state', 'in_use'),): _pool.size - _pool.freesize,
+        (('state', 'size'),): _pool.maxsize,
+    }
@@ -0,0 +1,364 @@
+"""
+Badge engine for FloraFind
+Each badge's requirements JSON ({"watering_count": 50}, {"plant_count": 10,
+"health_threshold": 80}, ...) compiles once into a rule over per-user running
+counters. complete_care_task and add_to_garden/garden import bump the counters
+they change and evaluate only the unearned badges that read them, so no request
+rescans a user's history. The badge_backfill job rebuilds every user's counters
+from the daily activity rollup and the garden, a chunk of users at a time, and awards
+whatever they have already earned.
+
+    python jobs.py run badge_backfill
+"""
+
+import datetime
+import json
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import config
+import db
+import jobs
+import metrics
+import user_stats
+from structured_logging import get_logger
+
+logger = get_logger('badges')
+
+BACKFILL_JOB = 'badge_backfill'
+
+# care_activities.task_type values; each has a running "<task>_count" counter
+TASK_TYPES = ('watering', 'fertilizing', 'pruning', 'repotting', 'pest_check', 'photo_upload')
+# seasons_completed counts the four calendar seasons ("all 4 seasons"), not care_schedule's watering seasons
+BADGE_SEASONS = ('spring', 'summer', 'autumn', 'winter')
+SEASON_BY_MONTH = {
+    12: 'winter', 1: 'winter', 2: 'winter', 3: 'spring', 4: 'spring', 5: 'spring',
+    6: 'summer', 7: 'summer', 8: 'summer', 9: 'autumn', 10: 'autumn', 11: 'autumn',
+}
+# Bit per season in the season_mask counter
+SEASON_BITS = {season: 1 << index for index, season in enumerate(BADGE_SEASONS)}
+
+# Counters kept in user_badge_counters
+STORED_COUNTERS = frozenset([f'{task}_count' for task in TASK_TYPES] + ['season_mask', 'eco_score'])
+# Requirement keys and the counter each compares against (health_threshold modifies plant_count)
+REQUIREMENT_COUNTERS = dict(
+    {f'{task}_count': f'{task}_count' for task in TASK_TYPES},
+    plant_count='plant_count',
+    care_streak='care_streak',
+    eco_score='eco_score',
+    seasons_completed='seasons_completed',
+    approved_submissions='approved_submissions',
+)
+MODIFIERS = {'health_threshold'}
+
+BADGES_AWARDED = metrics.Counter('florafind_badges_awarded_total', 'Badges awarded by badge')
+
+BADGE_RULES = "SELECT badge_id, name, description, requirements, points_value FROM badges ORDER BY badge_id"
+UPSERT_COUNTER_DELTA = """
+    INSERT INTO user_badge_counters (user_id, counter, value) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE value = CASE WHEN counter = 'season_mask' THEN value | VALUES(value)
+                                         ELSE value + VALUES(value) END
+"""
+UPSERT_COUNTER = """
+    INSERT INTO user_badge_counters (user_id, counter, value) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE value = VALUES(value)
+"""
+AWARD_BADGE = "INSERT IGNORE INTO user_badges (user_id, badge_id) VALUES (%s, %s)"
+AWARD_POINTS = "UPDATE users SET plant_health_points = plant_health_points + %s WHERE user_id = %s"
+
+
+@dataclass(frozen=True)
+class Rule:
+    badge_id: int
+    name: str
+    description: str
+    points_value: int
+    thresholds: Tuple[Tuple[str, int], ...]   # (counter, minimum), all of which must hold
+    counters: FrozenSet[str] = field(default_factory=frozenset)
+
+    def reads(self, changed: Set[str]) -> bool:
+        """Whether an event changing `changed` counter families can affect this rule"""
+        return any(counter.split(':')[0] in changed for counter in self.counters)
+
+    def satisfied(self, counters: Dict[str, int]) -> bool:
+        return all(counters.get(counter, 0) >= minimum for counter, minimum in self.thresholds)
+
+    def to_dict(self) -> Dict:
+        return {"badge_id": self.badge_id, "name": self.name, "description": self.description,
+                "points": self.points_value}
+
+
+def compile_rule(row: Dict) -> Optional[Rule]:
+    """A badges row as a Rule, or None when its requirements use criteria with no counter or cannot be met"""
+    requirements = row['requirements']
+    if isinstance(requirements, (str, bytes)):
+        try:
+            requirements = json.loads(requirements)
+        except ValueError:
+            requirements = None
+    if not isinstance(requirements, dict) or not requirements:
+        logger.warning("badge_rule_unsupported", badge=row['name'], requirements=str(requirements))
+        return None
+    unknown = [key for key in requirements if key not in REQUIREMENT_COUNTERS and key not in MODIFIERS]
+    values = [value for value in requirements.values() if not isinstance(value, (int, float))]
+    if unknown or values:
+        logger.warning("badge_rule_unsupported", badge=row['name'], criteria=unknown or list(requirements))
+        return None
+
+    if requirements.get('seasons_completed', 0) > len(SEASON_BITS):
+        logger.warning("badge_rule_unreachable", badge=row['name'], seasons_completed=requirements['seasons_completed'],
+                       seasons=len(SEASON_BITS))
+        return None
+
+    thresholds = []
+    for key, minimum in requirements.items():
+        if key in MODIFIERS:
+            continue
+        counter = REQUIREMENT_COUNTERS[key]
+        if key == 'plant_count' and 'health_threshold' in requirements:
+            counter = f"healthy_plants:{int(requirements['health_threshold'])}"
+        thresholds.append((counter, int(minimum)))
+    return Rule(
+        badge_id=row['badge_id'],
+        name=row['name'],
+        description=row.get('description') or '',
+        points_value=int(row.get('points_value') or 0),
+        thresholds=tuple(thresholds),
+        counters=frozenset(counter for counter, _ in thresholds),
+    )
+
+
+_rules: Optional[List[Rule]] = None
+_rules_loaded = 0.0
+_rules_lock = threading.Lock()
+
+
+def get_rules(cursor) -> List[Rule]:
+    """The compiled badge rules, reloaded every BADGE_RULES_TTL seconds"""
+    global _rules, _rules_loaded
+    if _rules is None or time.monotonic() - _rules_loaded >= config.BADGE_RULES_TTL:
+        cursor.execute(BADGE_RULES)
+        columns = ('badge_id', 'name', 'description', 'requirements', 'points_value')
+        rows = [row if isinstance(row, dict) else dict(zip(columns, row)) for row in cursor.fetchall()]
+        rules = [rule for rule in map(compile_rule, rows) if rule is not None]
+        with _rules_lock:
+            _rules, _rules_loaded = rules, time.monotonic()
+    return _rules
+
+
+def reload_rules():
+    """Recompile on next use (call after editing the badges table)"""
+    global _rules
+    _rules = None
+
+
+# Counters
+
+def season_for(day: datetime.date) -> str:
+    return SEASON_BY_MONTH[day.month]
+
+
+def _in_list(values: Sequence) -> str:
+    return ', '.join(['%s'] * len(values))
+
+
+def load_counters(cursor, low: int, high: int, names: Iterable[str]) -> Dict[int, Dict[str, int]]:
+    """user_id -> the `names` counters for users low..high that are stored or queried.
+
+    plant_count and care_streak come from the caller (user_stats, or the backfill's own scan).
+    """
+    names = set(names)
+    counters: Dict[int, Dict[str, int]] = defaultdict(dict)
+    stored = (names & STORED_COUNTERS) | ({'season_mask'} if 'seasons_completed' in names else set())
+    if stored:
+        stored = sorted(stored)
+        cursor.execute("SELECT user_id, counter, value FROM user_badge_counters "
+                       f"WHERE user_id BETWEEN %s AND %s AND counter IN ({_in_list(stored)})", [low, high] + stored)
+        for user_id, counter, value in _tuples(cursor.fetchall(), ('user_id', 'counter', 'value')):
+            counters[user_id][counter] = int(value)
+    if 'seasons_completed' in names:
+        for values in counters.values():
+            values['seasons_completed'] = bin(values.get('season_mask', 0)).count('1')
+
+    for name in sorted(names):
+        if name.startswith('healthy_plants:'):
+            cursor.execute("SELECT user_id, COUNT(*) AS count FROM user_plants WHERE user_id BETWEEN %s AND %s "
+                           "AND current_health_score >= %s GROUP BY user_id", (low, high, int(name.split(':')[1])))
+            for user_id, count in _tuples(cursor.fetchall(), ('user_id', 'count')):
+                counters[user_id][name] = int(count)
+    if 'approved_submissions' in names:
+        cursor.execute("SELECT user_id, COUNT(*) AS count FROM plant_submissions WHERE user_id BETWEEN %s AND %s "
+                       "AND status = 'approved' GROUP BY user_id", (low, high))
+        for user_id, count in _tuples(cursor.fetchall(), ('user_id', 'count')):
+            counters[user_id]['approved_submissions'] = int(count)
+    return counters
+
+
+def _tuples(rows, columns: Sequence[str]) -> List[tuple]:
+    return [tuple(row[column] for column in columns) if isinstance(row, dict)
+            else tuple(row) for row in rows]
+
+
+# Awards
+
+def award(cursor, awards: Sequence[Tuple[int, Rule]]) -> List[Tuple[int, Rule]]:
+    """Write (user_id, rule) awards and credit their points (the caller commits); returns the ones written.
+
+    Awards are inserted one at a time so that one already written by a concurrent
+    request or backfill (UNIQUE user_id, badge_id) is skipped without crediting its points again.
+    """
+    written = []
+    for user_id, rule in awards:
+        cursor.execute(AWARD_BADGE, (user_id, rule.badge_id))
+        if cursor.rowcount == 1:
+            written.append((user_id, rule))
+    points: Dict[int, int] = defaultdict(int)
+    for user_id, rule in written:
+        points[user_id] += rule.points_value
+        BADGES_AWARDED.inc(badge=rule.name)
+    points = [(total, user_id) for user_id, total in points.items() if total]
+    if points:
+        cursor.executemany(AWARD_POINTS, points)
+    return written
+
+
+def _evaluate(cursor, user_id: int, changed: Set[str], stats: Optional[user_stats.UserStats]) -> List[Dict]:
+    """Award the unearned badges that read `changed` and now hold; returns them for the response"""
+    if stats is None:
+        return []
+    rules = [rule for rule in get_rules(cursor) if rule.reads(changed)]
+    if not rules:
+        return []
+    cursor.execute(f"SELECT badge_id FROM user_badges WHERE user_id = %s AND badge_id IN ({_in_list(rules)})",
+                   [user_id] + [rule.badge_id for rule in rules])
+    owned = {badge_id for (badge_id,) in _tuples(cursor.fetchall(), ('badge_id',))}
+    rules = [rule for rule in rules if rule.badge_id not in owned]
+    if not rules:
+        return []
+
+    counters = load_counters(cursor, user_id, user_id, set().union(*(rule.counters for rule in rules)))[user_id]
+    counters.update(plant_count=stats.plants, care_streak=stats.current_streak())
+    written = award(cursor, [(user_id, rule) for rule in rules if rule.satisfied(counters)])
+    earned = [rule for _, rule in written]
+    if earned:
+        logger.info("badges_awarded", user_id=user_id, badges=[rule.name for rule in earned])
+    return [rule.to_dict() for rule in earned]
+
+
+def on_care_task(cursor, user_id: int, task_type: str, day: datetime.date,
+                 stats: Optional[user_stats.UserStats]) -> List[Dict]:
+    """Count a completed care task (after user_stats.update) and award what it earns"""
+    cursor.execute(UPSERT_COUNTER_DELTA.replace('(%s, %s, %s)', '(%s, %s, %s), (%s, %s, %s)'),
+                   (user_id, f'{task_type}_count', 1,
+                    user_id, 'season_mask', SEASON_BITS[season_for(day)]))
+    changed = {f'{task_type}_count', 'seasons_completed', 'care_streak', 'healthy_plants'}
+    return _evaluate(cursor, user_id, changed, stats)
+
+
+def on_plants_added(cursor, user_id: int, plant_ids: Sequence[int],
+                    stats: Optional[user_stats.UserStats]) -> List[Dict]:
+    """Count plants added to a garden (after user_stats.update) and award what they earn"""
+    if not plant_ids:
+        return []
+    cursor.execute(f"SELECT COALESCE(SUM(eco_impact_score), 0) AS eco FROM plants WHERE plant_id IN ({_in_list(plant_ids)})",
+                   list(plant_ids))
+    row = cursor.fetchone()
+    eco_score = next(iter(row.values())) if isinstance(row, dict) else row[0]
+    cursor.execute(UPSERT_COUNTER_DELTA, (user_id, 'eco_score', int(eco_score)))
+    return _evaluate(cursor, user_id, {'plant_count', 'eco_score', 'healthy_plants'}, stats)
+
+
+# Backfill
+
+def longest_streak(days: Sequence[datetime.date]) -> int:
+    """The longest run of consecutive days in `days` (distinct, any order)"""
+    longest = run = 0
+    previous = None
+    for day in sorted(days):
+        run = run + 1 if previous is not None and (day - previous).days == 1 else 1
+        longest = max(longest, run)
+        previous = day
+    return longest
+
+
+def _backfill_chunk(cursor, user_ids: List[int], rules: List[Rule]) -> Tuple[int, List[Tuple[int, Rule]]]:
+    """Rebuild the stored counters of `user_ids` and find the badges they have earned"""
+    low, high = user_ids[0], user_ids[-1]
+    stored = {user_id: dict({f'{task}_count': 0 for task in TASK_TYPES}, season_mask=0, eco_score=0)
+              for user_id in user_ids}
+    days: Dict[int, Set[datetime.date]] = defaultdict(set)
+    cursor.execute("""
+        SELECT user_id, task_type, activity_date AS completed_date, tasks
+        FROM user_activity_daily
+        WHERE user_id BETWEEN %s AND %s
+    """, (low, high))
+    for user_id, task_type, day, tasks in _tuples(cursor.fetchall(), ('user_id', 'task_type', 'completed_date', 'tasks')):
+        if user_id not in stored:
+            continue
+        day = user_stats._as_date(day)
+        if task_type in TASK_TYPES:
+            stored[user_id][f'{task_type}_count'] += int(tasks)
+        stored[user_id]['season_mask'] |= SEASON_BITS[season_for(day)]
+        days[user_id].add(day)
+
+    plants: Dict[int, int] = {}
+    cursor.execute("""
+        SELECT up.user_id, COUNT(*) AS plants, COALESCE(SUM(p.eco_impact_score), 0) AS eco
+        FROM user_plants up JOIN plants p ON up.plant_id = p.plant_id
+        WHERE up.user_id BETWEEN %s AND %s
+        GROUP BY up.user_id
+    """, (low, high))
+    for user_id, count, eco_score in _tuples(cursor.fetchall(), ('user_id', 'plants', 'eco')):
+        if user_id in stored:
+            plants[user_id] = int(count)
+            stored[user_id]['eco_score'] = int(eco_score)
+
+    cursor.executemany(UPSERT_COUNTER, [(user_id, counter, value)
+                                        for user_id, values in stored.items() for counter, value in values.items()])
+
+    cursor.execute("SELECT user_id, badge_id FROM user_badges WHERE user_id BETWEEN %s AND %s", (low, high))
+    owned = set(_tuples(cursor.fetchall(), ('user_id', 'badge_id')))
+    counters = load_counters(cursor, low, high, set().union(*(rule.counters for rule in rules)) if rules else set())
+    earned = []
+    for user_id in user_ids:
+        values = counters[user_id]
+        values.update(plant_count=plants.get(user_id, 0), care_streak=longest_streak(days[user_id]))
+        earned.extend((user_id, rule) for rule in rules
+                      if (user_id, rule.badge_id) not in owned and rule.satisfied(values))
+    return len(stored), earned
+
+
+@jobs.register(BACKFILL_JOB, interval_seconds=7 * 86400)
+def backfill() -> Dict:
+    """Rebuild badge counters from history and award badges already earned"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    users = awarded = last_id = 0
+    try:
+        while True:
+            cursor.execute("SELECT user_id FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                           (last_id, config.BADGE_BACKFILL_BATCH_SIZE))
+            user_ids = [user_id for (user_id,) in _tuples(cursor.fetchall(), ('user_id',))]
+            if not user_ids:
+                break
+            scanned, earned = _backfill_chunk(cursor, user_ids, get_rules(cursor))
+            if earned:
+                earned = award(cursor, earned)
+            refreshed = {user_id: user_stats.update(cursor, user_id, points=True, badges=True)
+                         for user_id in {user_id for user_id, _ in earned}}
+            conn.commit()
+            for user_id, stats in refreshed.items():
+                user_stats.publish(user_id, stats)
+            users += scanned
+            awarded += len(earned)
+            last_id = user_ids[-1]
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {'users': users, 'awarded': awarded}
@@ -0,0 +1 @@
+"""Benchmark suite for the FloraFind backend (see bench/run.py)"""
@@ -0,0 +1,122 @@
+"""
+Equivalence check: rapidfuzz-backed scoring vs the previous fuzzywuzzy/rapidfuzz calls
+
+    python -m bench.equivalence
+
+Compares, over the seed catalog and a reproducible set of generated queries:
+- similarity.partial_ratio against fuzzywuzzy's fuzz.partial_ratio
+- _rank_results relevance scores against a run with fuzzywuzzy scoring names
+- classify_intent against the per-keyword rapidfuzz process.extract loop
+Exits non-zero on any mismatch. Requires fuzzywuzzy (reference only; it is
+not a runtime dependency).
+"""
+
+import json
+import random
+import sys
+import warnings
+
+from bench import fixtures
+from bench.micro import QUERIES, SEARCH_COLUMNS
+
+
+def _corpus(database, generated: int, seed: int):
+    connection = database.connect()
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(f"SELECT {SEARCH_COLUMNS} FROM plants ORDER BY plant_id")
+    rows = cursor.fetchall()
+    connection.close()
+    words = ' '.join((row['care_instructions'] or '') + ' ' + row['name'] for row in rows).lower().split()
+    rng = random.Random(seed)
+    queries = list(QUERIES) + [' '.join(rng.sample(words, rng.randint(1, 6))) for _ in range(generated)]
+    return rows, queries
+
+
+def check_partial_ratio(rows, queries):
+    from fuzzywuzzy import fuzz
+    from similarity import partial_ratio
+
+    mismatches = []
+    for query in queries:
+        query = query.lower()
+        for row in rows:
+            name = row['name'].lower()
+            expected, actual = fuzz.partial_ratio(query, name), partial_ratio(query, name)
+            if expected != actual:
+                mismatches.append({'query': query, 'name': name, 'fuzzywuzzy': expected, 'rapidfuzz': actual})
+    return mismatches
+
+
+def check_rank_results(rows, queries):
+    from fuzzywuzzy import fuzz
+    import nlp_search
+
+    engine = nlp_search.FloraFindNLPSearch({})
+    mismatches = []
+    for query in queries:
+        processed = engine.preprocess_query(query)
+        actual = [(p['plant_id'], p['relevance_score']) for p in engine._rank_results(rows, processed)]
+
+        original = nlp_search.partial_ratio_many
+        nlp_search.partial_ratio_many = lambda q, names: [fuzz.partial_ratio(q, n.lower()) for n in names]
+        try:
+            expected = [(p['plant_id'], p['relevance_score']) for p in engine._rank_results(rows, processed)]
+        finally:
+            nlp_search.partial_ratio_many = original
+
+        if actual != expected:
+            mismatches.append({'query': query, 'expected': expected[:5], 'actual': actual[:5]})
+    return mismatches
+
+
+def check_classify_intent(queries):
+    from rapidfuzz import process
+    from nlp_processor import PlantQueryProcessor
+
+    processor = PlantQueryProcessor()
+
+    def reference(text):
+        text_lower = text.lower()
+        intent_scores = {}
+        for intent, keywords in processor.intent_patterns.items():
+            score = 0
+            for keyword in keywords:
+                if keyword in text_lower:
+                    score += 1
+                matches = process.extract(keyword, text_lower.split(), limit=1)
+                if matches and matches[0][1] > 80:
+                    score += 0.5
+            if score > 0:
+                intent_scores[intent] = score
+        if intent_scores:
+            best_intent = max(intent_scores, key=intent_scores.get)
+            return best_intent, min(intent_scores[best_intent] / len(processor.intent_patterns[best_intent]), 1.0)
+        return 'general_info', 0.5
+
+    return [{'query': q, 'expected': reference(q), 'actual': processor.classify_intent(q)}
+            for q in queries if reference(q) != processor.classify_intent(q)]
+
+
+def main(generated: int = 500, seed: int = 1) -> int:
+    warnings.filterwarnings('ignore', module='fuzzywuzzy')
+    database = fixtures.seeded_database()
+    fixtures.patch_backend(database)
+    try:
+        rows, queries = _corpus(database, generated, seed)
+        report = {
+            'queries': len(queries),
+            'plants': len(rows),
+            'partial_ratio': check_partial_ratio(rows, queries),
+            'rank_results': check_rank_results(rows, queries),
+            'classify_intent': check_classify_intent(queries),
+        }
+    finally:
+        database.remove()
+    failures = sum(len(report[key]) for key in ('partial_ratio', 'rank_results', 'classify_intent'))
+    report['mismatches'] = failures
+    print(json.dumps(report, indent=2, default=str))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
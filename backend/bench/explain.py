@@ -0,0 +1,105 @@
+"""
+Query plans for the search SQL
+
+    python -m bench.explain            # against the SQLite bench database
+    python -m bench.explain --mysql    # against FLORAFIND_DB_* (EXPLAIN on the real schema)
+
+Builds the search statement for each benchmark query with build_search_sql and
+records its plan, flagging full scans of plants. Only the MySQL plans show
+index use for MATCH ... AGAINST (the bench fixtures emulate it with a function);
+the SQLite plans still catch predicates that stop the other indexes applying.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+from bench.micro import QUERIES
+
+EXTRA_QUERIES = [
+    "tulsi",
+    "tall trees for shade",
+    "fruit trees",
+    "medicinal plants",
+]
+
+
+def _search_statements(db_config) -> List[tuple]:
+    from nlp_search import FloraFindNLPSearch
+
+    engine = FloraFindNLPSearch(db_config)
+    statements = []
+    for query in list(QUERIES) + EXTRA_QUERIES:
+        sql, params = engine.build_search_sql(engine.prepare_query(query))
+        statements.append((query, sql, params))
+    return statements
+
+
+def explain_sqlite(database, db_config=None) -> Dict:
+    connection = database.connect()
+    cursor = connection.cursor()
+    plans = {}
+    try:
+        for query, sql, params in _search_statements(db_config or {}):
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+            plans[query] = {
+                'plan': details,
+                'full_scan': any(detail.startswith('SCAN plants') and 'INDEX' not in detail for detail in details),
+            }
+    finally:
+        connection.close()
+    return plans
+
+
+def explain_mysql(db_config) -> Dict:
+    # Connect directly: the bench may have patched mysql.connector.connect to SQLite
+    from mysql.connector.connection import MySQLConnection
+
+    connection = MySQLConnection(**db_config)
+    cursor = connection.cursor(dictionary=True)
+    plans = {}
+    try:
+        for query, sql, params in _search_statements(db_config):
+            cursor.execute('EXPLAIN ' + sql, params)
+            rows = cursor.fetchall()
+            plans[query] = {
+                'plan': [{key: row.get(key) for key in ('table', 'type', 'possible_keys', 'key', 'rows', 'Extra')}
+                         for row in rows],
+                'full_scan': any(row.get('table') == 'plants' and row.get('type') == 'ALL' for row in rows),
+            }
+    finally:
+        cursor.close()
+        connection.close()
+    return plans
+
+
+def run_explain(context, mysql: bool = False) -> Dict:
+    if mysql:
+        import config
+        return explain_mysql(config.DB_CONFIG)
+    return explain_sqlite(context['database'], context['db_config'])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='bench.explain')
+    parser.add_argument('--mysql', action='store_true', help='explain against the configured MySQL database')
+    args = parser.parse_args(argv)
+
+    if args.mysql:
+        plans = run_explain({}, mysql=True)
+    else:
+        from bench import fixtures
+        database = fixtures.seeded_database()
+        try:
+            fixtures.patch_backend(database)
+            plans = run_explain({'database': database, 'db_config': {}})
+        finally:
+            database.remove()
+    print(json.dumps(plans, indent=2, default=str))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""
+SQLite stand-in for the FloraFind MySQL database
+Translates database_schema.sql and the seed files into SQLite, and exposes
+connections that accept the mysql.connector call patterns used by the backend
+"""
+
+import datetime
+import os
+import re
+import sqlite3
+import tempfile
+from typing import Iterable, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE = os.path.join(BACKEND_DIR, 'database_schema.sql')
+SEED_FILES = [
+    os.path.join(BACKEND_DIR, 'database_data.sql'),
+    os.path.join(BACKEND_DIR, 'enhanced_care_tips.sql'),
+]
+
+sqlite3.register_converter('DATE', lambda raw: datetime.date.fromisoformat(raw.decode()[:10]))
+sqlite3.register_converter('TIMESTAMP', lambda raw: datetime.datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter('DATETIME', lambda raw: datetime.datetime.fromisoformat(raw.decode()))
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(sep=' '))
+
+# MySQL-isms in backend queries and their SQLite equivalents
+_QUERY_REWRITES = [
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bLEAST\s*\(', re.I), 'MIN('),
+    (re.compile(r'\bGREATEST\s*\(', re.I), 'MAX('),
+    (re.compile(r'\bCURDATE\s*\(\s*\)', re.I), "date('now')"),
+    (re.compile(r'\bNOW\s*\(\s*\)', re.I), "datetime('now')"),
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.I), 'INSERT OR IGNORE'),
+    (re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.I), 'ON CONFLICT DO UPDATE SET'),
+    (re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.I), r'excluded.\1'),
+    (re.compile(r'\bMATCH\s*\(([^)]*)\)\s*AGAINST\s*\(\s*(\?)\s+IN\s+BOOLEAN\s+MODE\s*\)', re.I),
+     r'mysql_match(\2, \1)'),
+]
+
+
+def mysql_match(expression, *columns) -> int:
+    """MATCH ... AGAINST (... IN BOOLEAN MODE), as far as the backend uses it"""
+    import filters
+
+    return int(filters.boolean_match(expression, *columns))
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a MySQL script into statements, normalising string escapes for SQLite"""
+    statements, current = [], []
+    i, n = 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if ch == "'":
+            literal = ["'"]
+            i += 1
+            while i < n:
+                ch = sql[i]
+                if ch == '\\' and i + 1 < n:
+                    nxt = sql[i + 1]
+                    literal.append("''" if nxt == "'" else nxt)
+                    i += 2
+                    continue
+                if ch == "'":
+                    if sql.startswith("''", i):
+                        literal.append("''")
+                        i += 2
+                        continue
+                    break
+                literal.append(ch)
+                i += 1
+            literal.append("'")
+            current.append(''.join(literal))
+            i += 1
+            continue
+        if ch == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(ch)
+        i += 1
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def split_insert_rows(statement: str):
+    """Split `INSERT ... VALUES (..), (..)` into its head and individual row tuples"""
+    position = re.search(r'\bVALUES\b', statement, re.I).start()
+    head, body = statement[:position].strip(), statement[position + len('VALUES'):]
+    rows, depth, start, in_string = [], 0, None, False
+    for i, ch in enumerate(body):
+        if ch == "'":
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif ch == '(':
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0 and start is not None:
+                rows.append(body[start:i + 1])
+                start = None
+    return head, rows
+
+
+def _split_definitions(body: str) -> List[str]:
+    parts, depth, current = [], 0, []
+    for ch in body:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+def translate_create_table(statement: str) -> List[str]:
+    """Translate one MySQL CREATE TABLE into SQLite DDL plus index statements"""
+    match = re.match(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)\s*[^)]*$', statement, re.S | re.I)
+    if not match:
+        return []
+    table, body = match.group(1), match.group(2)
+    columns, extra = [], []
+    for definition in _split_definitions(body):
+        upper = definition.upper()
+        if upper.startswith('FULLTEXT'):
+            continue
+        index = re.match(r'(UNIQUE\s+)?(?:KEY|INDEX)\s+(\w+)\s*\((.*)\)$', definition, re.I | re.S)
+        if index:
+            unique = 'UNIQUE ' if index.group(1) else ''
+            extra.append(f'CREATE {unique}INDEX IF NOT EXISTS {index.group(2)} ON {table} ({index.group(3)})')
+            continue
+        definition = re.sub(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', 'INTEGER PRIMARY KEY AUTOINCREMENT', definition, flags=re.I)
+        definition = re.sub(r'\bENUM\s*\([^)]*\)', 'TEXT', definition, flags=re.I)
+        definition = re.sub(r'\bJSON\b', 'TEXT', definition, flags=re.I)
+        definition = re.sub(r'\bON\s+UPDATE\s+CURRENT_TIMESTAMP\b', '', definition, flags=re.I)
+        definition = re.sub(r'\bUNSIGNED\b', '', definition, flags=re.I)
+        # MySQL's default collation compares text case-insensitively
+        definition = re.sub(r'^(\w+\s+(?:VARCHAR\s*\(\d+\)|TEXT|CHAR\s*\(\d+\)))', r'\1 COLLATE NOCASE', definition, flags=re.I)
+        columns.append(definition)
+    ddl = f'CREATE TABLE IF NOT EXISTS {table} (\n    ' + ',\n    '.join(columns) + '\n)'
+    return [ddl] + extra
+
+
+def translate_script(sql: str) -> List[str]:
+    """Translate a MySQL schema or seed script into SQLite statements"""
+    translated = []
+    for statement in split_statements(sql):
+        keyword = statement.split(None, 1)[0].upper()
+        if keyword in ('SHOW', 'USE'):
+            continue
+        if re.match(r'CREATE\s+DATABASE', statement, re.I):
+            continue
+        if re.match(r'CREATE\s+TABLE', statement, re.I):
+            translated.extend(translate_create_table(statement))
+        elif keyword in ('INSERT', 'UPDATE', 'DELETE'):
+            translated.append(statement)
+    return translated
+
+
+def translate_query(sql: str) -> str:
+    for pattern, replacement in _QUERY_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+class SQLiteCursor:
+    """Cursor that accepts mysql.connector-style SQL and parameters"""
+
+    def __init__(self, connection: sqlite3.Connection, dictionary: bool = False):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+
+    def _convert(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def execute(self, sql, params=None):
+        self._cursor.execute(translate_query(sql), tuple(params or ()))
+        return self
+
+    def executemany(self, sql, seq_params):
+        self._cursor.executemany(translate_query(sql), [tuple(p) for p in seq_params])
+        return self
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._convert(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._convert(row)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Connection wrapper mirroring the subset of mysql.connector the backend uses"""
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES,
+                                           check_same_thread=False, timeout=30)
+        self._connection.create_function('mysql_match', -1, mysql_match, deterministic=True)
+
+    def cursor(self, dictionary: bool = False, **_kwargs):
+        return SQLiteCursor(self._connection, dictionary=dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def start_transaction(self, **_kwargs):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._connection.close()
+
+
+class SQLiteDatabase:
+    """A file-backed SQLite database seeded with the FloraFind schema and data"""
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix='florafind-bench-', suffix='.sqlite3')
+            os.close(handle)
+            self._owns_file = True
+        else:
+            self._owns_file = False
+        self.path = path
+        with sqlite3.connect(self.path) as raw:
+            raw.execute('PRAGMA journal_mode=WAL')
+
+    def connect(self, **_kwargs) -> SQLiteConnection:
+        return SQLiteConnection(self.path)
+
+    def executescript(self, statements: Iterable[str]) -> int:
+        """Execute translated statements, returning the number of seed rows skipped as malformed"""
+        skipped = 0
+        with sqlite3.connect(self.path) as raw:
+            for statement in statements:
+                try:
+                    raw.execute(statement)
+                except sqlite3.OperationalError:
+                    if not statement.upper().startswith('INSERT'):
+                        raise
+                    # A malformed tuple sinks the whole multi-row INSERT; retry row by row
+                    head, rows = split_insert_rows(statement)
+                    for row in rows:
+                        try:
+                            raw.execute(f'{head} VALUES {row}')
+                        except sqlite3.Error:
+                            skipped += 1
+        return skipped
+
+    def load_schema(self, schema_file: str = SCHEMA_FILE):
+        with open(schema_file, encoding='utf-8') as handle:
+            self.executescript(translate_script(handle.read()))
+
+    def load_seed_data(self, seed_files: Iterable[str] = SEED_FILES) -> int:
+        skipped = 0
+        for seed_file in seed_files:
+            with open(seed_file, encoding='utf-8') as handle:
+                skipped += self.executescript(translate_script(handle.read()))
+        self.update_derived_columns()
+        return skipped
+
+    def update_derived_columns(self):
+        """Run the jobs that maintain plants' derived columns (growth_height_cm) after loading plants"""
+        import plant_heights
+
+        connection = self.connect()
+        try:
+            plant_heights.update_heights(connection.cursor())
+            connection.commit()
+        finally:
+            connection.close()
+
+    def count_tables(self) -> int:
+        with sqlite3.connect(self.path) as raw:
+            return raw.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+
+    def count(self, table: str) -> int:
+        with sqlite3.connect(self.path) as raw:
+            return raw.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def remove(self):
+        if self._owns_file:
+            for suffix in ('', '-wal', '-shm'):
+                try:
+                    os.remove(self.path + suffix)
+                except FileNotFoundError:
+                    pass
+
+
+def seeded_database(path: Optional[str] = None) -> SQLiteDatabase:
+    """Create a database with the schema and every seed file loaded"""
+    database = SQLiteDatabase(path)
+    database.load_schema()
+    database.load_seed_data()
+    return database
+
+
+def patch_backend(database: SQLiteDatabase):
+    """Route the backend's MySQL connections to `database`"""
+    import mysql.connector
+    import db
+
+    db.get_connection = database.connect
+    mysql.connector.connect = database.connect
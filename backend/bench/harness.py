@@ -0,0 +1,93 @@
+"""
+Timing harness and result files for the benchmark suite
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from typing import Callable, Dict, List, Optional
+
+
+def summarize(samples_ns: List[int], operations: int = 1) -> Dict[str, float]:
+    """Summary statistics in microseconds per operation"""
+    per_op = sorted(sample / operations / 1000 for sample in samples_ns)
+    p95_index = min(len(per_op) - 1, int(round(0.95 * (len(per_op) - 1))))
+    median = statistics.median(per_op)
+    return {
+        'runs': len(per_op),
+        'min_us': round(per_op[0], 3),
+        'median_us': round(median, 3),
+        'mean_us': round(statistics.fmean(per_op), 3),
+        'p95_us': round(per_op[p95_index], 3),
+        'ops_per_sec': round(1_000_000 / median, 1) if median else None,
+    }
+
+
+def measure(func: Callable[[], object], repeat: int = 30, warmup: int = 3, operations: int = 1) -> Dict[str, float]:
+    """Time `func` `repeat` times after `warmup` untimed calls"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - start)
+    return summarize(samples, operations)
+
+
+def environment() -> Dict[str, object]:
+    """Metadata needed to judge whether two result files are comparable"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'git_commit': commit,
+    }
+
+
+def write_results(results: Dict, output_dir: str, label: str) -> str:
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(output_dir, f'{label}-{stamp}.json')
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, indent=2, sort_keys=True, default=str)
+    return path
+
+
+def _flatten(results: Dict, metric: str) -> Dict[str, float]:
+    flat = {}
+    for section in ('micro', 'load'):
+        for name, entry in results.get(section, {}).items():
+            if isinstance(entry, dict) and metric in entry:
+                flat[f'{section}.{name}'] = entry[metric]
+    return flat
+
+
+def compare(baseline_path: str, current_path: str, threshold: float = 0.10,
+            metric: str = 'median_us') -> List[Dict[str, Optional[float]]]:
+    """Compare two result files; a benchmark regresses when `metric` grows by more than `threshold`"""
+    with open(baseline_path, encoding='utf-8') as handle:
+        baseline = _flatten(json.load(handle), metric)
+    with open(current_path, encoding='utf-8') as handle:
+        current = _flatten(json.load(handle), metric)
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        before, after = baseline.get(name), current.get(name)
+        change = (after - before) / before if before and after is not None else None
+        rows.append({
+            'benchmark': name,
+            'baseline': before,
+            'current': after,
+            'change': round(change, 4) if change is not None else None,
+            'regression': change is not None and change > threshold,
+        })
+    return rows
@@ -0,0 +1,165 @@
+"""
+Concurrency sweeps against the Flask routes
+Serves the app on a threaded Werkzeug server bound to an ephemeral port and
+drives it with keep-alive HTTP clients, one per worker thread. The route
+sweeps run with admission control off so they measure the routes themselves;
+run_admission_test measures /my_garden under a search flood with it off and on.
+"""
+
+import http.client
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List
+
+from bench.harness import summarize
+
+ROUTES = {
+    'home': '/',
+    'query': '/query?q=easy+summer+plants+for+beginners&user_id=1',
+    'my_garden': '/my_garden/1',
+    'care_calendar': '/care_calendar/1',
+    'challenges': '/community/challenges',
+    'leaderboard': '/leaderboard',
+    'user_stats': '/user_stats/1',
+}
+
+
+def _worker(port: int, path: str, deadline: float, latencies: List[int], errors: List[int]):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter_ns()
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException):
+            errors.append(0)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append(time.perf_counter_ns() - start)
+    connection.close()
+
+
+def sweep_route(port: int, path: str, concurrency_levels, duration: float) -> Dict[str, Dict]:
+    results = {}
+    for concurrency in concurrency_levels:
+        latencies: List[int] = []
+        errors: List[int] = []
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=_worker, args=(port, path, deadline, latencies, errors))
+                   for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if not latencies:
+            results[f'c{concurrency}'] = {'requests': 0, 'errors': len(errors)}
+            continue
+        stats = summarize(latencies)
+        stats.update({
+            'concurrency': concurrency,
+            'requests': len(latencies),
+            'errors': len(errors),
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+        })
+        results[f'c{concurrency}'] = stats
+    return results
+
+
+@contextmanager
+def _serving(admission_enabled: bool):
+    """The Flask app on an ephemeral port, with admission control on or off (fresh limits)"""
+    from werkzeug.serving import make_server
+    import admission
+    import config
+    from app import app
+
+    # Per-request access logging would dominate the measurement
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    previous = config.ADMISSION_ENABLED
+    config.ADMISSION_ENABLED = admission_enabled
+    admission._controller = None
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    try:
+        yield server.server_port
+    finally:
+        server.shutdown()
+        config.ADMISSION_ENABLED = previous
+        admission._controller = None
+
+
+def run_load_tests(concurrency_levels=(1, 2, 4, 8, 16), duration: float = 3.0, selected=None) -> Dict:
+    try:
+        import app  # noqa: F401
+    except ImportError as exc:
+        return {'skipped': {'skipped': f'missing dependency: {exc}'}}
+
+    results = {}
+    with _serving(admission_enabled=False) as port:
+        for name, path in ROUTES.items():
+            if selected and name not in selected:
+                continue
+            for level, stats in sweep_route(port, path, concurrency_levels, duration).items():
+                results[f'{name}.{level}'] = stats
+    return results
+
+
+def _flood(port: int, path: str, deadline: float, statuses: Counter):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.perf_counter() < deadline:
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            statuses[response.status] += 1
+            retry_after = response.getheader('Retry-After')
+            if retry_after:
+                # Well-behaved clients back off as told
+                time.sleep(max(0.0, min(float(retry_after), deadline - time.perf_counter())))
+        except (OSError, http.client.HTTPException):
+            statuses[0] += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.close()
+
+
+def run_admission_test(duration: float = 3.0, search_clients: int = 16, probe_clients: int = 2) -> Dict:
+    """/my_garden latency while `search_clients` flood /query, with admission control off and on"""
+    try:
+        import app  # noqa: F401
+    except ImportError as exc:
+        return {'skipped': {'skipped': f'missing dependency: {exc}'}}
+
+    results = {}
+    for enabled in (False, True):
+        label = 'admission_on' if enabled else 'admission_off'
+        with _serving(admission_enabled=enabled) as port:
+            deadline = time.perf_counter() + duration
+            statuses: Counter = Counter()
+            latencies: List[int] = []
+            errors: List[int] = []
+            threads = [threading.Thread(target=_flood, args=(port, f'/query?q=easy+summer+plants&user_id={client}',
+                                                             deadline, statuses))
+                       for client in range(search_clients)]
+            threads += [threading.Thread(target=_worker, args=(port, ROUTES['my_garden'], deadline, latencies, errors))
+                        for _ in range(probe_clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if latencies:
+                stats = summarize(latencies)
+                stats.update({'requests': len(latencies), 'errors': len(errors)})
+                results[f'{label}.my_garden'] = stats
+            results[f'{label}.query_statuses'] = {str(status): count for status, count in sorted(statuses.items())}
+    return results
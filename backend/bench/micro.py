@@ -0,0 +1,111 @@
+"""
+Microbenchmarks for the backend hot paths
+Each benchmark is skipped (with the reason recorded) when its dependencies are unavailable
+"""
+
+from typing import Callable, Dict
+
+from bench.harness import measure
+from bench.synthetic import garden_rows
+
+QUERIES = [
+    "easy summer plants for beginners",
+    "indoor medicinal herbs",
+    "drought tolerant flowering plants",
+    "air purifying plants for home",
+    "how do I care for roses in winter",
+    "my tulsi leaves are turning yellow",
+]
+
+SEARCH_COLUMNS = """plant_id, name, scientific_name, season, climate,
+    care_instructions, native_region, eco_impact_score,
+    difficulty_level, cultural_significance, medicinal_properties,
+    watering_frequency_summer, watering_frequency_winter, watering_frequency_monsoon,
+    sunlight_requirement, soil_type, growth_height, growth_time_months, eco_benefits"""
+
+
+def bench_preprocess_query(context) -> Dict:
+    from nlp_search import FloraFindNLPSearch
+    engine = FloraFindNLPSearch(context['db_config'])
+    return measure(lambda: [engine.preprocess_query(q) for q in QUERIES],
+                   repeat=context['repeat'], operations=len(QUERIES))
+
+
+def bench_classify_intent(context) -> Dict:
+    from nlp_processor import PlantQueryProcessor
+    processor = PlantQueryProcessor()
+    return measure(lambda: [processor.classify_intent(q) for q in QUERIES],
+                   repeat=context['repeat'], operations=len(QUERIES))
+
+
+def bench_rank_results(context) -> Dict:
+    from nlp_search import FloraFindNLPSearch
+    engine = FloraFindNLPSearch(context['db_config'])
+    connection = context['database'].connect()
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(f"SELECT {SEARCH_COLUMNS} FROM plants ORDER BY plant_id LIMIT 20")
+    rows = cursor.fetchall()
+    connection.close()
+    processed = [engine.preprocess_query(q) for q in QUERIES]
+    return measure(lambda: [engine._rank_results(rows, p) for p in processed],
+                   repeat=context['repeat'], operations=len(processed))
+
+
+def bench_weather_compatibility(context) -> Dict:
+    from weather import WeatherData, WeatherIntegration
+    service = WeatherIntegration()
+    weather = WeatherData(temperature=33.0, humidity=82.0, rainfall=120.0, season='monsoon',
+                          air_quality='moderate', wind_speed=12.0, uv_index=9)
+    plants = ['rose', 'tulsi', 'neem', 'snake plant', 'mint', 'unknown plant'] * 50
+    return measure(lambda: [service.analyze_plant_weather_compatibility(p, weather) for p in plants],
+                   repeat=context['repeat'], operations=len(plants))
+
+
+def bench_filter_detection(context) -> Dict:
+    from filters import get_registry
+    registry = get_registry()
+    lemma_lists = [query.lower().split() for query in QUERIES]
+
+    def detect():
+        for query, lemmas in zip(QUERIES, lemma_lists):
+            registry.detect_categories(query)
+            registry.detect_modifiers(lemmas)
+    return measure(detect, repeat=context['repeat'], operations=len(QUERIES))
+
+
+def bench_garden_grouping(context) -> Dict:
+    from app import group_garden_rows
+    results = {}
+    for size in (10, 1000, 10000):
+        rows = garden_rows(size)
+        results[f'plants_{size}'] = measure(lambda: group_garden_rows(rows),
+                                            repeat=max(5, context['repeat'] // 3))
+    return results
+
+
+MICROBENCHMARKS: Dict[str, Callable] = {
+    'preprocess_query': bench_preprocess_query,
+    'classify_intent': bench_classify_intent,
+    'rank_results': bench_rank_results,
+    'weather_compatibility': bench_weather_compatibility,
+    'garden_grouping': bench_garden_grouping,
+    'filter_detection': bench_filter_detection,
+}
+
+
+def run_microbenchmarks(context, selected=None) -> Dict:
+    results = {}
+    for name, bench in MICROBENCHMARKS.items():
+        if selected and name not in selected:
+            continue
+        try:
+            outcome = bench(context)
+        except ImportError as exc:
+            results[name] = {'skipped': f'missing dependency: {exc}'}
+            continue
+        if outcome and all(isinstance(v, dict) for v in outcome.values()):
+            for variant, stats in outcome.items():
+                results[f'{name}.{variant}'] = stats
+        else:
+            results[name] = outcome
+    return results
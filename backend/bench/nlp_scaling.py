@@ -0,0 +1,108 @@
+"""
+Throughput scaling of the NLP worker pool (nlp_pool.py)
+Drives parse() from many client threads, first in-process (one shared model,
+serialised by the GIL) and then through pools of 1..N worker processes, and
+reports parses/second and the speed-up over a single worker.
+
+Uses en_core_web_sm when it is installed. Otherwise it builds a stand-in
+pipeline (tok2vec + tagger, random weights) with a comparable per-token cost,
+so the scaling shape can be measured without downloading a model.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+from bench.harness import summarize
+from bench.micro import QUERIES
+
+
+def _model_path(name: str, workdir: str) -> str:
+    try:
+        import spacy
+    except ImportError:
+        raise RuntimeError('spacy is not installed')
+    try:
+        spacy.load(name)
+        return name
+    except OSError:
+        pass
+    nlp = spacy.blank('en')
+    nlp.add_pipe('tok2vec')
+    tagger = nlp.add_pipe('tagger')
+    for label in ('NOUN', 'VERB', 'ADJ', 'ADP', 'DET', 'PRON'):
+        tagger.add_label(label)
+    nlp.initialize()
+    path = os.path.join(workdir, 'standin_model')
+    nlp.to_disk(path)
+    return path
+
+
+def _drive(parse, clients: int, duration: float) -> Dict:
+    latencies: List[int] = []
+    errors: List[str] = []
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        index = offset
+        while time.perf_counter() < deadline:
+            text = QUERIES[index % len(QUERIES)]
+            index += 1
+            start = time.perf_counter_ns()
+            try:
+                parse(text)
+            except Exception as e:
+                errors.append(type(e).__name__)
+                continue
+            latencies.append(time.perf_counter_ns() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stats = summarize(latencies) if latencies else {}
+    stats.update({
+        'clients': clients,
+        'parses': len(latencies),
+        'errors': len(errors),
+        'parses_per_sec': round(len(latencies) / elapsed, 1),
+    })
+    return stats
+
+
+def run_nlp_scaling(process_levels=(1, 2, 4), clients: int = 16, duration: float = 3.0,
+                    model: str = 'en_core_web_sm', max_batch: int = 16) -> Dict:
+    from nlp_models import get_spacy_model
+    from nlp_pool import NLPWorkerPool
+
+    with tempfile.TemporaryDirectory(prefix='florafind-nlp-') as workdir:
+        try:
+            model_path = _model_path(model, workdir)
+        except RuntimeError as exc:
+            return {'skipped': {'skipped': str(exc)}}
+        results = {'model': {'requested': model, 'used': 'stand-in' if model_path != model else model,
+                             'cpu_count': os.cpu_count()}}
+
+        nlp = get_spacy_model(model_path)
+        results['in_process'] = _drive(nlp, clients, duration)
+
+        for processes in process_levels:
+            pool = NLPWorkerPool(processes, model_name=model_path, max_batch=max_batch)
+            try:
+                pool.warm_up()
+                results[f'p{processes}'] = _drive(lambda text: pool.parse(text, timeout=30), clients, duration)
+            finally:
+                pool.close()
+
+    base = results.get(f'p{process_levels[0]}', {}).get('parses_per_sec')
+    for processes in process_levels:
+        stats = results[f'p{processes}']
+        if base:
+            stats['speedup'] = round(stats['parses_per_sec'] / base, 2)
+            stats['efficiency'] = round(stats['speedup'] / (processes / process_levels[0]), 2)
+    return results
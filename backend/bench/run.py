@@ -0,0 +1,129 @@
+"""
+Benchmark suite entry point
+
+    python -m bench.run                         # seed data, micro + load benchmarks
+    python -m bench.run --plants 100000 --users 1000000
+    python -m bench.run --only micro --bench rank_results
+    python -m bench.run --only nlp --processes 1,2,4,8     # NLP worker pool scaling
+    python -m bench.run --only explain --explain-mysql      # search query plans on MySQL
+    python -m bench.run --only admission                    # /my_garden under a search flood
+    python -m bench.run compare OLD.json NEW.json --threshold 0.1
+
+Runs against a temporary SQLite database seeded from database_data.sql and
+enhanced_care_tips.sql, so no MySQL server or network access is needed.
+Results are written as JSON to bench_results/ for run-to-run comparison.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from bench import fixtures, synthetic  # noqa: E402
+from bench.harness import compare, environment, write_results  # noqa: E402
+
+DEFAULT_OUTPUT = os.path.join(BACKEND_DIR, 'bench_results')
+
+
+def _parse_levels(value: str):
+    return tuple(int(level) for level in value.split(',') if level)
+
+
+def run(args) -> dict:
+    from bench.explain import run_explain
+    from bench.load import run_admission_test, run_load_tests
+    from bench.micro import run_microbenchmarks
+    from bench.nlp_scaling import run_nlp_scaling
+
+    database = fixtures.SQLiteDatabase(args.database)
+    started = time.perf_counter()
+    if not args.database or database.count_tables() == 0:
+        database.load_schema()
+        skipped_rows = database.load_seed_data()
+    else:
+        skipped_rows = 0
+    if args.plants:
+        synthetic.scale_plants(database, args.plants, seed=args.seed)
+        database.update_derived_columns()
+    if args.users:
+        synthetic.scale_users(database, args.users, plants_per_user=args.plants_per_user, seed=args.seed)
+    fixtures.patch_backend(database)
+    setup_seconds = time.perf_counter() - started
+
+    context = {'database': database, 'db_config': {}, 'repeat': args.repeat}
+    results = {
+        'label': args.label,
+        'environment': environment(),
+        'dataset': {
+            'plants': database.count('plants'),
+            'users': database.count('users'),
+            'user_plants': database.count('user_plants'),
+            'skipped_seed_rows': skipped_rows,
+            'setup_seconds': round(setup_seconds, 2),
+        },
+    }
+    try:
+        if args.only in (None, 'micro'):
+            results['micro'] = run_microbenchmarks(context, args.bench)
+        if args.only in (None, 'load'):
+            results['load'] = run_load_tests(_parse_levels(args.concurrency), args.duration, args.bench)
+        if args.only in (None, 'admission'):
+            results['admission'] = run_admission_test(args.duration)
+        if args.only in (None, 'explain'):
+            results['explain'] = run_explain(context, mysql=args.explain_mysql)
+        if args.only == 'nlp':
+            results['nlp'] = run_nlp_scaling(_parse_levels(args.processes), args.nlp_clients,
+                                             args.duration, args.nlp_model)
+    finally:
+        if not args.keep_database:
+            database.remove()
+    return results
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] == 'compare':
+        parser = argparse.ArgumentParser(prog='bench.run compare')
+        parser.add_argument('baseline')
+        parser.add_argument('current')
+        parser.add_argument('--threshold', type=float, default=0.10)
+        parser.add_argument('--metric', default='median_us')
+        args = parser.parse_args(argv[1:])
+        rows = compare(args.baseline, args.current, args.threshold, args.metric)
+        print(json.dumps(rows, indent=2))
+        return 1 if any(row['regression'] for row in rows) else 0
+
+    parser = argparse.ArgumentParser(prog='bench.run')
+    parser.add_argument('--label', default='local')
+    parser.add_argument('--only', choices=['micro', 'load', 'nlp', 'explain', 'admission'])
+    parser.add_argument('--bench', action='append', help='run only the named benchmark/route (repeatable)')
+    parser.add_argument('--plants', type=int, default=0, help='scale the catalog to this many plants')
+    parser.add_argument('--users', type=int, default=0, help='scale users to this many rows')
+    parser.add_argument('--plants-per-user', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--concurrency', default='1,2,4,8,16')
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds per concurrency level')
+    parser.add_argument('--processes', default='1,2,4', help='NLP worker pool sizes for --only nlp')
+    parser.add_argument('--nlp-clients', type=int, default=16, help='concurrent parse callers for --only nlp')
+    parser.add_argument('--nlp-model', default='en_core_web_sm')
+    parser.add_argument('--explain-mysql', action='store_true',
+                        help='record query plans from the configured MySQL database instead of SQLite')
+    parser.add_argument('--database', help='reuse (or create) a SQLite file instead of a temporary one')
+    parser.add_argument('--keep-database', action='store_true')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    path = write_results(results, args.output, args.label)
+    print(json.dumps({'results': path, 'dataset': results['dataset']}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Synthetic catalog and user generator for benchmarks
+Scales the seeded plants table up by cloning seed rows with perturbed attributes,
+and adds users, gardens and care schedules in chunked, reproducible batches
+"""
+
+import datetime
+import random
+import sqlite3
+from typing import Dict, List
+
+from bench.fixtures import SQLiteDatabase
+
+CHUNK_SIZE = 20000
+
+PLANT_COLUMNS = [
+    'name', 'scientific_name', 'season', 'climate', 'care_instructions',
+    'watering_frequency_summer', 'watering_frequency_winter', 'watering_frequency_monsoon',
+    'sunlight_requirement', 'soil_type', 'growth_height', 'growth_time_months',
+    'difficulty_level', 'native_region', 'eco_benefits', 'eco_impact_score',
+    'cultural_significance', 'medicinal_properties', 'care_tips_detailed',
+]
+
+SEASONS = ['summer', 'winter', 'spring', 'monsoon', 'all_seasons', 'spring,summer', 'summer,monsoon']
+DIFFICULTIES = ['beginner', 'intermediate', 'expert']
+SUNLIGHT = ['full_sun', 'partial_shade', 'full_shade']
+TASKS = ['watering', 'fertilizing', 'pruning', 'repotting', 'pest_check']
+VARIETIES = ['Dwarf', 'Giant', 'Golden', 'Wild', 'Royal', 'Alpine', 'Coastal', 'Crimson', 'Silver', 'Sweet']
+
+
+def _seed_plants(database: SQLiteDatabase) -> List[Dict]:
+    with sqlite3.connect(database.path) as raw:
+        raw.row_factory = sqlite3.Row
+        rows = raw.execute(f"SELECT {', '.join(PLANT_COLUMNS)} FROM plants").fetchall()
+    return [dict(row) for row in rows]
+
+
+def _insert_chunks(database: SQLiteDatabase, sql: str, rows):
+    with sqlite3.connect(database.path) as raw:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                raw.executemany(sql, chunk)
+                chunk = []
+        if chunk:
+            raw.executemany(sql, chunk)
+
+
+def scale_plants(database: SQLiteDatabase, target: int, seed: int = 42):
+    """Grow the plants table to `target` rows by cloning and perturbing seed plants"""
+    templates = _seed_plants(database)
+    existing = database.count('plants')
+    if not templates or existing >= target:
+        return
+    rng = random.Random(seed)
+
+    def rows():
+        for i in range(existing, target):
+            plant = dict(rng.choice(templates))
+            plant['name'] = f"{rng.choice(VARIETIES)} {plant['name']} {i}"
+            plant['season'] = rng.choice(SEASONS)
+            plant['difficulty_level'] = rng.choice(DIFFICULTIES)
+            plant['sunlight_requirement'] = rng.choice(SUNLIGHT)
+            plant['eco_impact_score'] = rng.randint(1, 10)
+            plant['watering_frequency_summer'] = rng.randint(1, 7)
+            plant['watering_frequency_winter'] = rng.randint(3, 14)
+            plant['watering_frequency_monsoon'] = rng.randint(2, 10)
+            yield tuple(plant[column] for column in PLANT_COLUMNS)
+
+    placeholders = ', '.join('?' for _ in PLANT_COLUMNS)
+    _insert_chunks(database, f"INSERT INTO plants ({', '.join(PLANT_COLUMNS)}) VALUES ({placeholders})", rows())
+
+
+def scale_users(database: SQLiteDatabase, target: int, plants_per_user: float = 2.0, seed: int = 42):
+    """Grow users to `target` rows and give each a garden of roughly `plants_per_user` plants"""
+    existing = database.count('users')
+    if existing >= target:
+        return
+    plant_count = database.count('plants')
+    rng = random.Random(seed)
+    today = datetime.date.today()
+
+    _insert_chunks(
+        database,
+        "INSERT INTO users (username, password, location, plant_health_points, level) VALUES (?, ?, ?, ?, ?)",
+        ((f'user{i}', 'x', rng.choice(['Mumbai, India', 'Delhi, India', 'Bangalore, India']),
+          rng.randint(0, 5000), rng.randint(1, 10)) for i in range(existing, target)),
+    )
+
+    with sqlite3.connect(database.path) as raw:
+        first_user = raw.execute('SELECT MIN(user_id) FROM users WHERE user_id > ?', (existing,)).fetchone()[0]
+        next_user_plant = (raw.execute('SELECT MAX(user_plant_id) FROM user_plants').fetchone()[0] or 0) + 1
+    if first_user is None:
+        return
+
+    garden, schedules = [], []
+
+    def flush():
+        with sqlite3.connect(database.path) as raw:
+            raw.executemany(
+                "INSERT INTO user_plants (user_plant_id, user_id, plant_id, date_planted, location_in_garden, "
+                "current_health_score) VALUES (?, ?, ?, ?, ?, ?)", garden)
+            raw.executemany(
+                "INSERT INTO care_schedules (user_plant_id, task_type, frequency_days, next_due_date) "
+                "VALUES (?, ?, ?, ?)", schedules)
+        garden.clear()
+        schedules.clear()
+
+    for user_id in range(first_user, first_user + (target - existing)):
+        for plant_id in rng.sample(range(1, plant_count + 1), min(plant_count, max(0, int(rng.expovariate(1 / plants_per_user))))):
+            garden.append((next_user_plant, user_id, plant_id, today - datetime.timedelta(days=rng.randint(0, 720)),
+                           'garden', rng.randint(40, 100)))
+            schedules.append((next_user_plant, rng.choice(TASKS), rng.choice([2, 3, 7, 30]),
+                              today + datetime.timedelta(days=rng.randint(-10, 30))))
+            next_user_plant += 1
+        if len(garden) >= CHUNK_SIZE:
+            flush()
+    flush()
+
+
+def garden_rows(plant_count: int, schedules_per_plant: int = 2, seed: int = 7) -> List[Dict]:
+    """Rows shaped like the /my_garden join, for grouping microbenchmarks"""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    rows = []
+    for user_plant_id in range(1, plant_count + 1):
+        for task in rng.sample(TASKS, schedules_per_plant):
+            rows.append({
+                'user_plant_id': user_plant_id, 'plant_nickname': None, 'location_in_garden': 'balcony',
+                'date_planted': today, 'current_health_score': rng.randint(40, 100), 'notes': None,
+                'plant_id': rng.randint(1, 500), 'name': f'Plant {user_plant_id}', 'scientific_name': 'Planta',
+                'eco_impact_score': rng.randint(1, 10), 'task_type': task,
+                'next_due_date': today + datetime.timedelta(days=rng.randint(-5, 20)), 'frequency_days': 3,
+            })
+    return rows
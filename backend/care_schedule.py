@@ -0,0 +1,279 @@
+"""
+Care schedule engine for FloraFind
+Derives each care task's frequency from the plant's own data (plants.watering_
+frequency_summer/winter/monsoon), the current season, any per-schedule
+override in care_schedules.seasonal_adjustment and, optionally, cached
+weather for the gardener's location. Whole sets of schedules are recomputed
+in one numpy pass; the care_rebalance job applies season transitions to every
+schedule in batches overnight.
+
+    python jobs.py run care_rebalance
+"""
+
+import datetime
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+import db
+import jobs
+from structured_logging import get_logger
+
+logger = get_logger('care_schedule')
+
+REBALANCE_JOB = 'care_rebalance'
+
+# The seasons plants carry watering frequencies for, by month
+SEASONS = ('summer', 'monsoon', 'winter')
+SEASON_BY_MONTH = {
+    1: 'winter', 2: 'winter', 3: 'summer', 4: 'summer', 5: 'summer', 6: 'summer',
+    7: 'monsoon', 8: 'monsoon', 9: 'monsoon', 10: 'winter', 11: 'winter', 12: 'winter',
+}
+
+# Days between tasks when the plant has no data of its own
+TASK_FREQUENCIES = {'watering': 3, 'fertilizing': 30, 'pruning': 90, 'repotting': 365, 'pest_check': 14}
+DEFAULT_FREQUENCY = 7
+# Seasonal stretch (>1) or squeeze (<1) of the default frequencies
+SEASONAL_FACTORS = {
+    'fertilizing': {'winter': 2.0},
+    'pest_check': {'monsoon': 0.5},
+}
+MIN_FREQUENCY, MAX_FREQUENCY = 1, 365
+
+SCHEDULE_COLUMNS = """
+    SELECT cs.schedule_id, cs.task_type, cs.frequency_days, cs.next_due_date, cs.seasonal_adjustment,
+           p.watering_frequency_summer, p.watering_frequency_monsoon, p.watering_frequency_winter,
+           u.location
+    FROM care_schedules cs
+    JOIN user_plants up ON cs.user_plant_id = up.user_plant_id
+    JOIN plants p ON up.plant_id = p.plant_id
+    JOIN users u ON up.user_id = u.user_id
+"""
+USER_SCHEDULES = SCHEDULE_COLUMNS + " WHERE up.user_id = %s AND cs.is_active"
+SCHEDULE_BATCH = SCHEDULE_COLUMNS + " WHERE cs.schedule_id > %s AND cs.is_active ORDER BY cs.schedule_id LIMIT %s"
+PLANT_FREQUENCIES = """
+    SELECT plant_id, watering_frequency_summer, watering_frequency_monsoon, watering_frequency_winter
+    FROM plants WHERE plant_id IN ({})
+"""
+UPDATE_SCHEDULE = "UPDATE care_schedules SET frequency_days = %s, next_due_date = %s WHERE schedule_id = %s"
+
+
+def season_for(day: Optional[datetime.date] = None) -> str:
+    return SEASON_BY_MONTH[(day or datetime.date.today()).month]
+
+
+def season_start(day: Optional[datetime.date] = None) -> datetime.date:
+    """First day of the season `day` falls in"""
+    day = day or datetime.date.today()
+    season = season_for(day)
+    year, month = day.year, day.month
+    for _ in range(11):
+        previous_year, previous_month = (year, month - 1) if month > 1 else (year - 1, 12)
+        if SEASON_BY_MONTH[previous_month] != season:
+            break
+        year, month = previous_year, previous_month
+    return datetime.date(year, month, 1)
+
+
+# Weather
+
+_weather_cache: Dict[str, Tuple[float, float]] = {}
+_weather_lock = threading.Lock()
+
+
+def weather_factor(location: Optional[str]) -> float:
+    """Watering interval multiplier for the weather at `location` (1.0 when disabled or unknown)"""
+    if not config.CARE_WEATHER_ADJUST or not location:
+        return 1.0
+    key = location.strip().lower()
+    now = time.monotonic()
+    cached = _weather_cache.get(key)
+    if cached and now - cached[1] < config.CARE_WEATHER_CACHE_SECONDS:
+        return cached[0]
+
+    from weather import WeatherIntegration
+    factor = 1.0
+    weather = WeatherIntegration().get_weather_data(location)
+    if weather:
+        if weather.rainfall > 100:
+            factor *= 1.5   # the rain does the watering
+        if weather.temperature > 35:
+            factor *= 0.75
+        if weather.humidity > 85:
+            factor *= 1.25
+    with _weather_lock:
+        _weather_cache[key] = (factor, now)
+    return factor
+
+
+# Computation
+
+def _column(rows: Sequence[Dict], key: str) -> np.ndarray:
+    return np.array([np.nan if row.get(key) is None else float(row[key]) for row in rows], dtype=float)
+
+
+def _adjustments(rows: Sequence[Dict], season: str) -> np.ndarray:
+    """Per-schedule overrides for `season` from care_schedules.seasonal_adjustment ({"summer": 2, ...})"""
+    overrides = np.full(len(rows), np.nan)
+    for index, row in enumerate(rows):
+        adjustment = row.get('seasonal_adjustment')
+        if isinstance(adjustment, (str, bytes)):
+            try:
+                adjustment = json.loads(adjustment)
+            except ValueError:
+                adjustment = None
+        if isinstance(adjustment, dict) and isinstance(adjustment.get(season), (int, float)):
+            overrides[index] = adjustment[season]
+    return overrides
+
+
+def compute_frequencies(rows: Sequence[Dict], season: Optional[str] = None,
+                        weather: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Days between tasks for each row (task_type, the plant's watering_frequency_* and seasonal_adjustment)"""
+    season = season or season_for()
+    tasks = np.array([row.get('task_type') or 'watering' for row in rows], dtype=object)
+
+    frequencies = np.array([TASK_FREQUENCIES.get(task, DEFAULT_FREQUENCY) for task in tasks], dtype=float)
+    for task, factors in SEASONAL_FACTORS.items():
+        frequencies[tasks == task] *= factors.get(season, 1.0)
+
+    # Watering follows the plant's frequency for this season, else the first other season it has
+    plant_frequency = _column(rows, f'watering_frequency_{season}')
+    for other in SEASONS:
+        plant_frequency = np.where(np.isnan(plant_frequency), _column(rows, f'watering_frequency_{other}'), plant_frequency)
+    watering = (tasks == 'watering') & ~np.isnan(plant_frequency)
+    frequencies[watering] = plant_frequency[watering]
+    if weather is not None:
+        frequencies[tasks == 'watering'] *= np.asarray(weather, dtype=float)[tasks == 'watering']
+
+    overrides = _adjustments(rows, season)
+    frequencies = np.where(np.isnan(overrides), frequencies, overrides)
+    return np.clip(np.rint(frequencies), MIN_FREQUENCY, MAX_FREQUENCY).astype(int)
+
+
+def frequency_days(task_type: str, plant: Optional[Dict] = None, season: Optional[str] = None,
+                   seasonal_adjustment=None, location: Optional[str] = None) -> int:
+    row = dict(plant or {}, task_type=task_type, seasonal_adjustment=seasonal_adjustment)
+    return int(compute_frequencies([row], season, [weather_factor(location)])[0])
+
+
+def _as_date(value) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def reschedule(rows: Sequence[Dict], season: Optional[str] = None) -> List[Tuple[int, datetime.date, int]]:
+    """(frequency_days, next_due_date, schedule_id) for each row whose frequency changes.
+
+    The last completion is next_due_date - frequency_days, so a shorter
+    frequency pulls the due date in and a longer one pushes it out.
+    """
+    if not rows:
+        return []
+    factors = {}
+    for row in rows:
+        if row.get('location') not in factors:
+            factors[row.get('location')] = weather_factor(row.get('location'))
+    weather = [factors[row.get('location')] for row in rows]
+    frequencies = compute_frequencies(rows, season, weather)
+    current = np.array([row['frequency_days'] for row in rows], dtype=int)
+    due = np.array([_as_date(row['next_due_date']) for row in rows], dtype='datetime64[D]')
+    new_due = due - current.astype('timedelta64[D]') + frequencies.astype('timedelta64[D]')
+
+    changed = np.flatnonzero(frequencies != current)
+    return [(int(frequencies[i]), new_due[i].item(), rows[i]['schedule_id']) for i in changed]
+
+
+def plant_frequencies(cursor, plant_ids: Iterable[int]) -> Dict[int, Dict]:
+    """plant_id -> the plant's watering_frequency_* columns"""
+    plant_ids = sorted(set(plant_ids))
+    if not plant_ids:
+        return {}
+    cursor.execute(PLANT_FREQUENCIES.format(', '.join(['%s'] * len(plant_ids))), plant_ids)
+    columns = ('plant_id',) + tuple(f'watering_frequency_{season}' for season in SEASONS)
+    plants = {}
+    for row in cursor.fetchall():
+        row = row if isinstance(row, dict) else dict(zip(columns, row))
+        plants[row['plant_id']] = row
+    return plants
+
+
+def initial_schedules(cursor, plant_ids: Sequence[int], task_type: str = 'watering',
+                      today: Optional[datetime.date] = None) -> List[Tuple[int, datetime.date]]:
+    """(frequency_days, next_due_date) of a new `task_type` schedule for each plant in `plant_ids`"""
+    today = today or datetime.date.today()
+    plants = plant_frequencies(cursor, plant_ids)
+    frequencies = compute_frequencies([dict(plants.get(plant_id, {}), task_type=task_type) for plant_id in plant_ids])
+    return [(int(days), today + datetime.timedelta(days=int(days))) for days in frequencies]
+
+
+def rebalance_user(user_id: int, season: Optional[str] = None) -> int:
+    """Recompute every active schedule in a user's garden; returns the schedules changed"""
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(USER_SCHEDULES, (user_id,))
+        changes = reschedule(cursor.fetchall(), season)
+        if changes:
+            cursor.executemany(UPDATE_SCHEDULE, changes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    logger.info("schedules_rebalanced", user_id=user_id, updated=len(changes))
+    return len(changes)
+
+
+def _season_marker(day: datetime.date) -> int:
+    return season_start(day).toordinal()
+
+
+@jobs.register(REBALANCE_JOB, interval_seconds=86400)
+def rebalance_all(force: bool = False) -> Dict:
+    """Re-derive every care schedule when the season turns (nightly with weather adjustment on)"""
+    today = datetime.date.today()
+    season = season_for(today)
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # The watermark holds the start of the last season applied, as a day ordinal
+        applied = jobs.get_watermark(cursor, REBALANCE_JOB)
+        marker = _season_marker(today)
+        conn.commit()
+        if applied >= marker and not force and not config.CARE_WEATHER_ADJUST:
+            return {'season': season, 'scanned': 0, 'updated': 0}
+
+        scanned = updated = last_id = 0
+        while True:
+            cursor.execute(SCHEDULE_BATCH, (last_id, config.CARE_REBALANCE_BATCH_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            changes = reschedule(rows, season)
+            if changes:
+                cursor.executemany(UPDATE_SCHEDULE, changes)
+            conn.commit()
+            scanned += len(rows)
+            updated += len(changes)
+            last_id = rows[-1]['schedule_id']
+
+        if applied < marker:
+            jobs.advance_watermark(cursor, REBALANCE_JOB, applied, marker)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {'season': season, 'scanned': scanned, 'updated': updated}
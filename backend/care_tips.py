@@ -0,0 +1,266 @@
+"""
+Care tips for FloraFind
+plants.care_tips_detailed is a JSON object of sections ("summer", "general",
+"indoor_care", ...) mapping a category to advice. It is parsed once per plant
+version (updated_at) into PlantCareTips and held in a per-worker index, next to
+quick_care_tips (enhanced_care_tips.sql) keyed by (plant_name, season,
+tip_category, is_urgent). Search results and the care calendar carry only the
+current season's slice, and /tips serves any season on request.
+
+quick_care_tips rows name either a plant or a group ("Beginner Plants",
+"Indoor Plants", ...); a plant gets the tips for its own name and every group
+it belongs to, and season 'all' applies in every season.
+"""
+
+import datetime
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import config
+import db
+import metrics
+import periodic
+from structured_logging import get_logger
+
+logger = get_logger('care_tips')
+
+SEASONS = ('spring', 'summer', 'monsoon', 'autumn', 'winter')
+# The care tips season of each month; every one falls inside a single care_schedule watering season
+SEASON_BY_MONTH = {
+    1: 'winter', 2: 'winter', 3: 'spring', 4: 'spring', 5: 'summer', 6: 'summer',
+    7: 'monsoon', 8: 'monsoon', 9: 'monsoon', 10: 'autumn', 11: 'autumn', 12: 'winter',
+}
+ALL_SEASONS = 'all'
+CATEGORIES = ('watering', 'fertilizing', 'pruning', 'pest_control', 'general', 'harvesting')
+# quick_care_tips group names and which plants they cover
+GROUPS: Dict[str, Callable[[Dict], bool]] = {
+    'all plants': lambda plant: True,
+    'beginner plants': lambda plant: plant['difficulty_level'] == 'beginner',
+    'indoor plants': lambda plant: bool(plant['is_indoor']),
+    'summer plants': lambda plant: 'summer' in (plant['season'] or '').lower(),
+    'medicinal plants': lambda plant: bool(plant['is_medicinal']),
+}
+DETAIL_CHUNK = 500
+
+PLANT_VERSIONS = """
+    SELECT plant_id, name, updated_at, difficulty_level, season, is_indoor, is_medicinal
+    FROM plants ORDER BY plant_id
+"""
+PLANT_DETAILS = "SELECT plant_id, care_tips_detailed FROM plants WHERE plant_id IN ({})"
+QUICK_TIPS = """
+    SELECT tip_id, plant_name, season, tip_category, tip_text, difficulty_level, is_urgent
+    FROM quick_care_tips ORDER BY tip_id
+"""
+
+
+def season_for(day: Optional[datetime.date] = None) -> str:
+    return SEASON_BY_MONTH[(day or datetime.date.today()).month]
+
+
+@dataclass(frozen=True)
+class CareTip:
+    section: str     # the care_tips_detailed key it came from: a season, "general", "propagation", ...
+    category: str    # "watering", "care", "light", ...
+    text: str
+
+
+@dataclass
+class PlantCareTips:
+    plant_id: int
+    version: Optional[str]
+    seasonal: Dict[str, List[CareTip]] = field(default_factory=dict)
+    general: List[CareTip] = field(default_factory=list)
+
+    def for_season(self, season: str) -> Dict[str, str]:
+        """{category: advice} for `season`: the season's own section over the general ones"""
+        advice = {tip.category: tip.text for tip in self.general}
+        advice.update((tip.category, tip.text) for tip in self.seasonal.get(season, []))
+        return advice
+
+    def to_dict(self) -> Dict:
+        return {
+            "seasons": {season: {tip.category: tip.text for tip in tips} for season, tips in self.seasonal.items()},
+            "general": [{"section": tip.section, "category": tip.category, "text": tip.text} for tip in self.general],
+        }
+
+
+@dataclass(frozen=True)
+class QuickTip:
+    tip_id: int
+    plant_name: str
+    season: str
+    category: str
+    text: str
+    difficulty: Optional[str]
+    urgent: bool
+
+    def to_dict(self) -> Dict:
+        return {"category": self.category, "text": self.text, "season": self.season,
+                "difficulty": self.difficulty, "urgent": self.urgent}
+
+
+def _text(value) -> str:
+    if isinstance(value, dict):
+        return '; '.join(f"{key}: {_text(item)}" for key, item in value.items())
+    if isinstance(value, list):
+        return '; '.join(_text(item) for item in value)
+    return str(value)
+
+
+def parse_detailed(plant_id: int, raw, version: Optional[str] = None) -> PlantCareTips:
+    """PlantCareTips from a care_tips_detailed value (JSON text, bytes, a dict, or NULL)"""
+    tips = PlantCareTips(plant_id, version)
+    if raw is None or raw == '':
+        return tips
+    try:
+        document = json.loads(raw) if isinstance(raw, (str, bytes, bytearray)) else raw
+    except ValueError as e:
+        logger.warning("care_tips_invalid_json", plant_id=plant_id, error=str(e))
+        return tips
+    if not isinstance(document, dict):
+        return tips
+    for section, entries in document.items():
+        section = str(section).lower()
+        if not isinstance(entries, dict):
+            entries = {'general': entries}
+        for category, text in entries.items():
+            category = str(category).lower()
+            if section in SEASONS:
+                tips.seasonal.setdefault(section, []).append(CareTip(section, category, _text(text)))
+            elif category in SEASONS:
+                # {"seasonal": {"winter": "protect from frost"}}: advice for that season
+                tips.seasonal.setdefault(category, []).append(CareTip(section, 'general', _text(text)))
+            else:
+                tips.general.append(CareTip(section, category, _text(text)))
+    return tips
+
+
+class QuickTipIndex:
+    """quick_care_tips by (plant_name, season, tip_category, is_urgent); names are lowercased"""
+
+    def __init__(self, rows: Iterable[Dict] = ()):
+        self._tips: Dict[Tuple[str, str, str, bool], List[QuickTip]] = {}
+        for row in rows:
+            tip = QuickTip(row['tip_id'], row['plant_name'] or '', row['season'] or ALL_SEASONS,
+                           row['tip_category'] or 'general', row['tip_text'] or '',
+                           row['difficulty_level'], bool(row['is_urgent']))
+            key = (tip.plant_name.lower(), tip.season, tip.category, tip.urgent)
+            self._tips.setdefault(key, []).append(tip)
+
+    def __len__(self):
+        return sum(len(tips) for tips in self._tips.values())
+
+    def find(self, plant_names: Iterable[str], season: str, category: Optional[str] = None,
+             urgent: Optional[bool] = None) -> List[QuickTip]:
+        """Tips for any of `plant_names` in `season` (season-wide ones included), urgent first"""
+        seasons = (season,) if season == ALL_SEASONS else (season, ALL_SEASONS)
+        categories = (category,) if category else CATEGORIES
+        flags = (urgent,) if urgent is not None else (True, False)
+        return [tip
+                for flag in flags
+                for name in plant_names
+                for tip_season in seasons
+                for tip_category in categories
+                for tip in self._tips.get((name.lower(), tip_season, tip_category, flag), ())]
+
+
+@dataclass
+class CareTipsIndex:
+    plants: Dict[int, PlantCareTips] = field(default_factory=dict)
+    groups: Dict[int, Tuple[str, ...]] = field(default_factory=dict)   # plant_id -> names its quick tips are under
+    quick: QuickTipIndex = field(default_factory=QuickTipIndex)
+
+    def plant(self, plant_id: int) -> Optional[PlantCareTips]:
+        return self.plants.get(plant_id)
+
+    def quick_tips(self, plant_id: Optional[int], season: str, category: Optional[str] = None,
+                   urgent: Optional[bool] = None) -> List[QuickTip]:
+        names = self.groups.get(plant_id, ('all plants',)) if plant_id is not None else ('all plants',)
+        return self.quick.find(names, season, category, urgent)
+
+    def season_slice(self, plant_id: int, season: Optional[str] = None) -> Dict:
+        """What search results and the calendar carry: one season's advice and quick tips"""
+        season = season or season_for()
+        tips = self.plants.get(plant_id)
+        return {
+            "season": season,
+            "tips": tips.for_season(season) if tips else {},
+            "quick_tips": [tip.to_dict() for tip in self.quick_tips(plant_id, season)],
+        }
+
+
+def _version(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _load(cursor, previous: Optional[CareTipsIndex]) -> Tuple[CareTipsIndex, int]:
+    """A new index, reusing `previous`'s parsed tips for plants whose updated_at has not moved"""
+    index = CareTipsIndex()
+    cursor.execute(PLANT_VERSIONS)
+    stale = []
+    for row in cursor.fetchall():
+        plant_id, version = row['plant_id'], _version(row['updated_at'])
+        known = previous.plants.get(plant_id) if previous else None
+        if known is not None and known.version == version:
+            index.plants[plant_id] = known
+        else:
+            stale.append((plant_id, version))
+        index.groups[plant_id] = (row['name'].lower(),) + tuple(name for name, covers in GROUPS.items() if covers(row))
+
+    versions = dict(stale)
+    ids = list(versions)
+    for start in range(0, len(ids), DETAIL_CHUNK):
+        chunk = ids[start:start + DETAIL_CHUNK]
+        cursor.execute(PLANT_DETAILS.format(', '.join(['%s'] * len(chunk))), chunk)
+        for row in cursor.fetchall():
+            index.plants[row['plant_id']] = parse_detailed(row['plant_id'], row['care_tips_detailed'],
+                                                           versions[row['plant_id']])
+
+    try:
+        cursor.execute(QUICK_TIPS)
+        index.quick = QuickTipIndex(cursor.fetchall())
+    except Exception as e:
+        # quick_care_tips comes from enhanced_care_tips.sql, which not every install has applied
+        logger.warning("quick_care_tips_unavailable", error=str(e))
+    return index, len(stale)
+
+
+_index: Optional[CareTipsIndex] = None
+_lock = threading.Lock()
+
+
+def refresh() -> CareTipsIndex:
+    """Reload care tips, parsing care_tips_detailed only for plants changed since the last load"""
+    global _index
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        index, parsed = _load(cursor, _index)
+    finally:
+        cursor.close()
+        conn.close()
+    with _lock:
+        _index = index
+    logger.info("care_tips_loaded", plants=len(index.plants), parsed=parsed, quick_tips=len(index.quick))
+    return index
+
+
+def get_index() -> CareTipsIndex:
+    """The current index, loading it on first use"""
+    index = _index
+    metrics.record_cache('care_tips', index is not None)
+    if index is None:
+        index = refresh()
+    return index
+
+
+def current_index() -> Optional[CareTipsIndex]:
+    """The loaded index, or None; never touches the database"""
+    return _index
+
+
+def start_refresher():
+    """Reload care tips every FLORAFIND_CARE_TIPS_REFRESH seconds in this process"""
+    return periodic.start_task('care_tips', config.CARE_TIPS_REFRESH_SECONDS, refresh)
@@ -0,0 +1,164 @@
+"""
+In-memory plant catalog index for FloraFind
+Holds the lightweight identity columns of every plant (id, names) so lookups by
+id or name do not need a database round trip, plus one bitset per search filter
+(filters.py) over the catalog so filter combinations can be evaluated in memory
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+import db
+import filters
+import metrics
+import similarity
+import periodic
+from structured_logging import get_logger
+
+logger = get_logger('catalog')
+
+# Newest plant and newest change; a catalog loaded since then still matches the table
+CATALOG_VERSION = "SELECT MAX(plant_id) AS last_id, MAX(updated_at) AS last_updated FROM plants"
+
+
+@dataclass
+class CatalogEntry:
+    plant_id: int
+    name: str
+    scientific_name: Optional[str]
+    updated_at: Optional[object] = None
+
+
+def _version(last_id, last_updated) -> Tuple:
+    return (last_id, None if last_updated is None else str(last_updated))
+
+
+@dataclass
+class PlantCatalog:
+    entries: List[CatalogEntry] = field(default_factory=list)
+    by_id: Dict[int, CatalogEntry] = field(default_factory=dict)
+    by_name: Dict[str, CatalogEntry] = field(default_factory=dict)
+    filter_bits: Dict[str, int] = field(default_factory=dict)
+    loaded_at: float = 0.0
+    version: Tuple = (None, None)   # (last plant_id, last updated_at as text), as matches() compares them
+    _name_index: Optional[tuple] = field(default=None, repr=False)
+
+    @classmethod
+    def from_rows(cls, rows) -> 'PlantCatalog':
+        """Build from dict rows holding plant_id, name, scientific_name, updated_at and the registry's filter columns"""
+        catalog = cls(loaded_at=time.time())
+        for row in rows:
+            plant_id, name, scientific_name = row['plant_id'], row['name'], row['scientific_name']
+            entry = CatalogEntry(plant_id, name, scientific_name, row.get('updated_at'))
+            catalog.entries.append(entry)
+            catalog.by_id[plant_id] = entry
+            catalog.by_name.setdefault(name.lower(), entry)
+            if scientific_name:
+                catalog.by_name.setdefault(scientific_name.lower(), entry)
+        catalog.filter_bits = filters.get_registry().bitsets(rows)
+        if catalog.entries:
+            catalog.version = _version(max(catalog.by_id), max((entry.updated_at for entry in catalog.entries
+                                                                 if entry.updated_at is not None), default=None))
+        return catalog
+
+    def get(self, plant_id: int) -> Optional[CatalogEntry]:
+        return self.by_id.get(plant_id)
+
+    def find_by_name(self, name: str) -> Optional[CatalogEntry]:
+        return self.by_name.get(name.strip().lower())
+
+    def name_index(self):
+        """(ChoiceIndex over every name and scientific name, the entry for each choice), built on first use"""
+        if self._name_index is None:
+            names, owners = [], []
+            for entry in self.entries:
+                for name in (entry.name, entry.scientific_name):
+                    if name:
+                        names.append(name)
+                        owners.append(entry)
+            self._name_index = (similarity.ChoiceIndex(names), owners)
+        return self._name_index
+
+    def filter_matches(self, categories=(), modifiers=()) -> List[CatalogEntry]:
+        """Plants passing the category and modifier filters"""
+        selected = filters.get_registry().select(self.filter_bits, len(self.entries), categories, modifiers)
+        return [entry for index, entry in enumerate(self.entries) if selected >> index & 1]
+
+    def any_filter_match(self, categories=(), modifiers=()) -> bool:
+        return filters.get_registry().select(self.filter_bits, len(self.entries), categories, modifiers) != 0
+
+    def matches(self, row) -> bool:
+        """Whether a CATALOG_VERSION row shows no plant added or changed since this catalog was loaded"""
+        if row is None:
+            return False
+        last_id, last_updated = (row['last_id'], row['last_updated']) if isinstance(row, dict) else row
+        return _version(last_id, last_updated) == self.version
+
+
+_catalog: Optional[PlantCatalog] = None
+_lock = threading.Lock()
+_reload_listeners: List[Callable[[Optional[PlantCatalog], PlantCatalog], None]] = []
+
+
+def add_reload_listener(listener: Callable[[Optional[PlantCatalog], PlantCatalog], None]):
+    """Call listener(previous, current) after every load (previous is None on the first)"""
+    _reload_listeners.append(listener)
+
+
+def load_catalog() -> PlantCatalog:
+    """Read the catalog from the database and make it current"""
+    global _catalog
+    columns = ['plant_id', 'name', 'scientific_name', 'updated_at']
+    columns += [column for column in filters.get_registry().columns if column not in columns]
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT {', '.join(columns)} FROM plants ORDER BY plant_id")
+        catalog = PlantCatalog.from_rows(cursor.fetchall())
+        cursor.close()
+    finally:
+        conn.close()
+    with _lock:
+        previous, _catalog = _catalog, catalog
+    logger.info("catalog_loaded", plants=len(catalog.entries))
+    for listener in _reload_listeners:
+        try:
+            listener(previous, catalog)
+        except Exception as e:
+            logger.exception("catalog_listener_failed", error=str(e))
+    return catalog
+
+
+def get_catalog() -> PlantCatalog:
+    """Return the current catalog, loading it on first use"""
+    catalog = _catalog
+    metrics.record_cache('catalog', catalog is not None)
+    if catalog is None:
+        catalog = load_catalog()
+    return catalog
+
+
+def current_catalog() -> Optional[PlantCatalog]:
+    """The loaded catalog, or None; never touches the database"""
+    return _catalog
+
+
+def is_current(catalog: PlantCatalog) -> bool:
+    """Whether `catalog` still matches the plants table (one query on the plant_id and updated_at indexes)"""
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(CATALOG_VERSION)
+        row = cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+    return catalog.matches(row)
+
+
+def start_refresher():
+    """Reload the catalog every FLORAFIND_CATALOG_REFRESH seconds in this process"""
+    return periodic.start_task('catalog', config.CATALOG_REFRESH_SECONDS, load_catalog)
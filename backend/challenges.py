@@ -0,0 +1,307 @@
+"""
+Challenge scoring for FloraFind
+Scores every participation in the running challenges from care_activities and
+user_plants: care_streak is the longest run of consecutive care days inside the
+challenge window, eco_impact the eco_impact_score of plants planted during it,
+and growth the centimetres measured in submission_data (or, without
+measurements, care tasks on the entered plant weighted by its health).
+photo_contest scores are judged, not computed, and are only ranked. Rankings
+are assigned with RANK() in one pass over every affected challenge and stored,
+so /community/challenges/<id>/standings is an index read.
+
+The challenge_scoring job runs incrementally: it rescores only the participants
+with care activity or new plants since its watermarks, plus participations not
+yet ranked. challenge_rescore rescores everything once a day.
+
+    python jobs.py run challenge_scoring
+"""
+
+import datetime
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+import config
+import db
+import jobs
+import pagination
+from structured_logging import get_logger
+
+logger = get_logger('challenges')
+
+SCORING_JOB = 'challenge_scoring'
+PLANTS_WATERMARK = 'challenge_scoring_plants'  # user_plants consumed, next to SCORING_JOB's care_activities
+RESCORE_JOB = 'challenge_rescore'
+
+# Challenges still scored this many days after they end, so the last day's care counts
+SCORING_GRACE_DAYS = 1
+# Past this many active users in one run, whole challenges are rescored instead
+MAX_INCREMENTAL_USERS = 1000
+
+RUNNING_CHALLENGES = """
+    SELECT challenge_id, challenge_type, start_date, end_date, participation_requirements
+    FROM plant_challenges
+    WHERE is_active AND start_date <= %s AND end_date >= %s
+"""
+# A participation covers the plant it entered, or the user's whole garden when it entered none
+PARTICIPANT_PLANTS = """
+    FROM challenge_participations cp
+    JOIN user_plants up ON up.user_id = cp.user_id
+                       AND (cp.user_plant_id IS NULL OR up.user_plant_id = cp.user_plant_id)
+"""
+CARE_DAYS = """
+    SELECT cp.participation_id, ca.completed_date
+""" + PARTICIPANT_PLANTS + """
+    JOIN care_activities ca ON ca.user_plant_id = up.user_plant_id
+    WHERE cp.challenge_id = %s AND ca.completed_date BETWEEN %s AND %s {scope}
+    GROUP BY cp.participation_id, ca.completed_date
+    ORDER BY cp.participation_id, ca.completed_date
+"""
+ECO_SCORES = """
+    SELECT cp.participation_id, COALESCE(SUM(p.eco_impact_score), 0) AS score
+""" + PARTICIPANT_PLANTS + """
+    JOIN plants p ON p.plant_id = up.plant_id
+    WHERE cp.challenge_id = %s AND up.date_planted BETWEEN %s AND %s AND p.eco_impact_score >= %s {scope}
+    GROUP BY cp.participation_id
+"""
+CARE_EFFORT = """
+    SELECT cp.participation_id, COUNT(ca.activity_id) AS tasks, AVG(up.current_health_score) AS health
+""" + PARTICIPANT_PLANTS + """
+    JOIN care_activities ca ON ca.user_plant_id = up.user_plant_id
+    WHERE cp.challenge_id = %s AND ca.completed_date BETWEEN %s AND %s {scope}
+    GROUP BY cp.participation_id
+"""
+PARTICIPATIONS = """
+    SELECT participation_id, score, submission_data FROM challenge_participations cp
+    WHERE cp.challenge_id = %s {scope}
+"""
+RANKINGS = """
+    SELECT participation_id, ranking,
+           RANK() OVER (PARTITION BY challenge_id ORDER BY score DESC) AS new_ranking
+    FROM challenge_participations
+    WHERE challenge_id IN ({})
+"""
+UPDATE_SCORE = "UPDATE challenge_participations SET score = %s WHERE participation_id = %s"
+UPDATE_RANKING = "UPDATE challenge_participations SET ranking = %s WHERE participation_id = %s"
+
+CHALLENGE_SUMMARY = """
+    SELECT challenge_id, title, challenge_type, start_date, end_date
+    FROM plant_challenges WHERE challenge_id = %s
+"""
+STANDINGS_PAGE = """
+    SELECT cp.participation_id, cp.ranking, cp.score, cp.user_id, u.username
+    FROM challenge_participations cp
+    JOIN users u ON u.user_id = cp.user_id
+    WHERE cp.challenge_id = %s AND cp.ranking IS NOT NULL
+      AND (cp.ranking > %s OR (cp.ranking = %s AND cp.participation_id > %s))
+    ORDER BY cp.ranking, cp.participation_id
+    LIMIT %s
+"""
+
+
+def _requirements(challenge: Dict) -> Dict:
+    requirements = challenge.get('participation_requirements')
+    if isinstance(requirements, (str, bytes)):
+        try:
+            requirements = json.loads(requirements)
+        except ValueError:
+            requirements = None
+    return requirements if isinstance(requirements, dict) else {}
+
+
+def _scope(user_ids: Optional[Sequence[int]]) -> Tuple[str, list]:
+    """SQL restricting participations to `user_ids` (and those not ranked yet); everyone for None"""
+    if user_ids is None:
+        return '', []
+    if not user_ids:
+        return 'AND cp.ranking IS NULL', []
+    return f"AND (cp.user_id IN ({', '.join(['%s'] * len(user_ids))}) OR cp.ranking IS NULL)", list(user_ids)
+
+
+def longest_runs(participation_ids: np.ndarray, days: np.ndarray) -> Dict[int, int]:
+    """participation_id -> longest run of consecutive days, from rows sorted by (participation, day)"""
+    if not len(days):
+        return {}
+    starts = np.ones(len(days), dtype=bool)
+    starts[1:] = (participation_ids[1:] != participation_ids[:-1]) | (np.diff(days) != 1)
+    run_lengths = np.diff(np.append(np.flatnonzero(starts), len(days)))
+    run_owners = participation_ids[starts]
+    owner_starts = np.flatnonzero(np.r_[True, run_owners[1:] != run_owners[:-1]])
+    longest = np.maximum.reduceat(run_lengths, owner_starts)
+    return dict(zip(run_owners[owner_starts].tolist(), longest.tolist()))
+
+
+def measured_growth(submission_data) -> Optional[int]:
+    """Centimetres between the first and the tallest measurement in submission_data, if it has any"""
+    if isinstance(submission_data, (str, bytes)):
+        try:
+            submission_data = json.loads(submission_data)
+        except ValueError:
+            return None
+    if not isinstance(submission_data, dict):
+        return None
+    heights = [m.get('height_cm') for m in submission_data.get('measurements') or [] if isinstance(m, dict)]
+    heights = [height for height in heights if isinstance(height, (int, float))]
+    if len(heights) < 2:
+        return None
+    return max(0, int(round(max(heights) - heights[0])))
+
+
+def _rows(cursor, sql: str, params) -> List[tuple]:
+    cursor.execute(sql, params)
+    return [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in cursor.fetchall()]
+
+
+def compute_scores(cursor, challenge: Dict, user_ids: Optional[Sequence[int]] = None) -> List[Tuple[int, int, int]]:
+    """(participation_id, stored score, new score) for the challenge's participations
+    (only those of `user_ids` and unranked ones, if given)"""
+    scope, scope_params = _scope(user_ids)
+    window = [challenge['challenge_id'], challenge['start_date'], challenge['end_date']]
+    participations = _rows(cursor, PARTICIPATIONS.format(scope=scope), [challenge['challenge_id']] + scope_params)
+    challenge_type = challenge['challenge_type']
+
+    if challenge_type == 'care_streak':
+        rows = _rows(cursor, CARE_DAYS.format(scope=scope), window + scope_params)
+        computed = longest_runs(np.array([row[0] for row in rows], dtype=np.int64),
+                                np.array([_as_date(row[1]).toordinal() for row in rows], dtype=np.int64))
+    elif challenge_type == 'eco_impact':
+        minimum = _requirements(challenge).get('eco_score_minimum', 0)
+        computed = {pid: int(score) for pid, score in
+                    _rows(cursor, ECO_SCORES.format(scope=scope), window + [minimum] + scope_params)}
+    elif challenge_type == 'growth':
+        effort = {pid: int(round(tasks * float(health or 0) / 100)) for pid, tasks, health in
+                  _rows(cursor, CARE_EFFORT.format(scope=scope), window + scope_params)}
+        computed = {}
+        for pid, _score, submission_data in participations:
+            measured = measured_growth(submission_data)
+            computed[pid] = measured if measured is not None else effort.get(pid, 0)
+    else:
+        # Judged challenges (photo_contest) keep the scores they were given
+        computed = {pid: int(score or 0) for pid, score, _ in participations}
+    return [(pid, score, int(computed.get(pid, 0))) for pid, score, _ in participations]
+
+
+def _as_date(value) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def rank(cursor, challenge_ids: Iterable[int]) -> int:
+    """Re-rank the challenges with one window query; returns the rankings changed"""
+    challenge_ids = sorted(set(challenge_ids))
+    if not challenge_ids:
+        return 0
+    rows = _rows(cursor, RANKINGS.format(', '.join(['%s'] * len(challenge_ids))), challenge_ids)
+    changes = [(new_ranking, pid) for pid, ranking, new_ranking in rows if ranking != new_ranking]
+    if changes:
+        cursor.executemany(UPDATE_RANKING, changes)
+    return len(changes)
+
+
+def _max_id(cursor, table: str, column: str) -> int:
+    (value,) = _rows(cursor, f"SELECT COALESCE(MAX({column}), 0) FROM {table}", ())[0]
+    return int(value)
+
+
+def _active_users(cursor, activities: Tuple[int, int], plants: Tuple[int, int]) -> Set[int]:
+    """Users with care activities or garden plants added in the (after, upto] id ranges"""
+    users = {user_id for (user_id,) in _rows(cursor, """
+        SELECT DISTINCT up.user_id FROM care_activities ca
+        JOIN user_plants up ON ca.user_plant_id = up.user_plant_id
+        WHERE ca.activity_id > %s AND ca.activity_id <= %s
+    """, activities)}
+    users.update(user_id for (user_id,) in _rows(cursor, """
+        SELECT DISTINCT user_id FROM user_plants WHERE user_plant_id > %s AND user_plant_id <= %s
+    """, plants))
+    return users
+
+
+def score_challenges(full: bool = False) -> Dict:
+    """Rescore and re-rank the running challenges (incrementally unless `full`)"""
+    today = datetime.date.today()
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        activities_seen = jobs.get_watermark(cursor, SCORING_JOB)
+        plants_seen = jobs.get_watermark(cursor, PLANTS_WATERMARK)
+        activities_upto = _max_id(cursor, 'care_activities', 'activity_id')
+        plants_upto = _max_id(cursor, 'user_plants', 'user_plant_id')
+        conn.commit()
+
+        user_ids = None
+        if not full:
+            active = _active_users(cursor, (activities_seen, activities_upto), (plants_seen, plants_upto))
+            user_ids = sorted(active) if len(active) <= MAX_INCREMENTAL_USERS else None
+
+        cursor.execute(RUNNING_CHALLENGES, (today, today - datetime.timedelta(days=SCORING_GRACE_DAYS)))
+        running = cursor.fetchall()
+        scored = changed = 0
+        for challenge in running:
+            scores = compute_scores(cursor, challenge, user_ids)
+            updates = [(score, pid) for pid, stored, score in scores if stored != score]
+            if updates:
+                cursor.executemany(UPDATE_SCORE, updates)
+            scored += len(scores)
+            changed += len(updates)
+        reranked = rank(cursor, [challenge['challenge_id'] for challenge in running])
+
+        if activities_upto > activities_seen and not jobs.advance_watermark(cursor, SCORING_JOB, activities_seen, activities_upto):
+            conn.rollback()
+            return {'challenges': 0, 'scored': 0, 'changed': 0, 'reranked': 0, 'skipped': 'concurrent run'}
+        if plants_upto > plants_seen and not jobs.advance_watermark(cursor, PLANTS_WATERMARK, plants_seen, plants_upto):
+            conn.rollback()
+            return {'challenges': 0, 'scored': 0, 'changed': 0, 'reranked': 0, 'skipped': 'concurrent run'}
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {'challenges': len(running), 'scored': scored, 'changed': changed, 'reranked': reranked}
+
+
+@jobs.register(SCORING_JOB, interval_seconds=config.CHALLENGE_SCORING_INTERVAL)
+def score_new_activity() -> Dict:
+    """Rescore challenge participants with new care activity or plants, and re-rank"""
+    return score_challenges()
+
+
+@jobs.register(RESCORE_JOB, interval_seconds=86400)
+def rescore_all() -> Dict:
+    """Rescore every participation in the running challenges"""
+    return score_challenges(full=True)
+
+
+# Standings
+
+def standings(challenge_id: int, after: Optional[list], limit: int) -> Tuple[Optional[Dict], List[Dict], Optional[str]]:
+    """(challenge, one page of stored rankings, next_cursor); challenge is None when it does not exist"""
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(CHALLENGE_SUMMARY, (challenge_id,))
+        challenge = cursor.fetchone()
+        if challenge is None:
+            return None, [], None
+        last_ranking, last_id = after if after else (0, 0)
+        cursor.execute(STANDINGS_PAGE, (challenge_id, last_ranking, last_ranking, last_id, limit + 1))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    challenge['start_date'] = str(challenge['start_date'])
+    challenge['end_date'] = str(challenge['end_date'])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor([rows[-1]['ranking'], rows[-1]['participation_id']],
+                                               f'standings:{challenge_id}')
+    entries = [{"rank": row['ranking'], "user_id": row['user_id'], "username": row['username'], "score": row['score']}
+               for row in rows]
+    return challenge, entries, next_cursor
@@ -0,0 +1,194 @@
+"""
+Runtime configuration for FloraFind
+Settings are read from environment variables, falling back to local development defaults
+"""
+
+import os
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.environ.get(name, default)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Database
+DB_CONFIG = {
+    'host': _env_str('FLORAFIND_DB_HOST', 'localhost'),
+    'user': _env_str('FLORAFIND_DB_USER', 'root'),
+    'password': _env_str('FLORAFIND_DB_PASSWORD', 'anushka'),
+    'database': _env_str('FLORAFIND_DB_NAME', 'florafind'),
+}
+DB_POOL_SIZE = _env_int('FLORAFIND_DB_POOL_SIZE', 10)
+
+# Logging
+LOG_LEVEL = _env_str('FLORAFIND_LOG_LEVEL', 'INFO').upper()
+# Fraction of DEBUG/INFO records that are emitted; warnings and errors are never sampled
+LOG_SAMPLE_RATE = _env_float('FLORAFIND_LOG_SAMPLE_RATE', 1.0)
+
+# Metrics
+METRICS_ENABLED = _env_bool('FLORAFIND_METRICS_ENABLED', True)
+SERVER_TIMING_ENABLED = _env_bool('FLORAFIND_SERVER_TIMING', True)
+
+# Startup
+WARM_UP_ON_START = _env_bool('FLORAFIND_WARM_UP', True)
+
+# Serving
+# 'sync' serves the Flask app under gunicorn; 'async' serves the ASGI app (asgi_app.py) under uvicorn
+SERVER_MODE = _env_str('FLORAFIND_SERVER_MODE', 'sync').lower()
+DEBUG = _env_bool('FLORAFIND_DEBUG', False)
+HOST = _env_str('FLORAFIND_HOST', '127.0.0.1')
+PORT = _env_int('FLORAFIND_PORT', 5000)
+ASYNC_DB_POOL_MIN = _env_int('FLORAFIND_ASYNC_DB_POOL_MIN', 1)
+ASYNC_DB_POOL_MAX = _env_int('FLORAFIND_ASYNC_DB_POOL_MAX', 20)
+# Threads running CPU-bound NLP for the async routes, and how many requests may wait for one
+NLP_EXECUTOR_WORKERS = _env_int('FLORAFIND_NLP_WORKERS', 4)
+NLP_EXECUTOR_MAX_PENDING = _env_int('FLORAFIND_NLP_MAX_PENDING', 32)
+
+# NLP worker processes
+# 0 parses in the request thread; N > 0 parses in N worker processes, batching concurrent queries
+NLP_PROCESSES = _env_int('FLORAFIND_NLP_PROCESSES', 0)
+NLP_MAX_BATCH = _env_int('FLORAFIND_NLP_MAX_BATCH', 16)
+NLP_TIMEOUT_SECONDS = _env_float('FLORAFIND_NLP_TIMEOUT', 2.0)
+
+# Search analytics
+SEARCH_ROLLUP_INTERVAL_SECONDS = _env_int('FLORAFIND_SEARCH_ROLLUP_INTERVAL', 300)
+SEARCH_ROLLUP_BATCH_SIZE = _env_int('FLORAFIND_SEARCH_ROLLUP_BATCH', 5000)
+SEARCH_ROLLUP_DETECT_LANGUAGE = _env_bool('FLORAFIND_SEARCH_ROLLUP_DETECT_LANGUAGE', True)
+# Raw search_logs rows and hourly rollups older than this are pruned; daily rollups are kept
+SEARCH_LOG_RETENTION_DAYS = _env_int('FLORAFIND_SEARCH_LOG_RETENTION_DAYS', 90)
+SEARCH_HOURLY_RETENTION_DAYS = _env_int('FLORAFIND_SEARCH_HOURLY_RETENTION_DAYS', 14)
+
+# Zero-result suggestions
+SUGGESTION_REFRESH_SECONDS = _env_int('FLORAFIND_SUGGESTION_REFRESH', 600)
+SUGGESTION_LOOKBACK_DAYS = _env_int('FLORAFIND_SUGGESTION_LOOKBACK_DAYS', 30)
+# A plant counts for a search when the same user adds it within this many hours afterwards
+SUGGESTION_WINDOW_HOURS = _env_int('FLORAFIND_SUGGESTION_WINDOW_HOURS', 24)
+# Modifier combinations need this many distinct users before their data replaces the static lists
+SUGGESTION_MIN_USERS = _env_int('FLORAFIND_SUGGESTION_MIN_USERS', 3)
+
+# In-memory plant catalog (ids, names and search filter bitsets), reloaded in each worker
+CATALOG_REFRESH_SECONDS = _env_int('FLORAFIND_CATALOG_REFRESH', 300)
+
+# Bulk garden import (garden_io.py)
+GARDEN_IMPORT_MAX_ROWS = _env_int('FLORAFIND_GARDEN_IMPORT_MAX_ROWS', 1000)
+# rapidfuzz WRatio score a misspelt name needs to be imported as the closest plant
+GARDEN_IMPORT_FUZZY_CUTOFF = _env_int('FLORAFIND_GARDEN_IMPORT_FUZZY_CUTOFF', 85)
+
+# Care schedules (care_schedule.py)
+CARE_REBALANCE_BATCH_SIZE = _env_int('FLORAFIND_CARE_REBALANCE_BATCH', 2000)
+# Stretch/shrink watering intervals with the weather at the gardener's location (weather.py)
+CARE_WEATHER_ADJUST = _env_bool('FLORAFIND_CARE_WEATHER_ADJUST', False)
+CARE_WEATHER_CACHE_SECONDS = _env_int('FLORAFIND_CARE_WEATHER_CACHE', 3600)
+
+# Admission control (admission.py). Limits are per worker process.
+ADMISSION_ENABLED = _env_bool('FLORAFIND_ADMISSION_ENABLED', True)
+ADMISSION_QUEUE_TIMEOUT = _env_float('FLORAFIND_ADMISSION_QUEUE_TIMEOUT', 2.0)
+ADMISSION_MAX_TRACKED_USERS = _env_int('FLORAFIND_ADMISSION_MAX_TRACKED_USERS', 10000)
+# /query: fewer slots than FLORAFIND_THREADS, so searches never hold every worker thread
+ADMISSION_SEARCH_CONCURRENCY = _env_int('FLORAFIND_ADMISSION_SEARCH_CONCURRENCY', 2)
+ADMISSION_SEARCH_QUEUE = _env_int('FLORAFIND_ADMISSION_SEARCH_QUEUE', 8)
+ADMISSION_SEARCH_USER_RATE = _env_float('FLORAFIND_ADMISSION_SEARCH_USER_RATE', 2.0)
+ADMISSION_SEARCH_USER_BURST = _env_float('FLORAFIND_ADMISSION_SEARCH_USER_BURST', 10.0)
+ADMISSION_SEARCH_GLOBAL_RATE = _env_float('FLORAFIND_ADMISSION_SEARCH_GLOBAL_RATE', 50.0)
+ADMISSION_SEARCH_GLOBAL_BURST = _env_float('FLORAFIND_ADMISSION_SEARCH_GLOBAL_BURST', 100.0)
+# Searches admitted with this many in flight (default: the concurrency limit) run degraded
+ADMISSION_SEARCH_DEGRADE_AT = _env_int('FLORAFIND_ADMISSION_SEARCH_DEGRADE_AT', 0)
+# /garden/import and /garden/export
+ADMISSION_BULK_CONCURRENCY = _env_int('FLORAFIND_ADMISSION_BULK_CONCURRENCY', 1)
+ADMISSION_BULK_QUEUE = _env_int('FLORAFIND_ADMISSION_BULK_QUEUE', 4)
+ADMISSION_BULK_USER_RATE = _env_float('FLORAFIND_ADMISSION_BULK_USER_RATE', 0.2)
+ADMISSION_BULK_USER_BURST = _env_float('FLORAFIND_ADMISSION_BULK_USER_BURST', 3.0)
+# Everything else
+ADMISSION_DEFAULT_CONCURRENCY = _env_int('FLORAFIND_ADMISSION_DEFAULT_CONCURRENCY', 64)
+ADMISSION_DEFAULT_QUEUE = _env_int('FLORAFIND_ADMISSION_DEFAULT_QUEUE', 64)
+
+# Recent /query results, served instead of a fresh search while admission control reports saturation
+SEARCH_RESULT_CACHE_SIZE = _env_int('FLORAFIND_SEARCH_RESULT_CACHE_SIZE', 512)
+SEARCH_RESULT_CACHE_TTL = _env_int('FLORAFIND_SEARCH_RESULT_CACHE_TTL', 300)
+
+# Search retrieval: 'sql' matches the query's first keywords with LIKE; 'bm25' takes candidates
+# from the BM25 text index (text_index.py), falling back to 'sql' until one has been built.
+# The index is written under TEXT_INDEX_PATH by the text_index_build job and memory-mapped by workers.
+SEARCH_RETRIEVAL_MODE = _env_str('FLORAFIND_SEARCH_RETRIEVAL', 'sql').lower()
+TEXT_INDEX_PATH = _env_str('FLORAFIND_TEXT_INDEX_PATH',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'text_index'))
+TEXT_INDEX_REFRESH_SECONDS = _env_int('FLORAFIND_TEXT_INDEX_REFRESH', 300)
+# Best-scoring plants a query keeps, and the relevance points of the best text match when ranking
+TEXT_INDEX_CANDIDATES = _env_int('FLORAFIND_TEXT_INDEX_CANDIDATES', 200)
+TEXT_INDEX_RELEVANCE_WEIGHT = _env_float('FLORAFIND_TEXT_INDEX_RELEVANCE_WEIGHT', 40.0)
+
+# Similar plants (similar_plants.py): neighbours stored per plant by the similar_plants job,
+# and how long /similar responses are cached (they only change when the job runs)
+SIMILAR_PLANTS_K = _env_int('FLORAFIND_SIMILAR_PLANTS_K', 20)
+HTTP_CACHE_SIMILAR_TTL = _env_int('FLORAFIND_HTTP_CACHE_SIMILAR_TTL', 3600)
+
+# "Gardeners also grow" (recommendations.py): related plants stored per plant, the fewest
+# gardeners two plants must share to be related, and users per chunk of the nightly rebuild
+RECOMMENDER_TOP_K = _env_int('FLORAFIND_RECOMMENDER_TOP_K', 30)
+RECOMMENDER_MIN_USERS = _env_int('FLORAFIND_RECOMMENDER_MIN_USERS', 2)
+RECOMMENDER_USER_CHUNK = _env_int('FLORAFIND_RECOMMENDER_USER_CHUNK', 5000)
+
+# Care tips (care_tips.py): seconds between reloads of each worker's parsed tips index
+CARE_TIPS_REFRESH_SECONDS = _env_int('FLORAFIND_CARE_TIPS_REFRESH', 300)
+
+# Care activity history (activity.py): days raw care_activities rows are kept before
+# compaction (their tasks and points stay in the daily rollup)
+ACTIVITY_RAW_RETENTION_DAYS = _env_int('FLORAFIND_ACTIVITY_RAW_RETENTION_DAYS', 365)
+
+# Health decay (plant_health.py): plants updated per committed chunk, and the most missed
+# days one run of the health_decay job catches up on
+HEALTH_DECAY_CHUNK = _env_int('FLORAFIND_HEALTH_DECAY_CHUNK', 500)
+HEALTH_DECAY_MAX_CATCHUP_DAYS = _env_int('FLORAFIND_HEALTH_DECAY_MAX_CATCHUP_DAYS', 7)
+
+# HTTP response cache for reference routes (http_cache.py): seconds cached in each worker,
+# and the Cache-Control max-age sent to browsers and CDNs
+HTTP_CACHE_ENABLED = _env_bool('FLORAFIND_HTTP_CACHE_ENABLED', True)
+HTTP_CACHE_MAX_ENTRIES = _env_int('FLORAFIND_HTTP_CACHE_MAX_ENTRIES', 2048)
+HTTP_CACHE_CALENDAR_TTL = _env_int('FLORAFIND_HTTP_CACHE_CALENDAR_TTL', 3600)
+HTTP_CACHE_CALENDAR_MAX_AGE = _env_int('FLORAFIND_HTTP_CACHE_CALENDAR_MAX_AGE', 600)
+HTTP_CACHE_CHALLENGES_TTL = _env_int('FLORAFIND_HTTP_CACHE_CHALLENGES_TTL', 300)
+HTTP_CACHE_CHALLENGES_MAX_AGE = _env_int('FLORAFIND_HTTP_CACHE_CHALLENGES_MAX_AGE', 60)
+HTTP_CACHE_STANDINGS_TTL = _env_int('FLORAFIND_HTTP_CACHE_STANDINGS_TTL', 60)
+
+# User stats read model (user_stats.py): the per-worker cache, and whether it is backed
+# by the denormalized user_stats table (migrations/004) or read from the base tables
+USER_STATS_TABLE = _env_bool('FLORAFIND_USER_STATS_TABLE', True)
+USER_STATS_CACHE_SIZE = _env_int('FLORAFIND_USER_STATS_CACHE_SIZE', 10000)
+USER_STATS_CACHE_TTL = _env_int('FLORAFIND_USER_STATS_CACHE_TTL', 30)
+
+# Badge engine (badges.py): seconds before edits to the badges table are recompiled,
+# and users per chunk in the badge_backfill job
+BADGE_RULES_TTL = _env_int('FLORAFIND_BADGE_RULES_TTL', 300)
+BADGE_BACKFILL_BATCH_SIZE = _env_int('FLORAFIND_BADGE_BACKFILL_BATCH_SIZE', 500)
+
+# Challenge scoring (challenges.py): seconds between incremental challenge_scoring runs
+CHALLENGE_SCORING_INTERVAL = _env_int('FLORAFIND_CHALLENGE_SCORING_INTERVAL', 300)
+
+# Community tips (tips.py): near-duplicate detection (estimated Jaccard similarity of character
+# shingles at which a submission is refused), the per-worker tip index refresh, and vote buffering
+TIP_DUPLICATE_THRESHOLD = _env_float('FLORAFIND_TIP_DUPLICATE_THRESHOLD', 0.8)
+TIP_MINHASH_PERMUTATIONS = _env_int('FLORAFIND_TIP_MINHASH_PERMUTATIONS', 64)
+TIP_LSH_BANDS = _env_int('FLORAFIND_TIP_LSH_BANDS', 16)
+TIP_REFRESH_SECONDS = _env_int('FLORAFIND_TIP_REFRESH', 60)
+TIP_VOTE_FLUSH_SECONDS = _env_float('FLORAFIND_TIP_VOTE_FLUSH', 5.0)
+TIP_VOTE_BUFFER_MAX = _env_int('FLORAFIND_TIP_VOTE_BUFFER_MAX', 10000)
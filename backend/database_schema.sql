@@ -27,7 +27,20 @@ CREATE TABLE plants (
     ar_model_url VARCHAR(255), -- 3D model for AR visualization
     care_tips_detailed JSON, -- detailed care calendar info
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    -- Search columns (see migrations/001_plant_search_columns.sql)
+    growth_height_cm SMALLINT UNSIGNED, -- upper bound of growth_height, kept by the plant_heights job
+    is_medicinal BOOLEAN GENERATED ALWAYS AS (medicinal_properties IS NOT NULL AND medicinal_properties <> '') STORED,
+    is_air_purifying BOOLEAN GENERATED ALWAYS AS (IFNULL(LOWER(eco_benefits) LIKE '%air purif%', FALSE)) STORED,
+    is_indoor BOOLEAN GENERATED ALWAYS AS (IFNULL(LOWER(climate) LIKE '%indoor%', FALSE)
+                                           OR IFNULL(LOWER(care_instructions) LIKE '%indoor%', FALSE)) STORED,
+    INDEX idx_plants_name (name),
+    INDEX idx_plants_growth_height (growth_height_cm),
+    INDEX idx_plants_updated (updated_at), -- catalog freshness check before an empty filtered search
+    FULLTEXT INDEX ft_plants_names (name, scientific_name),
+    FULLTEXT INDEX ft_plants_keywords (name, care_instructions, medicinal_properties),
+    FULLTEXT INDEX ft_plants_care (care_instructions),
+    FULLTEXT INDEX ft_plants_eco (eco_benefits)
 );
 
 -- Enhanced Users table with gamification and preferences
@@ -61,7 +74,9 @@ CREATE TABLE user_plants (
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-    FOREIGN KEY (plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE
+    FOREIGN KEY (plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE,
+    INDEX idx_user_plants_user_plant (user_id, plant_id), -- garden lookups and import dedupe
+    INDEX idx_user_plants_created (created_at)
 );
 
 -- Care Calendar and Reminders
@@ -74,7 +89,8 @@ CREATE TABLE care_schedules (
     seasonal_adjustment JSON, -- different schedules for different seasons
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_plant_id) REFERENCES user_plants(user_plant_id) ON DELETE CASCADE
+    FOREIGN KEY (user_plant_id) REFERENCES user_plants(user_plant_id) ON DELETE CASCADE,
+    INDEX idx_care_schedules_due (is_active, next_due_date) -- overdue tasks for the health_decay job
 );
 
 -- Care activity logs for gamification
@@ -88,7 +104,8 @@ CREATE TABLE care_activities (
     photo_url VARCHAR(255),
     weather_conditions VARCHAR(100), -- optional weather context
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_plant_id) REFERENCES user_plants(user_plant_id) ON DELETE CASCADE
+    FOREIGN KEY (user_plant_id) REFERENCES user_plants(user_plant_id) ON DELETE CASCADE,
+    INDEX idx_care_activities_plant_date (user_plant_id, completed_date) -- a plant's care history
 );
 
 -- Community Features - User Submissions
@@ -120,7 +137,8 @@ CREATE TABLE plant_challenges (
     prize_description TEXT,
     participation_requirements JSON, -- specific rules/requirements
     is_active BOOLEAN DEFAULT TRUE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_challenges_active_end (is_active, end_date) -- active challenges not yet ended
 );
 
 -- Challenge Participations
@@ -135,7 +153,8 @@ CREATE TABLE challenge_participations (
     joined_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (challenge_id) REFERENCES plant_challenges(challenge_id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-    FOREIGN KEY (user_plant_id) REFERENCES user_plants(user_plant_id) ON DELETE SET NULL
+    FOREIGN KEY (user_plant_id) REFERENCES user_plants(user_plant_id) ON DELETE SET NULL,
+    INDEX idx_participations_challenge_ranking (challenge_id, ranking) -- standings pages
 );
 
 -- Badges and Achievements
@@ -161,6 +180,74 @@ CREATE TABLE user_badges (
     UNIQUE KEY unique_user_badge (user_id, badge_id)
 );
 
+-- Denormalized user stats read model, maintained by user_stats.py on every write
+-- that changes them (rows are built from the base tables on first use)
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INT PRIMARY KEY,
+    points INT NOT NULL DEFAULT 0,
+    level INT NOT NULL DEFAULT 1,
+    badge_count INT NOT NULL DEFAULT 0,
+    plant_count INT NOT NULL DEFAULT 0,
+    streak_days INT NOT NULL DEFAULT 0,
+    last_activity_date DATE NULL,
+    version INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Running per-user counters the badge rules compare against (badges.py)
+CREATE TABLE IF NOT EXISTS user_badge_counters (
+    user_id INT NOT NULL,
+    counter VARCHAR(40) NOT NULL,
+    value INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, counter),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Each plant's most similar plants, kept by the similar_plants job (similar_plants.py)
+CREATE TABLE IF NOT EXISTS plant_similarities (
+    plant_id INT NOT NULL,
+    neighbor_rank SMALLINT UNSIGNED NOT NULL, -- 1 = most similar
+    similar_plant_id INT NOT NULL,
+    score FLOAT NOT NULL, -- cosine similarity of the two plants' attribute vectors
+    PRIMARY KEY (plant_id, neighbor_rank),
+    FOREIGN KEY (plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE,
+    FOREIGN KEY (similar_plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE
+);
+
+-- Plants grown together, kept by the plant_cooccurrence job (recommendations.py)
+CREATE TABLE IF NOT EXISTS plant_cooccurrence (
+    plant_id INT NOT NULL,
+    neighbor_rank SMALLINT UNSIGNED NOT NULL, -- 1 = most related
+    other_plant_id INT NOT NULL,
+    users INT NOT NULL, -- gardeners growing both plants
+    score FLOAT NOT NULL, -- users / sqrt(growers of plant_id * growers of other_plant_id)
+    PRIMARY KEY (plant_id, neighbor_rank),
+    FOREIGN KEY (plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE,
+    FOREIGN KEY (other_plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE
+);
+
+-- Care tasks and points per user and day, kept on every care_activities insert (activity.py)
+CREATE TABLE IF NOT EXISTS user_activity_daily (
+    user_id INT NOT NULL,
+    activity_date DATE NOT NULL,
+    task_type VARCHAR(20) NOT NULL,
+    tasks INT NOT NULL DEFAULT 0,
+    points INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, activity_date, task_type),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+-- Daily plant health, kept by the health_decay job and care tasks (plant_health.py)
+CREATE TABLE IF NOT EXISTS plant_health_history (
+    user_plant_id INT NOT NULL,
+    recorded_on DATE NOT NULL,
+    health_score INT NOT NULL, -- current_health_score at the day's last change
+    decay INT NOT NULL DEFAULT 0, -- points lost to overdue care that day
+    PRIMARY KEY (user_plant_id, recorded_on),
+    FOREIGN KEY (user_plant_id) REFERENCES user_plants(user_plant_id) ON DELETE CASCADE
+);
+
 -- Weather and Location Data Cache
 CREATE TABLE location_weather (
     location_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -197,7 +284,8 @@ CREATE TABLE search_logs (
     user_location VARCHAR(100),
     search_type ENUM('text', 'voice', 'image') DEFAULT 'text',
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE SET NULL
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE SET NULL,
+    INDEX idx_search_logs_timestamp (timestamp)
 );
 
 -- Notification Queue
@@ -216,4 +304,57 @@ CREATE TABLE notification_queue (
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
+-- Background job progress (highest source row id consumed)
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    job_name VARCHAR(50) PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- When each background job last completed a run; jobs.py run-all starts only the due ones
+CREATE TABLE IF NOT EXISTS job_runs (
+    job_name VARCHAR(50) PRIMARY KEY,
+    last_run_at DATETIME NOT NULL -- start of the last successful run
+);
+
+-- Search analytics rollups, maintained incrementally from search_logs by search_analytics.py
+CREATE TABLE IF NOT EXISTS search_stats (
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    search_type VARCHAR(10) NOT NULL,
+    language VARCHAR(5) NOT NULL,
+    searches INT NOT NULL DEFAULT 0,
+    zero_results INT NOT NULL DEFAULT 0,
+    total_results INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, search_type, language)
+);
+
+CREATE TABLE IF NOT EXISTS search_query_stats (
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    query VARCHAR(255) NOT NULL,
+    searches INT NOT NULL DEFAULT 0,
+    zero_results INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, query)
+);
+
+CREATE TABLE IF NOT EXISTS search_term_stats (
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    term VARCHAR(64) NOT NULL,
+    searches INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, term)
+);
+
+-- Plants users add after searching with a given modifier combination (built by suggestions.py)
+CREATE TABLE IF NOT EXISTS search_plant_affinity (
+    modifier_key VARCHAR(150) NOT NULL, -- e.g. "difficulty=beginner|season=summer"
+    plant_id INT NOT NULL,
+    users INT NOT NULL,
+    position INT NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (modifier_key, plant_id),
+    FOREIGN KEY (plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE
+);
+
 SHOW TABLES;
@@ -1,11 +1,62 @@
 # db.py
+import threading
+
 import mysql.connector
+from mysql.connector import errors, pooling
+
+import config
+import metrics
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Lazily create the shared connection pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="florafind",
+                    pool_size=config.DB_POOL_SIZE,
+                    **config.DB_CONFIG
+                )
+    return _pool
+
+
+def reset_pool():
+    """Forget the pool inherited from a parent process.
+
+    Called in forked workers: the parent's sockets must not be reused or closed
+    from the child, so the reference is dropped and a new pool is built on demand.
+    """
+    global _pool
+    with _pool_lock:
+        _pool = None
+
 
 def get_connection():
-    connection = mysql.connector.connect(
-        host="localhost",       # your MySQL host
-        user="root",            # your MySQL username
-        password="anushka",# your MySQL password
-        database="florafind"    # your DB name (use the one you created with schema.sql)
-    )
+    try:
+        connection = get_pool().get_connection()
+    except errors.PoolError:
+        # Pool exhausted: fall back to a one-off connection rather than failing the request
+        metrics.DB_POOL_OVERFLOW.inc()
+        connection = mysql.connector.connect(**config.DB_CONFIG)
     return connection
+
+
+def _pool_stats():
+    if _pool is None:
+        return {}
+    # The connector keeps idle connections in a queue; there is no public accessor for it
+    idle_queue = getattr(_pool, '_cnx_queue', None)
+    idle = idle_queue.qsize() if idle_queue is not None else 0
+    return {
+        (('state', 'idle'),): idle,
+        (('state', 'in_use'),): _pool.pool_size - idle,
+        (('state', 'size'),): _pool.pool_size,
+    }
+
+
+metrics.Gauge('florafind_db_pool_connections', 'Database pool connections by state', callback=_pool_stats)
@@ -0,0 +1,417 @@
+"""
+Search filter registry for FloraFind
+Every category ("fruit", "tree", ...) and modifier (season, difficulty, plant
+type) is declared once: the terms that detect it in a query and the predicate a
+plant has to satisfy. Detection runs all terms through one Aho-Corasick
+automaton; predicates compile either to SQL for the search query or to bitsets
+over the in-memory catalog. The registry is built once per process.
+"""
+
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Words InnoDB FULLTEXT never indexes (innodb_ft_min_token_size and the default stopword list)
+FULLTEXT_MIN_TOKEN = 3
+FULLTEXT_STOPWORDS = frozenset([
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how', 'i',
+    'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what', 'when',
+    'where', 'who', 'will', 'with', 'und', 'www',
+])
+TREE_MIN_HEIGHT_CM = 200
+
+_WORD_PATTERN = re.compile(r'\w+')
+_BOOLEAN_TERM_PATTERN = re.compile(r'"([^"]*)"|(\w+)(\*?)')
+
+
+def fulltext_term(text: str, prefix: bool = True) -> Optional[str]:
+    """Boolean-mode term for `text` ("word*", or "a phrase"), or None if FULLTEXT cannot find it"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if not words or any(len(word) < FULLTEXT_MIN_TOKEN or word in FULLTEXT_STOPWORDS for word in words):
+        return None
+    if len(words) > 1:
+        return '"' + ' '.join(words) + '"'
+    return words[0] + ('*' if prefix else '')
+
+
+def text_match(columns: str, terms: Iterable[str], prefix: bool = True) -> Tuple[str, list]:
+    """(sql, params) matching any of `terms` in `columns`: one MATCH ... AGAINST over a
+    FULLTEXT index with exactly these columns, plus LIKE for terms FULLTEXT cannot find"""
+    fulltext_terms, like_terms = [], []
+    for term in terms:
+        fulltext = fulltext_term(term, prefix)
+        if fulltext:
+            fulltext_terms.append(fulltext)
+        else:
+            like_terms.append(term)
+    conditions, params = [], []
+    if fulltext_terms:
+        conditions.append(f"MATCH({columns}) AGAINST (%s IN BOOLEAN MODE)")
+        params.append(' '.join(fulltext_terms))
+    column_list = [column.strip() for column in columns.split(',')]
+    for term in like_terms:
+        conditions.append(' OR '.join(f"{column} LIKE %s" for column in column_list))
+        params.extend([f"%{term}%"] * len(column_list))
+    return f"({' OR '.join(conditions)})", params
+
+
+def boolean_match(expression: str, *texts: Optional[str]) -> bool:
+    """In-memory MATCH ... AGAINST (... IN BOOLEAN MODE) for the operators used here: "phrase" and word*"""
+    words = [word for text in texts for word in _WORD_PATTERN.findall((text or '').lower())]
+    joined = ' ' + ' '.join(words) + ' '
+    for phrase, word, prefix in _BOOLEAN_TERM_PATTERN.findall((expression or '').lower()):
+        if phrase:
+            if ' ' + ' '.join(_WORD_PATTERN.findall(phrase)) + ' ' in joined:
+                return True
+        elif prefix:
+            if any(candidate.startswith(word) for candidate in words):
+                return True
+        elif word in words:
+            return True
+    return False
+
+
+# Predicates: each compiles to a SQL fragment and tests a catalog row in memory.
+# Text comparisons are case-insensitive, like the database collation. `exact` is
+# False where the in-memory test only approximates the SQL (FULLTEXT matching).
+
+@dataclass(frozen=True)
+class Like:
+    column: str
+    text: str
+
+    exact = True
+
+    @property
+    def columns(self):
+        return (self.column,)
+
+    def sql(self):
+        return f"{self.column} LIKE %s", [f"%{self.text}%"]
+
+    def test(self, row) -> bool:
+        return self.text.lower() in (row[self.column] or '').lower()
+
+
+@dataclass(frozen=True)
+class Match:
+    column_list: str
+    expression: str
+
+    exact = False
+
+    @property
+    def columns(self):
+        return tuple(column.strip() for column in self.column_list.split(','))
+
+    def sql(self):
+        return f"MATCH({self.column_list}) AGAINST (%s IN BOOLEAN MODE)", [self.expression]
+
+    def test(self, row) -> bool:
+        return boolean_match(self.expression, *(row[column] for column in self.columns))
+
+
+@dataclass(frozen=True)
+class Flag:
+    column: str
+
+    exact = True
+
+    @property
+    def columns(self):
+        return (self.column,)
+
+    def sql(self):
+        return self.column, []
+
+    def test(self, row) -> bool:
+        return bool(row[self.column])
+
+
+@dataclass(frozen=True)
+class Equals:
+    column: str
+    value: str
+
+    exact = True
+
+    @property
+    def columns(self):
+        return (self.column,)
+
+    def sql(self):
+        return f"{self.column} = %s", [self.value]
+
+    def test(self, row) -> bool:
+        return (row[self.column] or '').lower() == self.value.lower()
+
+
+@dataclass(frozen=True)
+class Above:
+    column: str
+    value: float
+
+    exact = True
+
+    @property
+    def columns(self):
+        return (self.column,)
+
+    def sql(self):
+        return f"{self.column} > %s", [self.value]
+
+    def test(self, row) -> bool:
+        return row[self.column] is not None and row[self.column] > self.value
+
+
+@dataclass(frozen=True)
+class AnyOf:
+    predicates: Tuple
+
+    @property
+    def columns(self):
+        return tuple(column for predicate in self.predicates for column in predicate.columns)
+
+    @property
+    def exact(self):
+        return all(predicate.exact for predicate in self.predicates)
+
+    def sql(self):
+        fragments, params = [], []
+        for predicate in self.predicates:
+            fragment, predicate_params = predicate.sql()
+            fragments.append(fragment)
+            params.extend(predicate_params)
+        return f"({' OR '.join(fragments)})", params
+
+    def test(self, row) -> bool:
+        return any(predicate.test(row) for predicate in self.predicates)
+
+
+def any_of(*predicates) -> AnyOf:
+    return AnyOf(tuple(predicates))
+
+
+@dataclass(frozen=True)
+class Filter:
+    """A category or modifier: the query terms that name it and what a plant must satisfy.
+
+    Categories are found as substrings of the raw query; modifiers as whole
+    words among its lemmas. `hints` are looser associations that only tag a
+    query's entities (PlantQueryProcessor) and never filter search results.
+    """
+    kind: str
+    value: str
+    terms: Tuple[str, ...]
+    predicate: Optional[object] = None
+    hints: Tuple[str, ...] = ()
+
+    @property
+    def key(self) -> str:
+        return f'{self.kind}:{self.value}'
+
+    @property
+    def whole_words(self) -> bool:
+        return self.kind != 'category'
+
+
+FILTERS = (
+    Filter('category', 'fruit', ('fruit',),
+           any_of(Like('name', 'fruit'), Match('eco_benefits', '"edible fruit"')),
+           hints=('fruiting', 'berry', 'berries', 'apple', 'orange', 'citrus', 'edible fruit')),
+    Filter('category', 'flower', ('flower',), Like('name', 'flower'),
+           hints=('flowering', 'bloom', 'blossom', 'ornamental', 'decorative')),
+    Filter('category', 'medicinal', ('medicinal',), Flag('is_medicinal'),
+           hints=('medicine', 'healing', 'therapeutic', 'remedy', 'health', 'ayurvedic')),
+    Filter('category', 'herb', ('herb',), Like('name', 'herb'),
+           hints=('herbs', 'spice', 'seasoning', 'culinary', 'kitchen', 'cooking')),
+    Filter('category', 'vegetable', ('vegetable',),
+           any_of(Like('name', 'vegetable'), Match('eco_benefits', 'edible*')),
+           hints=('vegetables', 'veggie', 'edible', 'food', 'crop')),
+    Filter('category', 'succulent', ('succulent',), any_of(Like('name', 'succulent'), Like('climate', 'arid')),
+           hints=('cactus', 'cacti', 'desert', 'drought-resistant')),
+    Filter('category', 'tree', ('tree',),
+           any_of(Like('name', 'tree'), Above('growth_height_cm', TREE_MIN_HEIGHT_CM)),
+           hints=('shrub', 'woody', 'timber', 'shade')),
+    Filter('category', 'climber', ('climber',),
+           any_of(Like('name', 'climber'), Match('care_instructions', 'climbing*')),
+           hints=('vine', 'creeper', 'climbing', 'trailing')),
+    Filter('category', 'aquatic', ('aquatic',), any_of(Like('name', 'aquatic'), Like('climate', 'water')),
+           hints=('water', 'pond', 'floating', 'submerged')),
+    Filter('category', 'air_purifying', ('air purifying', 'air-purifying'), Flag('is_air_purifying'),
+           hints=('air purifier', 'clean air', 'oxygen', 'detoxifying')),
+
+    Filter('season', 'summer', ('summer', 'hot', 'sunny', 'warm', 'heat'), Like('season', 'summer')),
+    Filter('season', 'winter', ('winter', 'cold', 'cool', 'frost', 'chilly'), Like('season', 'winter')),
+    Filter('season', 'spring', ('spring', 'bloom', 'flowering', 'growth'), Like('season', 'spring')),
+    Filter('season', 'monsoon', ('monsoon', 'rainy', 'rain', 'wet', 'humid'), Like('season', 'monsoon')),
+    Filter('season', 'all_seasons', ('year-round', 'always', 'continuous', 'perennial')),
+
+    Filter('difficulty', 'beginner',
+           ('beginner', 'easy', 'simple', 'low-maintenance', 'basic', 'starter', 'first-time'),
+           Equals('difficulty_level', 'beginner')),
+    Filter('difficulty', 'intermediate', ('intermediate', 'moderate', 'medium', 'some-care'),
+           Equals('difficulty_level', 'intermediate')),
+    Filter('difficulty', 'advanced', ('advanced', 'expert', 'difficult', 'challenging', 'high-maintenance'),
+           Equals('difficulty_level', 'advanced')),
+
+    Filter('type', 'indoor', ('indoor', 'houseplant', 'inside', 'home', 'apartment'), Flag('is_indoor')),
+    Filter('type', 'outdoor', ('outdoor', 'garden', 'yard', 'outside')),
+    Filter('type', 'medicinal', ('medicinal', 'healing', 'herb', 'remedy', 'therapeutic'), Flag('is_medicinal')),
+    Filter('type', 'flowering', ('flower', 'bloom', 'blossom', 'colorful')),
+    Filter('type', 'foliage', ('leaves', 'green', 'foliage')),
+)
+
+
+class Automaton:
+    """Aho-Corasick automaton: every occurrence of any pattern in one pass over the text"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, object]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+        for pattern, payload in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((len(pattern), payload))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def search(self, text: str):
+        """Yield (start, end, payload) for every pattern occurrence"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, payload in self._out[state]:
+                yield index + 1 - length, index + 1, payload
+
+
+class FilterRegistry:
+    def __init__(self, filters: Sequence[Filter] = FILTERS):
+        self.filters = tuple(filters)
+        self._by_key = {f.key: f for f in self.filters}
+        self._order = {f.key: position for position, f in enumerate(self.filters)}
+        patterns = []
+        for f in self.filters:
+            patterns.extend((term.lower(), (f, False)) for term in f.terms)
+            patterns.extend((term.lower(), (f, True)) for term in f.hints)
+        self._automaton = Automaton(patterns)
+        self.columns = tuple(sorted({column for f in self.filters if f.predicate
+                                     for column in f.predicate.columns}))
+
+    def get(self, kind: str, value: str) -> Optional[Filter]:
+        return self._by_key.get(f'{kind}:{value}')
+
+    def _detect(self, text: str, whole_words: bool, include_hints: bool = False) -> List[Filter]:
+        found = set()
+        for start, end, (f, is_hint) in self._automaton.search(text):
+            if f.whole_words != whole_words or (is_hint and not include_hints) or f.key in found:
+                continue
+            if whole_words and ((start and text[start - 1] != ' ') or (end < len(text) and text[end] != ' ')):
+                continue
+            found.add(f.key)
+        return sorted((self._by_key[key] for key in found), key=lambda f: self._order[f.key])
+
+    def detect_categories(self, text: str, include_hints: bool = False) -> List[str]:
+        """Categories the query names, in registry order"""
+        return [f.value for f in self._detect(text.lower(), whole_words=False, include_hints=include_hints)]
+
+    def detect_modifiers(self, lemmas: Sequence[str]) -> List[Tuple[str, str]]:
+        """(kind, value) modifiers whose terms appear among the lemmas, in registry order"""
+        return [(f.kind, f.value) for f in self._detect(' '.join(lemmas), whole_words=True)]
+
+    def vocabulary(self, kind: str, include_hints: bool = False) -> Dict[str, List[str]]:
+        return {f.value: list(f.terms) + (list(f.hints) if include_hints else [])
+                for f in self.filters if f.kind == kind}
+
+    def category_sql(self, categories: Iterable[str]) -> Optional[Tuple[str, list]]:
+        """One condition matching any of the categories, or None"""
+        fragments, params = [], []
+        for category in categories:
+            f = self.get('category', category)
+            if f and f.predicate:
+                fragment, predicate_params = f.predicate.sql()
+                fragments.append(fragment)
+                params.extend(predicate_params)
+        if not fragments:
+            return None
+        return f"({' OR '.join(fragments)})", params
+
+    def modifier_sql(self, modifiers: Iterable[Tuple[str, str]]) -> List[Tuple[str, list]]:
+        """One condition per modifier with a predicate; all must hold"""
+        conditions = []
+        for kind, value in modifiers:
+            f = self.get(kind, value)
+            if f and f.predicate:
+                conditions.append(f.predicate.sql())
+        return conditions
+
+    def exact(self, categories: Iterable[str] = (), modifiers: Iterable[Tuple[str, str]] = ()) -> bool:
+        """Whether the in-memory tests of these filters agree exactly with their SQL"""
+        named = [self.get('category', category) for category in categories] + \
+                [self.get(kind, value) for kind, value in modifiers]
+        return all(f.predicate.exact for f in named if f and f.predicate)
+
+    def bitsets(self, rows: Sequence[dict]) -> Dict[str, int]:
+        """Per filter key, a bitset of the rows (bit i = rows[i]) its predicate accepts"""
+        bits = {}
+        for f in self.filters:
+            if f.predicate is None:
+                continue
+            value = 0
+            for index, row in enumerate(rows):
+                if f.predicate.test(row):
+                    value |= 1 << index
+            bits[f.key] = value
+        return bits
+
+    def select(self, bits: Dict[str, int], size: int, categories: Iterable[str] = (),
+               modifiers: Iterable[Tuple[str, str]] = ()) -> int:
+        """Bitset of rows passing the filters: any category, and every modifier"""
+        selected = (1 << size) - 1
+        category_bits = [bits[f'category:{category}'] for category in categories
+                         if f'category:{category}' in bits]
+        if category_bits:
+            combined = 0
+            for value in category_bits:
+                combined |= value
+            selected &= combined
+        for kind, value in modifiers:
+            key = f'{kind}:{value}'
+            if key in bits:
+                selected &= bits[key]
+        return selected
+
+
+_registry: Optional[FilterRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> FilterRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = FilterRegistry()
+    return _registry
@@ -0,0 +1,365 @@
+"""
+Bulk garden import and export for FloraFind
+Imports take CSV or JSON rows naming plants the way people write them
+("Holy Basil", "tulsi", "Ocimum tenuiflorum", "sunflwer"). Names are resolved
+in one batch against the catalog (exact name, then alias, then fuzzy), plants
+already in the garden are found with one query, and the new user_plants and
+their default care schedules are written with multi-row INSERTs in one
+transaction. Exports use the same columns, so an export can be imported again.
+"""
+
+import csv
+import datetime
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import badges
+import care_schedule
+import catalog
+import config
+import db
+import user_stats
+from structured_logging import get_logger
+
+logger = get_logger('garden_io')
+
+EXPORT_COLUMNS = ['name', 'scientific_name', 'nickname', 'location', 'date_planted', 'health_score', 'notes']
+EXPORT_FETCH_SIZE = 500
+INSERT_CHUNK = 500
+DEFAULT_LOCATION = 'garden'
+# Imported plants get the schedule /add_to_garden creates, sized by care_schedule
+DEFAULT_CARE_TASK = 'watering'
+
+# Import column names people use, mapped to ours
+_COLUMN_ALIASES = {
+    'name': 'name', 'plant': 'name', 'plant_name': 'name', 'common_name': 'name', 'scientific_name': 'name',
+    'plant_id': 'plant_id',
+    'nickname': 'nickname', 'plant_nickname': 'nickname',
+    'location': 'location', 'location_in_garden': 'location',
+    'date_planted': 'date_planted', 'planted': 'date_planted',
+    'notes': 'notes',
+}
+
+EXPORT_QUERY = """
+    SELECT p.name, p.scientific_name, up.plant_nickname AS nickname, up.location_in_garden AS location,
+           up.date_planted, up.current_health_score AS health_score, up.notes
+    FROM user_plants up
+    JOIN plants p ON up.plant_id = p.plant_id
+    WHERE up.user_id = %s
+    ORDER BY up.user_plant_id
+"""
+
+
+class InvalidImport(ValueError):
+    """The import body cannot be read at all (bad rows are reported, not raised)"""
+
+
+@dataclass
+class ImportRow:
+    line: int
+    name: Optional[str] = None
+    plant_id: Optional[int] = None
+    nickname: str = ''
+    location: str = DEFAULT_LOCATION
+    date_planted: Optional[datetime.date] = None
+    notes: Optional[str] = None
+    entry: Optional[catalog.CatalogEntry] = None
+    match: Optional[str] = None  # how the plant was found: id, exact, alias or fuzzy
+    score: Optional[float] = None
+
+    def describe(self) -> Dict:
+        described = {'line': self.line, 'input': self.name if self.name is not None else self.plant_id}
+        if self.entry:
+            described.update(plant_id=self.entry.plant_id, name=self.entry.name, match=self.match)
+            if self.score is not None:
+                described['score'] = round(self.score, 1)
+        return described
+
+
+@dataclass
+class ImportResult:
+    imported: List[Dict] = field(default_factory=list)
+    duplicates: List[Dict] = field(default_factory=list)
+    unresolved: List[Dict] = field(default_factory=list)
+    invalid: List[Dict] = field(default_factory=list)
+    badges_earned: List[Dict] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            'imported_count': len(self.imported),
+            'imported': self.imported,
+            'duplicates': self.duplicates,
+            'unresolved': self.unresolved,
+            'invalid': self.invalid,
+            'badges_earned': self.badges_earned,
+        }
+
+
+# Parsing
+
+def _records(body: str, content_type: Optional[str]) -> List[Tuple[int, object]]:
+    """(line, record) pairs from a JSON array/{"plants": [...]} or a CSV file with a header row"""
+    stripped = body.lstrip()
+    if 'json' in (content_type or '') or stripped[:1] in ('[', '{'):
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise InvalidImport(f"invalid JSON: {e}")
+        if isinstance(data, dict):
+            data = data.get('plants')
+        if not isinstance(data, list):
+            raise InvalidImport('JSON imports must be a list of plants or {"plants": [...]}')
+        return list(enumerate(data, start=1))
+
+    reader = csv.DictReader(io.StringIO(body))
+    if not reader.fieldnames:
+        raise InvalidImport("CSV imports need a header row")
+    if not any(_COLUMN_ALIASES.get((name or '').strip().lower()) in ('name', 'plant_id') for name in reader.fieldnames):
+        raise InvalidImport("CSV imports need a name or plant_id column")
+    return [(reader.line_num, record) for record in reader]
+
+
+def _parse_record(line: int, record) -> ImportRow:
+    if isinstance(record, str):
+        record = {'name': record}
+    if not isinstance(record, dict):
+        raise ValueError("expected an object or a plant name")
+    values = {}
+    for key, value in record.items():
+        column = _COLUMN_ALIASES.get(str(key).strip().lower())
+        if column and value not in (None, '') and column not in values:
+            values[column] = value.strip() if isinstance(value, str) else value
+
+    row = ImportRow(line=line, name=values.get('name'))
+    if 'plant_id' in values:
+        try:
+            row.plant_id = int(values['plant_id'])
+        except (TypeError, ValueError):
+            raise ValueError("plant_id must be a number")
+    if row.name is None and row.plant_id is None:
+        raise ValueError("missing plant name")
+    if row.name is not None:
+        row.name = str(row.name)
+    row.nickname = str(values.get('nickname', ''))[:100]
+    row.location = str(values.get('location', DEFAULT_LOCATION))[:100]
+    row.notes = values.get('notes')
+    if 'date_planted' in values:
+        try:
+            row.date_planted = datetime.date.fromisoformat(str(values['date_planted'])[:10])
+        except ValueError:
+            raise ValueError("date_planted must be YYYY-MM-DD")
+    return row
+
+
+def parse_import(body: str, content_type: Optional[str] = None) -> Tuple[List[ImportRow], List[Dict]]:
+    """Rows to import, plus the rows that could not be read"""
+    records = _records(body, content_type)
+    if len(records) > config.GARDEN_IMPORT_MAX_ROWS:
+        raise InvalidImport(f"at most {config.GARDEN_IMPORT_MAX_ROWS} plants per import")
+    rows, invalid = [], []
+    for line, record in records:
+        try:
+            rows.append(_parse_record(line, record))
+        except ValueError as e:
+            invalid.append({'line': line, 'error': str(e)})
+    return rows, invalid
+
+
+# Resolution
+
+def _alias_names() -> Dict[str, str]:
+    """alias -> canonical plant name, from the search engine's alias table"""
+    from nlp_search import get_search_engine
+    aliases = {}
+    for name, alternatives in get_search_engine(config.DB_CONFIG).plant_aliases.items():
+        for alias in alternatives:
+            aliases.setdefault(alias.lower(), name)
+    return aliases
+
+
+def resolve_rows(rows: List[ImportRow]) -> None:
+    """Attach a catalog entry to every row that names a known plant"""
+    plants = catalog.get_catalog()
+    aliases = None
+    fuzzy = []
+    for row in rows:
+        if row.plant_id is not None and row.name is None:
+            row.entry, row.match = plants.get(row.plant_id), 'id'
+            continue
+        entry = plants.find_by_name(row.name)
+        if entry:
+            row.entry, row.match = entry, 'exact'
+            continue
+        if aliases is None:
+            aliases = _alias_names()
+        canonical = aliases.get(' '.join(row.name.lower().split()))
+        entry = plants.find_by_name(canonical) if canonical else None
+        if entry:
+            row.entry, row.match = entry, 'alias'
+        else:
+            fuzzy.append(row)
+
+    if fuzzy:
+        index, entries = plants.name_index()
+        matches = index.extract_many([row.name for row in fuzzy], score_cutoff=config.GARDEN_IMPORT_FUZZY_CUTOFF)
+        for row, match in zip(fuzzy, matches):
+            if match:
+                _, score, position = match
+                row.entry, row.match, row.score = entries[position], 'fuzzy', score
+
+
+# Import
+
+def _placeholders(columns: int, rows: int) -> str:
+    group = '(' + ', '.join(['%s'] * columns) + ')'
+    return ', '.join([group] * rows)
+
+
+def _chunks(items, size=INSERT_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def import_rows(user_id: int, rows: List[ImportRow], invalid: Optional[List[Dict]] = None) -> ImportResult:
+    """Resolve, dedupe and insert `rows` into the user's garden in one transaction"""
+    result = ImportResult(invalid=list(invalid or []))
+    resolve_rows(rows)
+
+    candidates = []
+    for row in rows:
+        if row.entry is None:
+            result.unresolved.append(row.describe())
+        else:
+            candidates.append(row)
+    if not candidates:
+        return result
+
+    today = datetime.date.today()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        plant_ids = sorted({row.entry.plant_id for row in candidates})
+        cursor.execute(f"SELECT plant_id FROM user_plants WHERE user_id = %s AND plant_id IN ({', '.join(['%s'] * len(plant_ids))})",
+                       [user_id] + plant_ids)
+        present = {plant_id for (plant_id,) in cursor.fetchall()}
+
+        new_rows = []
+        for row in candidates:
+            if row.entry.plant_id in present:
+                result.duplicates.append(row.describe())
+            else:
+                present.add(row.entry.plant_id)
+                new_rows.append(row)
+
+        if new_rows:
+            for chunk in _chunks(new_rows):
+                params = []
+                for row in chunk:
+                    params.extend([user_id, row.entry.plant_id, row.nickname, row.location,
+                                   row.date_planted or today, row.notes])
+                cursor.execute("INSERT INTO user_plants (user_id, plant_id, plant_nickname, location_in_garden, "
+                               f"date_planted, notes) VALUES {_placeholders(6, len(chunk))}", params)
+
+            # The garden held none of these plants before the insert (deduped above), so each
+            # one maps to the row just written; ordering keeps the newest if a concurrent add raced us
+            new_ids = [row.entry.plant_id for row in new_rows]
+            user_plant_ids = {}
+            for chunk in _chunks(new_ids):
+                cursor.execute("SELECT plant_id, user_plant_id FROM user_plants WHERE user_id = %s "
+                               f"AND plant_id IN ({', '.join(['%s'] * len(chunk))}) ORDER BY user_plant_id",
+                               [user_id] + chunk)
+                user_plant_ids.update(cursor.fetchall())
+
+            schedules = care_schedule.initial_schedules(cursor, new_ids, DEFAULT_CARE_TASK, today)
+            schedule_rows = [(user_plant_ids[plant_id], frequency_days, next_due)
+                             for plant_id, (frequency_days, next_due) in zip(new_ids, schedules)]
+            for chunk in _chunks(schedule_rows):
+                params = []
+                for user_plant_id, frequency_days, next_due in chunk:
+                    params.extend([user_plant_id, DEFAULT_CARE_TASK, frequency_days, next_due])
+                cursor.execute("INSERT INTO care_schedules (user_plant_id, task_type, frequency_days, next_due_date) "
+                               f"VALUES {_placeholders(4, len(chunk))}", params)
+
+            for row in new_rows:
+                result.imported.append(dict(row.describe(), user_plant_id=user_plant_ids[row.entry.plant_id]))
+            stats = user_stats.update(cursor, user_id, plants=True)
+            result.badges_earned = badges.on_plants_added(cursor, user_id, new_ids, stats)
+            if result.badges_earned:
+                stats = user_stats.update(cursor, user_id, points=True, badges=True)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    if new_rows:
+        user_stats.publish(user_id, stats)
+
+    logger.info("garden_imported", user_id=user_id, imported=len(result.imported),
+                duplicates=len(result.duplicates), unresolved=len(result.unresolved), invalid=len(result.invalid))
+    return result
+
+
+# Export
+
+def open_export(user_id: int) -> Iterator[Dict]:
+    """Rows of the user's garden from an unbuffered cursor; the query runs before this returns"""
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(EXPORT_QUERY, (user_id,))
+    except Exception:
+        cursor.close()
+        conn.close()
+        raise
+
+    def fetch_rows():
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def generate():
+        try:
+            yield from fetch_rows()
+        finally:
+            try:
+                # A client that disconnects mid-export leaves rows unread on the connection
+                for _ in fetch_rows():
+                    pass
+                cursor.close()
+            finally:
+                conn.close()
+
+    return generate()
+
+
+def _export_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_csv(rows: Iterator[Dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(['' if row[column] is None else _export_value(row[column]) for column in EXPORT_COLUMNS])
+        if count % EXPORT_FETCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_json(rows: Iterator[Dict]) -> Iterator[str]:
+    """{"plants": [...]}, the shape imports accept"""
+    yield '{"plants": ['
+    for count, row in enumerate(rows):
+        yield (', ' if count else '') + json.dumps({column: _export_value(row[column]) for column in EXPORT_COLUMNS})
+    yield ']}'
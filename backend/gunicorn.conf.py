@@ -0,0 +1,40 @@
+"""
+Gunicorn configuration for FloraFind
+
+    gunicorn -c gunicorn.conf.py app:app                 # sync (Flask)
+    FLORAFIND_SERVER_MODE=async \
+    gunicorn -c gunicorn.conf.py asgi_app:application    # async (ASGI, uvicorn workers)
+
+serve.py picks the right app for FLORAFIND_SERVER_MODE.
+
+The app is imported and warmed up once in the master, then workers are forked
+so the spaCy model and other read-only state are shared copy-on-write.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("FLORAFIND_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("FLORAFIND_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("FLORAFIND_THREADS", 4))
+preload_app = True
+
+if os.environ.get("FLORAFIND_SERVER_MODE", "sync").lower() == "async":
+    # One event loop per worker; concurrency comes from the loop, not threads
+    worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker forks
+    import startup
+    startup.warm_up(include_db=False)
+    startup.prepare_for_fork()
+
+
+def post_fork(server, worker):
+    # Database connections are per process: never share the master's sockets
+    import db
+    import startup
+    db.reset_pool()
+    startup.warm_up_database()
+    startup.warm_up_nlp_pool()
@@ -0,0 +1,240 @@
+"""
+HTTP response cache for FloraFind reference data
+Read-mostly routes (/, /care_calendar/<plant_id>, /community/challenges) are
+cached in each worker with a per-route TTL, served with ETag, Last-Modified
+and Cache-Control so browsers and a CDN can revalidate (304) or reuse them,
+and dropped early through invalidate() when the data behind them changes.
+Routes whose output depends on today's date are keyed by date and never
+outlive midnight.
+"""
+
+import datetime
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from flask import g, has_request_context
+
+import catalog
+import config
+import metrics
+from structured_logging import get_logger
+
+logger = get_logger('http_cache')
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    ttl: int       # seconds an entry is served from this worker's cache
+    max_age: int   # Cache-Control max-age for browsers and shared caches
+    daily: bool = False  # output depends on today's date
+
+
+POLICIES: Dict[str, RoutePolicy] = {
+    'home': RoutePolicy(ttl=3600, max_age=3600),
+    'care_calendar': RoutePolicy(ttl=config.HTTP_CACHE_CALENDAR_TTL, max_age=config.HTTP_CACHE_CALENDAR_MAX_AGE, daily=True),
+    'care_tips': RoutePolicy(ttl=config.HTTP_CACHE_CALENDAR_TTL, max_age=config.HTTP_CACHE_CALENDAR_MAX_AGE, daily=True),
+    'challenges': RoutePolicy(ttl=config.HTTP_CACHE_CHALLENGES_TTL, max_age=config.HTTP_CACHE_CHALLENGES_MAX_AGE, daily=True),
+    # Standings only change when the challenge_scoring job runs
+    'standings': RoutePolicy(ttl=config.HTTP_CACHE_STANDINGS_TTL, max_age=config.HTTP_CACHE_STANDINGS_TTL),
+    # Neighbours only change when the similar_plants job runs
+    'similar': RoutePolicy(ttl=config.HTTP_CACHE_SIMILAR_TTL, max_age=config.HTTP_CACHE_SIMILAR_TTL),
+}
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    mimetype: str
+    etag: str
+    last_modified: Optional[datetime.datetime]
+    expires_at: float
+    max_age: int
+
+
+def _seconds_to_midnight() -> int:
+    now = datetime.datetime.now()
+    midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+    return max(1, int((midnight - now).total_seconds()))
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, CachedResponse]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: CachedResponse):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, route: str, view_args: Optional[Dict] = None) -> int:
+        """Drop a route's entries (only those for `view_args` when given); returns how many"""
+        wanted = tuple(sorted(view_args.items())) if view_args else None
+        with self._lock:
+            keys = [key for key in self._entries
+                    if key[0] == route and (wanted is None or key[1] == wanted)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+
+_cache = ResponseCache(config.HTTP_CACHE_MAX_ENTRIES)
+
+
+def invalidate(route: str, **view_args) -> int:
+    """Invalidation hook: call after writing the data behind `route` (e.g. invalidate('care_calendar', plant_id=3))"""
+    dropped = _cache.invalidate(route, view_args or None)
+    if dropped:
+        logger.debug("http_cache_invalidated", route=route, entries=dropped, **view_args)
+    return dropped
+
+
+def _request_globals():
+    """The request's `g` under Flask or Quart, or None outside a request"""
+    if has_request_context():
+        return g
+    from quart import g as quart_g, has_request_context as quart_has_request_context
+    return quart_g if quart_has_request_context() else None
+
+
+def set_last_modified(value):
+    """Called by a cached view: when the data in this response last changed"""
+    state = _request_globals()
+    if value is not None and state is not None:
+        if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+            value = datetime.datetime.combine(value, datetime.time())
+        current = getattr(state, 'http_cache_last_modified', None)
+        state.http_cache_last_modified = value if current is None else max(current, value)
+
+
+def no_store():
+    """Called by a cached view: do not cache this response (e.g. an error reported with status 200)"""
+    state = _request_globals()
+    if state is not None:
+        state.http_cache_no_store = True
+
+
+def _key(route: str, policy: RoutePolicy, view_args: Dict, query_string: bytes) -> tuple:
+    today = datetime.date.today().isoformat() if policy.daily else None
+    return route, tuple(sorted(view_args.items())), query_string, today
+
+
+def _entry(body: bytes, mimetype: str, policy: RoutePolicy) -> CachedResponse:
+    lifetime = min(policy.ttl, _seconds_to_midnight()) if policy.daily else policy.ttl
+    max_age = min(policy.max_age, _seconds_to_midnight()) if policy.daily else policy.max_age
+    last_modified = getattr(_request_globals(), 'http_cache_last_modified', None)
+    if policy.daily:
+        # Today's output can differ from yesterday's even when the rows have not changed
+        midnight = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        last_modified = midnight if last_modified is None else max(last_modified, midnight)
+    return CachedResponse(
+        body=body,
+        mimetype=mimetype,
+        etag=hashlib.sha1(body).hexdigest()[:20],
+        last_modified=last_modified.replace(microsecond=0) if last_modified else None,
+        expires_at=time.monotonic() + lifetime,
+        max_age=max_age,
+    )
+
+
+def _not_modified(entry: CachedResponse, request) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(entry.etag)
+    if request.if_modified_since and entry.last_modified:
+        since = request.if_modified_since.replace(tzinfo=None)
+        return entry.last_modified <= since
+    return False
+
+
+def _respond(entry: CachedResponse, request, response_class):
+    if _not_modified(entry, request):
+        response = response_class(b'', status=304)
+    else:
+        response = response_class(entry.body, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    if entry.last_modified:
+        response.last_modified = entry.last_modified
+    response.headers['Cache-Control'] = f'public, max-age={entry.max_age}'
+    return response
+
+
+def cached(route: str):
+    """Cache a Flask or Quart view under POLICIES[route]"""
+    policy = POLICIES[route]
+
+    def decorator(view: Callable):
+        if inspect.iscoroutinefunction(view):
+            from quart import make_response, request, Response
+
+            @functools.wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                if not config.HTTP_CACHE_ENABLED:
+                    return await view(*args, **kwargs)
+                key = _key(route, policy, kwargs, request.query_string)
+                entry = _cache.get(key)
+                metrics.record_cache(f'http_{route}', entry is not None)
+                if entry is None:
+                    response = await make_response(await view(*args, **kwargs))
+                    if response.status_code != 200 or getattr(_request_globals(), 'http_cache_no_store', False):
+                        response.headers['Cache-Control'] = 'no-store'
+                        return response
+                    entry = _entry(await response.get_data(), response.mimetype, policy)
+                    _cache.put(key, entry)
+                return _respond(entry, request, Response)
+
+            return async_wrapper
+
+        from flask import make_response, request, Response
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not config.HTTP_CACHE_ENABLED:
+                return view(*args, **kwargs)
+            key = _key(route, policy, kwargs, request.query_string)
+            entry = _cache.get(key)
+            metrics.record_cache(f'http_{route}', entry is not None)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or g.get('http_cache_no_store') or response.is_streamed:
+                    response.headers['Cache-Control'] = 'no-store'
+                    return response
+                entry = _entry(response.get_data(), response.mimetype, policy)
+                _cache.put(key, entry)
+            return _respond(entry, request, Response)
+
+        return wrapper
+
+    return decorator
+
+
+def _on_catalog_reload(previous, current):
+    """Plants whose updated_at moved since the last catalog load get fresh calendars"""
+    if previous is None:
+        return
+    changed = {entry.plant_id for entry in current.entries
+               if previous.get(entry.plant_id) is None or previous.get(entry.plant_id).updated_at != entry.updated_at}
+    changed.update(plant_id for plant_id in previous.by_id if current.get(plant_id) is None)
+    for plant_id in changed:
+        invalidate('care_calendar', plant_id=plant_id)
+
+
+catalog.add_reload_listener(_on_catalog_reload)
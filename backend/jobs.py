@@ -0,0 +1,187 @@
+"""
+Background jobs for FloraFind
+Jobs register themselves by name; each run is timed, logged and counted.
+Incremental jobs keep their progress in the job_watermarks table, and each job's
+last successful run is kept in job_runs so run-all (run from cron as often as
+the most frequent job needs) only starts the jobs that are due.
+
+    python jobs.py list
+    python jobs.py run search_rollup
+    python jobs.py run-all
+    python jobs.py run-all --force
+"""
+
+import argparse
+import datetime
+import importlib
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import db
+import metrics
+from structured_logging import get_logger
+
+logger = get_logger('jobs')
+
+JOB_DURATION = metrics.Histogram('florafind_job_duration_seconds', 'Background job run time by job')
+JOB_RUNS = metrics.Counter('florafind_job_runs_total', 'Background job runs by job and status')
+
+# Modules whose import registers jobs
+JOB_MODULES = ['search_analytics', 'suggestions', 'plant_heights', 'care_schedule', 'badges', 'challenges',
+               'text_index', 'similar_plants', 'recommendations', 'plant_health', 'activity']
+
+# A job counts as due this early, so a cron run a little before the interval is up does not skip it
+DUE_SLACK_SECONDS = 60
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[..., Dict]
+    interval_seconds: int
+    description: str = ''
+
+
+_registry: Dict[str, Job] = {}
+
+
+def register(name: str, interval_seconds: int):
+    """Decorator registering `func` as a job run every `interval_seconds`"""
+    def decorator(func):
+        _registry[name] = Job(name, func, interval_seconds, (func.__doc__ or '').strip().split('\n')[0])
+        return func
+    return decorator
+
+
+def load_jobs() -> Dict[str, Job]:
+    for module in JOB_MODULES:
+        importlib.import_module(module)
+    return dict(_registry)
+
+
+def run_job(name: str, **kwargs) -> Dict:
+    """Run one job now and return its result summary"""
+    job = load_jobs()[name]
+    started_at = datetime.datetime.now()
+    start = time.perf_counter()
+    try:
+        result = job.func(**kwargs) or {}
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        JOB_DURATION.observe(elapsed, job=name)
+        JOB_RUNS.inc(job=name, status='failed')
+        logger.exception("job_failed", job=name, seconds=round(elapsed, 3), error=str(e))
+        raise
+    elapsed = time.perf_counter() - start
+    JOB_DURATION.observe(elapsed, job=name)
+    JOB_RUNS.inc(job=name, status='ok')
+    logger.info("job_complete", job=name, seconds=round(elapsed, 3), **result)
+    try:
+        record_run(name, started_at)
+    except Exception as e:
+        # The job's work is committed; at worst run-all starts it again early
+        logger.warning("job_run_not_recorded", job=name, error=str(e))
+    return result
+
+
+# Schedule: when each job last completed a run
+
+def last_runs() -> Dict[str, datetime.datetime]:
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT job_name, last_run_at FROM job_runs")
+        return {name: _as_datetime(last_run_at) for name, last_run_at in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def record_run(name: str, started_at: datetime.datetime):
+    """Store the start time of a successful run; the next is due interval_seconds later"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""INSERT INTO job_runs (job_name, last_run_at) VALUES (%s, %s)
+                          ON DUPLICATE KEY UPDATE last_run_at = VALUES(last_run_at)""",
+                       (name, started_at.replace(microsecond=0)))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _as_datetime(value) -> datetime.datetime:
+    return value if isinstance(value, datetime.datetime) else datetime.datetime.fromisoformat(str(value))
+
+
+def due_jobs(jobs: Dict[str, Job], runs: Dict[str, datetime.datetime],
+             now: Optional[datetime.datetime] = None) -> List[str]:
+    """Names of the jobs never run, or last run at least their interval ago"""
+    now = now or datetime.datetime.now()
+    return [name for name, job in jobs.items()
+            if name not in runs
+            or (now - runs[name]).total_seconds() >= job.interval_seconds - DUE_SLACK_SECONDS]
+
+
+# Watermarks: the highest source row id a job has consumed
+
+def get_watermark(cursor, job_name: str) -> int:
+    cursor.execute("SELECT last_id FROM job_watermarks WHERE job_name = %s", (job_name,))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute("INSERT IGNORE INTO job_watermarks (job_name, last_id) VALUES (%s, 0)", (job_name,))
+        return 0
+    return row['last_id'] if isinstance(row, dict) else row[0]
+
+
+def advance_watermark(cursor, job_name: str, previous: int, current: int) -> bool:
+    """Move the watermark forward (current > previous), only if no other run moved it since `previous` was read.
+
+    Call inside the transaction that writes the job's output and roll back when
+    this returns False, so each source row is counted exactly once.
+    """
+    cursor.execute(
+        "UPDATE job_watermarks SET last_id = %s WHERE job_name = %s AND last_id = %s",
+        (current, job_name, previous),
+    )
+    return cursor.rowcount == 1
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(prog='jobs.py')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list')
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('name')
+    run_all_parser = commands.add_parser('run-all')
+    run_all_parser.add_argument('--force', action='store_true', help='run every job, due or not')
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs()
+    if args.command == 'list':
+        for job in jobs.values():
+            print(f"{job.name:24} every {job.interval_seconds:>6}s  {job.description}")
+        return 0
+    if args.command == 'run':
+        if args.name not in jobs:
+            print(f"Unknown job {args.name!r}; available: {', '.join(jobs)}", file=sys.stderr)
+            return 2
+        run_job(args.name)
+        return 0
+
+    due = list(jobs) if args.force else due_jobs(jobs, last_runs())
+    logger.info("run_all", due=due, skipped=[name for name in jobs if name not in due])
+    failed = 0
+    for name in due:
+        try:
+            run_job(name)
+        except Exception:
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Prometheus-style metrics for FloraFind
+Provides counters, gauges and latency histograms, per-stage pipeline timing
+and the Server-Timing breakdown attached to each response
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import g, has_request_context
+
+# Latency buckets in seconds, tuned for API routes and pipeline stages
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List['_Metric'] = []
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+    return '{' + body + '}'
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(key)} {value}' for key, value in items]
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, callback: Optional[Callable[[], Dict[tuple, float]]] = None):
+        """A gauge is either set explicitly or computed at scrape time by `callback`,
+        which returns a mapping of label-key tuples to values"""
+        super().__init__(name, documentation)
+        self._values: Dict[tuple, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        if self._callback:
+            try:
+                items = list(self._callback().items())
+            except Exception:
+                items = []
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f'{self.name}{_format_labels(key)} {value}' for key, value in items]
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._series: Dict[tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0] * (len(self.buckets) + 2)
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                lines.append(f'{self.name}_bucket{_format_labels(key, ("le", str(bound)))} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(key, ("le", "+Inf"))} {series[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {series[-2]}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {series[-1]}')
+        return lines
+
+
+# Core metrics shared across modules
+REQUEST_LATENCY = Histogram('florafind_request_duration_seconds', 'HTTP request latency by route')
+REQUEST_COUNT = Counter('florafind_requests_total', 'HTTP requests by route and status')
+STAGE_LATENCY = Histogram('florafind_stage_duration_seconds', 'Search pipeline stage latency')
+CACHE_REQUESTS = Counter('florafind_cache_requests_total', 'Cache lookups by cache and result')
+DB_POOL_OVERFLOW = Counter('florafind_db_pool_overflow_total', 'Connections opened outside the pool because it was exhausted')
+NLP_REJECTED = Counter('florafind_nlp_rejected_total', 'Requests refused because the NLP executor queue was full')
+
+
+def _cache_hit_ratios() -> Dict[tuple, float]:
+    totals: Dict[str, List[float]] = {}
+    for key, value in list(CACHE_REQUESTS._values.items()):
+        labels = dict(key)
+        counts = totals.setdefault(labels.get('cache', ''), [0, 0])
+        counts[0 if labels.get('result') == 'hit' else 1] += value
+    return {
+        (('cache', cache),): hits / (hits + misses)
+        for cache, (hits, misses) in totals.items() if hits + misses
+    }
+
+
+CACHE_HIT_RATIO = Gauge('florafind_cache_hit_ratio', 'Cache hit ratio since process start', callback=_cache_hit_ratios)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup for the hit-ratio gauge"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into the stage histogram and the Server-Timing breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, stage=name)
+        if has_request_context():
+            timings = g.setdefault('stage_timings', {})
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def server_timing_header(total_seconds: Optional[float] = None) -> Optional[str]:
+    """Build a Server-Timing header value from the stages recorded for this request"""
+    if not has_request_context():
+        return None
+    timings = g.get('stage_timings') or {}
+    parts = [f'{name};dur={elapsed * 1000:.1f}' for name, elapsed in timings.items()]
+    if total_seconds is not None:
+        parts.append(f'total;dur={total_seconds * 1000:.1f}')
+    return ', '.join(parts) if parts else None
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
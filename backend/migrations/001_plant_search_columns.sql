@@ -0,0 +1,24 @@
+-- Search columns on plants, so the search predicates can use indexes
+-- (database_schema.sql already includes these for new installs)
+--
+--   mysql florafind < migrations/001_plant_search_columns.sql
+--   python jobs.py run plant_heights
+--
+-- FULLTEXT indexes back the MATCH ... AGAINST predicates in nlp_search.py; each
+-- MATCH column list must equal one index's column list exactly.
+USE florafind;
+
+ALTER TABLE plants
+    ADD COLUMN growth_height_cm SMALLINT UNSIGNED,
+    ADD COLUMN is_medicinal BOOLEAN GENERATED ALWAYS AS (medicinal_properties IS NOT NULL AND medicinal_properties <> '') STORED,
+    ADD COLUMN is_air_purifying BOOLEAN GENERATED ALWAYS AS (IFNULL(LOWER(eco_benefits) LIKE '%air purif%', FALSE)) STORED,
+    ADD COLUMN is_indoor BOOLEAN GENERATED ALWAYS AS (IFNULL(LOWER(climate) LIKE '%indoor%', FALSE)
+                                                      OR IFNULL(LOWER(care_instructions) LIKE '%indoor%', FALSE)) STORED,
+    ADD INDEX idx_plants_name (name),
+    ADD INDEX idx_plants_growth_height (growth_height_cm);
+
+-- InnoDB builds one FULLTEXT index per statement without a table rebuild
+ALTER TABLE plants ADD FULLTEXT INDEX ft_plants_names (name, scientific_name);
+ALTER TABLE plants ADD FULLTEXT INDEX ft_plants_keywords (name, care_instructions, medicinal_properties);
+ALTER TABLE plants ADD FULLTEXT INDEX ft_plants_care (care_instructions);
+ALTER TABLE plants ADD FULLTEXT INDEX ft_plants_eco (eco_benefits);
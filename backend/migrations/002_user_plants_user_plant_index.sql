@@ -0,0 +1,9 @@
+-- (user_id, plant_id) index on user_plants, so "which of these plants does this
+-- user already grow" (garden imports, /add_to_garden) is an index range read
+-- (database_schema.sql already includes it for new installs)
+--
+--   mysql florafind < migrations/002_user_plants_user_plant_index.sql
+USE florafind;
+
+ALTER TABLE user_plants
+    ADD INDEX idx_user_plants_user_plant (user_id, plant_id);
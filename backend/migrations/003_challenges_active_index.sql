@@ -0,0 +1,8 @@
+-- Index for the active-challenges listing (is_active = 1 AND end_date >= CURDATE())
+-- (database_schema.sql already includes it for new installs)
+--
+--   mysql florafind < migrations/003_challenges_active_index.sql
+USE florafind;
+
+ALTER TABLE plant_challenges
+    ADD INDEX idx_challenges_active_end (is_active, end_date);
@@ -0,0 +1,20 @@
+-- Denormalized user stats behind /user_stats (user_stats.py); rows are built
+-- from users, user_plants, user_badges and care_activities on first use, so
+-- no backfill is needed
+-- (database_schema.sql already includes it for new installs)
+--
+--   mysql florafind < migrations/004_user_stats.sql
+USE florafind;
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INT PRIMARY KEY,
+    points INT NOT NULL DEFAULT 0,
+    level INT NOT NULL DEFAULT 1,
+    badge_count INT NOT NULL DEFAULT 0,
+    plant_count INT NOT NULL DEFAULT 0,
+    streak_days INT NOT NULL DEFAULT 0,
+    last_activity_date DATE NULL,
+    version INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
@@ -0,0 +1,14 @@
+-- Running per-user counters for the badge engine (badges.py); fill them and
+-- award badges already earned with `python jobs.py run badge_backfill`
+-- (database_schema.sql already includes it for new installs)
+--
+--   mysql florafind < migrations/005_user_badge_counters.sql
+USE florafind;
+
+CREATE TABLE IF NOT EXISTS user_badge_counters (
+    user_id INT NOT NULL,
+    counter VARCHAR(40) NOT NULL,
+    value INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, counter),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
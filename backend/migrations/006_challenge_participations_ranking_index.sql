@@ -0,0 +1,9 @@
+-- Index for /community/challenges/<id>/standings, which pages through the
+-- rankings stored by the challenge_scoring job in (ranking, participation_id) order
+-- (database_schema.sql already includes it for new installs)
+--
+--   mysql florafind < migrations/006_challenge_participations_ranking_index.sql
+USE florafind;
+
+ALTER TABLE challenge_participations
+    ADD INDEX idx_participations_challenge_ranking (challenge_id, ranking);
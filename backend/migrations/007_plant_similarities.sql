@@ -0,0 +1,16 @@
+-- Table behind /similar/<plant_id>: each plant's top-k neighbours, computed by the
+-- similar_plants job (database_schema.sql already includes it for new installs).
+-- Fill it after migrating with: python jobs.py run similar_plants_rebuild
+--
+--   mysql florafind < migrations/007_plant_similarities.sql
+USE florafind;
+
+CREATE TABLE IF NOT EXISTS plant_similarities (
+    plant_id INT NOT NULL,
+    neighbor_rank SMALLINT UNSIGNED NOT NULL, -- 1 = most similar
+    similar_plant_id INT NOT NULL,
+    score FLOAT NOT NULL, -- cosine similarity of the two plants' attribute vectors
+    PRIMARY KEY (plant_id, neighbor_rank),
+    FOREIGN KEY (plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE,
+    FOREIGN KEY (similar_plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE
+);
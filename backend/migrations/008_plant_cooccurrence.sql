@@ -0,0 +1,18 @@
+-- Table behind /recommendations/<user_id>: each plant's most related plants by
+-- gardeners growing both, rebuilt nightly by the plant_cooccurrence job
+-- (database_schema.sql already includes it for new installs).
+-- Fill it after migrating with: python jobs.py run plant_cooccurrence
+--
+--   mysql florafind < migrations/008_plant_cooccurrence.sql
+USE florafind;
+
+CREATE TABLE IF NOT EXISTS plant_cooccurrence (
+    plant_id INT NOT NULL,
+    neighbor_rank SMALLINT UNSIGNED NOT NULL, -- 1 = most related
+    other_plant_id INT NOT NULL,
+    users INT NOT NULL, -- gardeners growing both plants
+    score FLOAT NOT NULL, -- users / sqrt(growers of plant_id * growers of other_plant_id)
+    PRIMARY KEY (plant_id, neighbor_rank),
+    FOREIGN KEY (plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE,
+    FOREIGN KEY (other_plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE
+);
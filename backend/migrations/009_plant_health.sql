@@ -0,0 +1,18 @@
+-- Health decay for neglected plants: an index for finding overdue care tasks and
+-- the daily history behind /my_garden/<user_id>/health trend charts
+-- (database_schema.sql already includes both for new installs).
+--
+--   mysql florafind < migrations/009_plant_health.sql
+USE florafind;
+
+ALTER TABLE care_schedules
+    ADD INDEX idx_care_schedules_due (is_active, next_due_date);
+
+CREATE TABLE IF NOT EXISTS plant_health_history (
+    user_plant_id INT NOT NULL,
+    recorded_on DATE NOT NULL,
+    health_score INT NOT NULL, -- current_health_score at the day's last change
+    decay INT NOT NULL DEFAULT 0, -- points lost to overdue care that day
+    PRIMARY KEY (user_plant_id, recorded_on),
+    FOREIGN KEY (user_plant_id) REFERENCES user_plants(user_plant_id) ON DELETE CASCADE
+);
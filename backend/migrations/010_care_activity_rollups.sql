@@ -0,0 +1,30 @@
+-- Care activity history: an index for a plant's care history and the daily
+-- per-user rollup behind /activity/<user_id>, streak rebuilds and the badge
+-- backfill (database_schema.sql already includes both for new installs).
+-- The INSERT fills the rollup from existing care_activities. Run the script once
+-- (the ALTER fails a second time); to pick up tasks completed before the deploy,
+-- rerun only the INSERT. GREATEST keeps it from lowering days that
+-- care_activities_compact has since pruned from care_activities.
+--
+--   mysql florafind < migrations/010_care_activity_rollups.sql
+USE florafind;
+
+ALTER TABLE care_activities
+    ADD INDEX idx_care_activities_plant_date (user_plant_id, completed_date);
+
+CREATE TABLE IF NOT EXISTS user_activity_daily (
+    user_id INT NOT NULL,
+    activity_date DATE NOT NULL,
+    task_type VARCHAR(20) NOT NULL,
+    tasks INT NOT NULL DEFAULT 0,
+    points INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, activity_date, task_type),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+INSERT INTO user_activity_daily (user_id, activity_date, task_type, tasks, points)
+SELECT up.user_id, ca.completed_date, ca.task_type, COUNT(*), COALESCE(SUM(ca.points_earned), 0)
+FROM care_activities ca
+JOIN user_plants up ON ca.user_plant_id = up.user_plant_id
+GROUP BY up.user_id, ca.completed_date, ca.task_type
+ON DUPLICATE KEY UPDATE tasks = GREATEST(tasks, VALUES(tasks)), points = GREATEST(points, VALUES(points));
@@ -0,0 +1,45 @@
+-- Search analytics behind /analytics/search: the job_watermarks table every
+-- incremental job keeps its progress in, the hourly/daily rollups of search_logs
+-- and a timestamp index for the search_logs_prune cutoff
+-- (database_schema.sql already includes them for new installs).
+-- Fill the rollups after migrating with: python jobs.py run search_rollup
+--
+--   mysql florafind < migrations/011_search_analytics.sql
+USE florafind;
+
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    job_name VARCHAR(50) PRIMARY KEY,
+    last_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+ALTER TABLE search_logs
+    ADD INDEX idx_search_logs_timestamp (timestamp);
+
+CREATE TABLE IF NOT EXISTS search_stats (
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    search_type VARCHAR(10) NOT NULL,
+    language VARCHAR(5) NOT NULL,
+    searches INT NOT NULL DEFAULT 0,
+    zero_results INT NOT NULL DEFAULT 0,
+    total_results INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, search_type, language)
+);
+
+CREATE TABLE IF NOT EXISTS search_query_stats (
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    query VARCHAR(255) NOT NULL,
+    searches INT NOT NULL DEFAULT 0,
+    zero_results INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, query)
+);
+
+CREATE TABLE IF NOT EXISTS search_term_stats (
+    granularity ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    term VARCHAR(64) NOT NULL,
+    searches INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, term)
+);
@@ -0,0 +1,20 @@
+-- Zero-result suggestions: the search_plant_affinity table the search_suggestions
+-- job rebuilds, and the user_plants.created_at index its lookback query reads
+-- (database_schema.sql already includes both for new installs).
+-- Fill the table after migrating with: python jobs.py run search_suggestions
+--
+--   mysql florafind < migrations/012_search_plant_affinity.sql
+USE florafind;
+
+ALTER TABLE user_plants
+    ADD INDEX idx_user_plants_created (created_at);
+
+CREATE TABLE IF NOT EXISTS search_plant_affinity (
+    modifier_key VARCHAR(150) NOT NULL, -- e.g. "difficulty=beginner|season=summer"
+    plant_id INT NOT NULL,
+    users INT NOT NULL,
+    position INT NOT NULL,
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (modifier_key, plant_id),
+    FOREIGN KEY (plant_id) REFERENCES plants(plant_id) ON DELETE CASCADE
+);
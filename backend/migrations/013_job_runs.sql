@@ -0,0 +1,11 @@
+-- Last successful run of each background job, so `python jobs.py run-all`
+-- from cron starts only the jobs whose interval has passed
+-- (database_schema.sql already includes it for new installs).
+--
+--   mysql florafind < migrations/013_job_runs.sql
+USE florafind;
+
+CREATE TABLE IF NOT EXISTS job_runs (
+    job_name VARCHAR(50) PRIMARY KEY,
+    last_run_at DATETIME NOT NULL -- start of the last successful run
+);
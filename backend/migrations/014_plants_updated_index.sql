@@ -0,0 +1,9 @@
+-- Index for the catalog freshness check (MAX(updated_at) FROM plants) that search
+-- runs before trusting the in-memory filters to skip a query with no matches
+-- (database_schema.sql already includes it for new installs)
+--
+--   mysql florafind < migrations/014_plants_updated_index.sql
+USE florafind;
+
+ALTER TABLE plants
+    ADD INDEX idx_plants_updated (updated_at);
@@ -0,0 +1,47 @@
+"""
+Shared spaCy model loading for FloraFind
+spaCy is imported on first use and each model is loaded once per process,
+so importing the search modules stays cheap and all engines share one copy
+"""
+
+import threading
+
+import metrics
+from structured_logging import get_logger
+
+logger = get_logger('nlp_models')
+
+DEFAULT_MODEL = "en_core_web_sm"
+
+_models = {}
+_lock = threading.Lock()
+_MISSING = object()
+
+
+def get_spacy_model(name: str = DEFAULT_MODEL):
+    """Return the loaded spaCy pipeline, or None when spaCy or the model is unavailable"""
+    model = _models.get(name, _MISSING)
+    if model is not _MISSING:
+        return model
+    with _lock:
+        model = _models.get(name, _MISSING)
+        if model is _MISSING:
+            model = _load(name)
+            _models[name] = model
+    return model
+
+
+def _load(name: str):
+    try:
+        with metrics.stage('spacy_load'):
+            import spacy
+            return spacy.load(name)
+    except ImportError:
+        logger.warning("spacy_not_installed")
+    except OSError:
+        logger.warning("spacy_model_missing", model=name, hint=f"python -m spacy download {name}")
+    return None
+
+
+def is_loaded(name: str = DEFAULT_MODEL) -> bool:
+    return name in _models
@@ -0,0 +1,220 @@
+"""
+NLP worker processes for FloraFind
+spaCy parsing is CPU-bound and holds the GIL, so under a threaded server search
+throughput stops at one core. With FLORAFIND_NLP_PROCESSES=N, parsing runs in N
+worker processes that each load the model once. A dispatcher thread hands
+queued texts to free workers, and concurrent queries go to one worker together
+as a single nlp.pipe() batch. Workers send back a compact tuple form of each
+Doc, which parse() wraps so callers can read it like a spaCy Doc.
+
+With FLORAFIND_NLP_PROCESSES=0 (the default) parse() runs the model in the
+calling thread.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from functools import partial
+from typing import List, Optional
+
+import config
+import metrics
+from nlp_models import DEFAULT_MODEL, get_spacy_model
+from structured_logging import get_logger
+
+logger = get_logger('nlp_pool')
+
+NLP_BATCH_SIZE = metrics.Histogram('florafind_nlp_batch_size', 'Queries parsed per worker batch',
+                                   buckets=(1, 2, 4, 8, 16, 32, 64))
+NLP_TIMEOUTS = metrics.Counter('florafind_nlp_timeouts_total', 'Parses abandoned after FLORAFIND_NLP_TIMEOUT')
+
+# The token and entity attributes the search code reads, under spaCy's names
+Token = namedtuple('Token', ['text', 'lemma_', 'pos_', 'tag_', 'is_stop', 'is_punct'])
+Entity = namedtuple('Entity', ['text', 'label_'])
+
+
+class ParsedDoc:
+    """Read-only stand-in for a spaCy Doc rebuilt from a worker's serialized parse"""
+
+    __slots__ = ('text', 'tokens', 'ents')
+
+    def __init__(self, text, tokens, ents):
+        self.text = text
+        self.tokens = [Token(*token) for token in tokens]
+        self.ents = [Entity(*ent) for ent in ents]
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+class NLPTimeout(Exception):
+    """Raised when a parse does not finish within FLORAFIND_NLP_TIMEOUT"""
+
+
+def serialize_doc(doc):
+    return (
+        doc.text,
+        tuple((t.text, t.lemma_, t.pos_, t.tag_, t.is_stop, t.is_punct) for t in doc),
+        tuple((e.text, e.label_) for e in doc.ents),
+    )
+
+
+def _init_worker(model_name):
+    # Runs once in each worker process: load the model before the first batch arrives
+    get_spacy_model(model_name)
+
+
+def _parse_batch(model_name, texts):
+    nlp = get_spacy_model(model_name)
+    if nlp is None:
+        return [None] * len(texts)
+    return [serialize_doc(doc) for doc in nlp.pipe(texts, batch_size=len(texts))]
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+class NLPWorkerPool:
+    """Worker processes fed by a queue that is drained into per-worker batches"""
+
+    def __init__(self, processes: int, model_name: str = DEFAULT_MODEL, max_batch: int = 16):
+        self.processes = processes
+        self.model_name = model_name
+        self.max_batch = max(1, max_batch)
+        # spawn, not fork: the parent has threads (server, dispatcher) that fork would not carry over safely
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(model_name,),
+        )
+        self._queue = queue.Queue()
+        self._free_workers = threading.Semaphore(processes)
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name='nlp-dispatch', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def parse(self, text: str, timeout: Optional[float] = None) -> Optional[ParsedDoc]:
+        """Parse one text in a worker; None when the model is unavailable there"""
+        future = self.submit(text)
+        try:
+            result = future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            NLP_TIMEOUTS.inc()
+            raise NLPTimeout(f"parse exceeded {timeout}s")
+        return ParsedDoc(*result) if result is not None else None
+
+    def warm_up(self) -> List[int]:
+        """Start every worker (loading its model) and return their pids"""
+        jobs = [self._executor.submit(_worker_pid) for _ in range(self.processes)]
+        return sorted({job.result() for job in jobs})
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _dispatch(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            # Wait for a free worker; requests arriving meanwhile join this batch
+            self._free_workers.acquire()
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            # Drop requests whose caller already timed out
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch or self._closed:
+                self._free_workers.release()
+                continue
+            NLP_BATCH_SIZE.observe(len(batch))
+            try:
+                job = self._executor.submit(_parse_batch, self.model_name, [text for text, _ in batch])
+            except RuntimeError as e:
+                # Executor shut down or broken
+                self._free_workers.release()
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            job.add_done_callback(partial(self._resolve, batch))
+
+    def _resolve(self, batch, job):
+        self._free_workers.release()
+        try:
+            results = job.result()
+        except Exception as e:
+            logger.error("nlp_batch_failed", size=len(batch), error=str(e))
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[NLPWorkerPool]:
+    """The process's worker pool, or None when FLORAFIND_NLP_PROCESSES is 0"""
+    global _pool, _pool_pid
+    if config.NLP_PROCESSES <= 0:
+        return None
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                # A pool inherited across fork has no live dispatcher thread: start a new one
+                _pool = NLPWorkerPool(config.NLP_PROCESSES, max_batch=config.NLP_MAX_BATCH)
+                _pool_pid = os.getpid()
+                logger.info("nlp_pool_started", processes=config.NLP_PROCESSES, max_batch=config.NLP_MAX_BATCH)
+    return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+
+atexit.register(shutdown)
+
+
+def parse(text: str, nlp=None):
+    """Parse `text` in the worker pool when enabled, otherwise with `nlp` in this thread.
+
+    Returns a spaCy Doc or ParsedDoc (same token/entity attributes), or None when
+    no model is available. Raises NLPTimeout when a worker does not answer in time.
+    """
+    pool = get_pool()
+    if pool is None:
+        return nlp(text) if nlp is not None else None
+    return pool.parse(text, timeout=config.NLP_TIMEOUT_SECONDS)
+
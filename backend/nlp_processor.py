@@ -3,23 +3,22 @@ Enhanced NLP module for FloraFind with advanced plant query processing
 Includes intent recognition, entity extraction, and multilingual support
 """
 
-import spacy
 import re
-from rapidfuzz import fuzz, process
-from langdetect import detect
+import threading
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 
+import filters
+import nlp_pool
+from nlp_models import get_spacy_model
+from similarity import best_scores
+
 class PlantQueryProcessor:
     def __init__(self):
         """Initialize the NLP processor with language models"""
-        try:
-            # Load English model
-            self.nlp_en = spacy.load("en_core_web_sm")
-        except OSError:
-            print("⚠️ English spaCy model not found. Install with: python -m spacy download en_core_web_sm")
-            self.nlp_en = None
+        # Shared English model (loaded once per process)
+        self.nlp_en = get_spacy_model()
         
         # Plant care intent patterns
         self.intent_patterns = {
@@ -36,19 +35,12 @@ class PlantQueryProcessor:
             'climate': ['climate', 'temperature', 'humid', 'dry', 'tropical', 'cold']
         }
         
-        # Plant categories for filtering
-        self.plant_categories = {
-            'fruit': ['fruit', 'fruiting', 'berry', 'berries', 'apple', 'orange', 'citrus', 'edible fruit'],
-            'flower': ['flower', 'flowering', 'bloom', 'blossom', 'ornamental', 'decorative'],
-            'medicinal': ['medicinal', 'medicine', 'healing', 'therapeutic', 'remedy', 'health', 'ayurvedic'],
-            'herb': ['herb', 'herbs', 'spice', 'seasoning', 'culinary', 'kitchen', 'cooking'],
-            'vegetable': ['vegetable', 'vegetables', 'veggie', 'edible', 'food', 'crop'],
-            'succulent': ['succulent', 'cactus', 'cacti', 'desert', 'drought-resistant'],
-            'tree': ['tree', 'shrub', 'woody', 'timber', 'shade'],
-            'climber': ['climber', 'vine', 'creeper', 'climbing', 'trailing'],
-            'aquatic': ['aquatic', 'water', 'pond', 'floating', 'submerged'],
-            'air_purifying': ['air purifying', 'air purifier', 'clean air', 'oxygen', 'detoxifying']
-        }
+        # Flattened intent keywords, fuzzy-scored against the query words in one batch
+        self._intent_keywords = [keyword for keywords in self.intent_patterns.values() for keyword in keywords]
+        
+        # Plant categories for filtering: the search categories plus their looser hints
+        self.filters = filters.get_registry()
+        self.plant_categories = self.filters.vocabulary('category', include_hints=True)
         
         # Plant name aliases and common names
         self.plant_aliases = {
@@ -67,6 +59,7 @@ class PlantQueryProcessor:
     def detect_language(self, text: str) -> str:
         """Detect the language of input text"""
         try:
+            from langdetect import detect
             return detect(text)
         except:
             return 'en'
@@ -85,7 +78,10 @@ class PlantQueryProcessor:
         if not self.nlp_en:
             return entities
         
-        doc = self.nlp_en(text.lower())
+        try:
+            doc = nlp_pool.parse(text.lower(), self.nlp_en)
+        except nlp_pool.NLPTimeout:
+            doc = None
         
         # Extract plant names using aliases
         for plant, aliases in self.plant_aliases.items():
@@ -95,7 +91,7 @@ class PlantQueryProcessor:
                         entities['plants'].append(plant)
         
         # Extract locations and seasonal info
-        for token in doc:
+        for token in (doc or ()):
             if token.pos_ in ['NOUN', 'PROPN']:
                 # Check for location indicators
                 if any(loc in token.text for loc in ['indoor', 'outdoor', 'garden', 'balcony']):
@@ -112,31 +108,23 @@ class PlantQueryProcessor:
         
     def extract_plant_categories(self, text: str) -> List[str]:
         """Extract plant categories from the query text"""
-        text_lower = text.lower()
-        categories = []
-        
-        # Check for category keywords in the text
-        for category, keywords in self.plant_categories.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    categories.append(category)
-                    break
-        
-        return list(set(categories))  # Remove duplicates
+        return self.filters.detect_categories(text, include_hints=True)
     
     def classify_intent(self, text: str) -> Tuple[str, float]:
         """Classify the main intent of the query"""
         text_lower = text.lower()
         intent_scores = {}
         
+        # Best fuzzy score of every keyword against any query word
+        fuzzy_scores = iter(best_scores(self._intent_keywords, text_lower.split()))
+        
         for intent, keywords in self.intent_patterns.items():
             score = 0
             for keyword in keywords:
                 if keyword in text_lower:
                     score += 1
                 # Check for fuzzy matches
-                matches = process.extract(keyword, text_lower.split(), limit=1)
-                if matches and matches[0][1] > 80:
+                if next(fuzzy_scores) > 80:
                     score += 0.5
             
             if score > 0:
@@ -367,14 +355,26 @@ class ConversationMemory:
         }
 
 
-# Initialize global instances
-query_processor = PlantQueryProcessor()
+# Global instances; the processor is built on first use so importing this module stays cheap
+_query_processor = None
+_query_processor_lock = threading.Lock()
 conversation_memory = ConversationMemory()
 
+def get_query_processor() -> PlantQueryProcessor:
+    """Return the shared PlantQueryProcessor, creating it on first call"""
+    global _query_processor
+    if _query_processor is None:
+        with _query_processor_lock:
+            if _query_processor is None:
+                _query_processor = PlantQueryProcessor()
+    return _query_processor
+
 def process_plant_query(query: str, user_id: int = None) -> Dict[str, any]:
     """
     Main function to process plant queries with full NLP analysis
     """
+    query_processor = get_query_processor()
+    
     # Process the query
     processed = query_processor.generate_response_context(query)
     
@@ -1,36 +1,45 @@
-import spacy
-import mysql.connector
 from collections import defaultdict
 import re
-from fuzzywuzzy import fuzz, process
+import threading
+import time
 import json
+from collections import OrderedDict
 from datetime import datetime
 
+import care_tips
+import catalog
+import config
+import db
+import filters
+import metrics
+import nlp_pool
+import pagination
+import text_index
+from nlp_models import get_spacy_model
+from similarity import normalize, partial_ratio_many
+from filters import text_match
+from structured_logging import get_logger
+
+logger = get_logger('search')
+
+# Keys of a /query continuation token: text_score, search_rank, sort_eco, name, plant_id
+SEARCH_CURSOR_LENGTH = 5
+# BM25 scores (relative to the best match) go into SQL as integer millionths, so the keyset compares exactly
+TEXT_SCORE_SCALE = 1000000
+
 class FloraFindNLPSearch:
     def __init__(self, db_config):
-        # Load spaCy model
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            print("SpaCy model not found. Please install: python -m spacy download en_core_web_sm")
-            self.nlp = None
+        # Shared spaCy model (loaded once per process)
+        self.nlp = get_spacy_model()
         
         self.db_config = db_config
         
-        # Plant-specific vocabulary and synonyms
+        # Plant-specific vocabulary and synonyms; seasons, difficulty and plant types
+        # come from the filter registry, which also turns them into search predicates
+        self.filters = filters.get_registry()
         self.plant_vocabulary = {
-            'seasons': {
-                'summer': ['summer', 'hot', 'sunny', 'warm', 'heat'],
-                'winter': ['winter', 'cold', 'cool', 'frost', 'chilly'],
-                'spring': ['spring', 'bloom', 'flowering', 'growth'],
-                'monsoon': ['monsoon', 'rainy', 'rain', 'wet', 'humid'],
-                'all_seasons': ['year-round', 'always', 'continuous', 'perennial']
-            },
-            'difficulty': {
-                'beginner': ['beginner', 'easy', 'simple', 'low-maintenance', 'basic', 'starter', 'first-time'],
-                'intermediate': ['intermediate', 'moderate', 'medium', 'some-care'],
-                'advanced': ['advanced', 'expert', 'difficult', 'challenging', 'high-maintenance']
-            },
+            'seasons': self.filters.vocabulary('season'),
+            'difficulty': self.filters.vocabulary('difficulty'),
             'care_type': {
                 'watering': ['water', 'watering', 'irrigation', 'hydration', 'moisture'],
                 'sunlight': ['sun', 'light', 'sunlight', 'bright', 'shade', 'shadow'],
@@ -38,13 +47,7 @@ class FloraFindNLPSearch:
                 'pruning': ['prune', 'trim', 'cut', 'deadhead', 'pinch'],
                 'pest_control': ['pest', 'insect', 'bug', 'disease', 'fungus']
             },
-            'plant_types': {
-                'indoor': ['indoor', 'houseplant', 'inside', 'home', 'apartment'],
-                'outdoor': ['outdoor', 'garden', 'yard', 'outside'],
-                'medicinal': ['medicinal', 'healing', 'herb', 'remedy', 'therapeutic'],
-                'flowering': ['flower', 'bloom', 'blossom', 'colorful'],
-                'foliage': ['leaves', 'green', 'foliage']
-            },
+            'plant_types': self.filters.vocabulary('type'),
             'benefits': {
                 'air_purifying': ['air-purifying', 'clean-air', 'oxygen', 'purify'],
                 'fragrant': ['fragrant', 'scented', 'aromatic', 'smell'],
@@ -71,8 +74,14 @@ class FloraFindNLPSearch:
         if not self.nlp:
             return self._basic_preprocess(query)
         
-        # Process with spaCy
-        doc = self.nlp(query.lower())
+        # Process with spaCy (in a worker process when the NLP pool is enabled)
+        try:
+            doc = nlp_pool.parse(query.lower(), self.nlp)
+        except nlp_pool.NLPTimeout as e:
+            logger.warning("nlp_parse_timeout", error=str(e))
+            doc = None
+        if doc is None:
+            return self._basic_preprocess(query)
         
         processed_info = {
             'original_query': query,
@@ -190,187 +199,232 @@ class FloraFindNLPSearch:
 
     def _extract_modifiers(self, lemmas):
         """Extract modifying terms like difficulty, season, etc."""
-        modifiers = []
-        
-        # Check seasons
-        for season, terms in self.plant_vocabulary['seasons'].items():
-            if any(term in lemmas for term in terms):
-                modifiers.append(('season', season))
-        
-        # Check difficulty
-        for difficulty, terms in self.plant_vocabulary['difficulty'].items():
-            if any(term in lemmas for term in terms):
-                modifiers.append(('difficulty', difficulty))
-        
-        # Check plant types
-        for plant_type, terms in self.plant_vocabulary['plant_types'].items():
-            if any(term in lemmas for term in terms):
-                modifiers.append(('type', plant_type))
-        
-        return modifiers
+        return self.filters.detect_modifiers(lemmas)
 
-    def semantic_search(self, processed_query):
-        """Perform semantic search based on processed query"""
+    def semantic_search(self, processed_query, after=None, limit=pagination.DEFAULT_PAGE_SIZE, light=False):
+        """Perform semantic search based on processed query (light: skip the per-plant metadata)"""
         try:
-            conn = mysql.connector.connect(**self.db_config)
-            cursor = conn.cursor(dictionary=True)
-            
-            # Build dynamic query based on semantic understanding
-            search_conditions = []
-            search_params = []
+            if self.filters_exclude_all(processed_query):
+                logger.debug("semantic_search_skipped", categories=processed_query.get('categories', []))
+                return self.build_search_response([], processed_query, light=light)
             
-            # Check for plant categories in the query (NEW)
-            if 'categories' in processed_query and processed_query['categories']:
-                print(f"Processing categories in search: {processed_query['categories']}")
-                category_conditions = []
-                for category in processed_query['categories']:
-                    if category == 'fruit':
-                        category_conditions.append("(LOWER(name) LIKE %s OR LOWER(eco_benefits) LIKE %s)")
-                        search_params.extend(["%fruit%", "%edible fruit%"])
-                    elif category == 'flower':
-                        category_conditions.append("(LOWER(name) LIKE %s)")
-                        search_params.append("%flower%")
-                    elif category == 'medicinal':
-                        category_conditions.append("(medicinal_properties IS NOT NULL AND medicinal_properties != '')")
-                    elif category == 'herb':
-                        category_conditions.append("(LOWER(name) LIKE %s)")
-                        search_params.append("%herb%")
-                    elif category == 'vegetable':
-                        category_conditions.append("(LOWER(name) LIKE %s OR LOWER(eco_benefits) LIKE %s)")
-                        search_params.extend(["%vegetable%", "%edible%"])
-                    elif category == 'succulent':
-                        category_conditions.append("(LOWER(name) LIKE %s OR LOWER(climate) LIKE %s)")
-                        search_params.extend(["%succulent%", "%arid%"])
-                    elif category == 'tree':
-                        category_conditions.append("(LOWER(name) LIKE %s OR LOWER(growth_height) > %s)")
-                        search_params.extend(["%tree%", "200"])
-                    elif category == 'climber':
-                        category_conditions.append("(LOWER(name) LIKE %s OR LOWER(care_instructions) LIKE %s)")
-                        search_params.extend(["%climber%", "%climbing%"])
-                    elif category == 'aquatic':
-                        category_conditions.append("(LOWER(name) LIKE %s OR LOWER(climate) LIKE %s)")
-                        search_params.extend(["%aquatic%", "%water%"])
-                    elif category == 'air_purifying':
-                        category_conditions.append("(LOWER(eco_benefits) LIKE %s)")
-                        search_params.append("%air purif%")
-                
-                if category_conditions:
-                    search_conditions.append(f"({' OR '.join(category_conditions)})")
-                    print(f"Added category conditions: {' OR '.join(category_conditions)}")
-            
-            # 1. Direct plant mentions (HIGHEST priority - exact matching)
-            if processed_query['plant_mentions']:
-                plant_name_conditions = []
-                for plant in processed_query['plant_mentions']:
-                    # Exact name matching gets highest priority
-                    plant_name_conditions.append("(LOWER(name) = %s OR LOWER(name) LIKE %s OR LOWER(scientific_name) LIKE %s)")
-                    search_params.extend([plant.lower(), f"%{plant}%", f"%{plant}%"])
-                search_conditions.append(f"({' OR '.join(plant_name_conditions)})")
+            final_query, search_params = self.build_search_sql(processed_query, after, limit)
             
-            # 2. Check for specific plant keywords in the query
-            query_lower = processed_query['original_query'].lower()
-            direct_plant_matches = []
-            for plant_name, aliases in self.plant_aliases.items():
-                if plant_name in query_lower or any(alias in query_lower for alias in aliases):
-                    direct_plant_matches.append(plant_name)
-            
-            if direct_plant_matches:
-                plant_exact_conditions = []
-                for plant in direct_plant_matches:
-                    plant_exact_conditions.append("(LOWER(name) = %s OR LOWER(name) LIKE %s)")
-                    search_params.extend([plant.lower(), f"%{plant}%"])
-                search_conditions.append(f"({' OR '.join(plant_exact_conditions)})")
+            conn = db.get_connection()
+            cursor = conn.cursor(dictionary=True)
             
-            # 3. Apply season filters STRICTLY
-            season_filter_applied = False
-            for modifier_type, modifier_value in processed_query['modifiers']:
-                if modifier_type == 'season' and modifier_value != 'all_seasons':
-                    search_conditions.append("(LOWER(season) LIKE %s OR LOWER(season) = %s)")
-                    search_params.extend([f"%{modifier_value}%", modifier_value])
-                    season_filter_applied = True
-                elif modifier_type == 'difficulty':
-                    search_conditions.append("difficulty_level = %s")
-                    search_params.append(modifier_value)
-                elif modifier_type == 'type':
-                    if modifier_value == 'medicinal':
-                        search_conditions.append("medicinal_properties IS NOT NULL AND medicinal_properties != ''")
-                    elif modifier_value == 'indoor':
-                        search_conditions.append("(LOWER(climate) LIKE %s OR LOWER(care_instructions) LIKE %s)")
-                        search_params.extend(["%indoor%", "%indoor%"])
+            logger.debug("semantic_search_sql", params=len(search_params), categories=processed_query.get('categories', []))
+            with metrics.stage('sql'):
+                cursor.execute(final_query, search_params)
+                results = cursor.fetchall()
             
-            # 4. Only do broad keyword matching if no specific plant was found and no category filter
-            if not processed_query['plant_mentions'] and not direct_plant_matches and not ('categories' in processed_query and processed_query['categories']):
-                if processed_query['keywords']:
-                    keyword_conditions = []
-                    for keyword in processed_query['keywords'][:2]:  # Limit to 2 most important keywords
-                        if keyword not in ['plant', 'plants', 'care', 'grow']:  # Skip generic terms
-                            keyword_conditions.append("""
-                                (LOWER(name) LIKE %s OR 
-                                 LOWER(care_instructions) LIKE %s OR
-                                 LOWER(medicinal_properties) LIKE %s)
-                            """)
-                            search_params.extend([f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"])
-                    
-                    if keyword_conditions:
-                        search_conditions.append(f"({' OR '.join(keyword_conditions)})")
+            cursor.close()
+            conn.close()
             
-            # Combine all conditions
-            where_clause = " AND ".join(search_conditions) if search_conditions else "1=1"
+            results, next_cursor = self.split_page(results, processed_query, limit)
+            return self.build_search_response(results, processed_query, next_cursor, light)
             
-            # Build final query with intelligent ranking
-            final_query = f"""
+        except Exception as e:
+            logger.exception("semantic_search_failed", error=str(e))
+            return {'plants': [], 'error': str(e)}
+
+    def filters_exclude_all(self, processed_query):
+        """True when the loaded catalog shows no plant passes the query's category and modifier filters"""
+        current = self.excluding_catalog(processed_query)
+        return current is not None and catalog.is_current(current)
+
+    def excluding_catalog(self, processed_query):
+        """The loaded catalog if its bitsets show no plant passes the query's filters, else None.
+
+        Only filters whose in-memory test is exact count (FULLTEXT is emulated), and
+        the answer holds only while the catalog is current: check catalog.is_current
+        (or CATALOG_VERSION) before skipping the query.
+        """
+        categories = processed_query.get('categories') or []
+        modifiers = processed_query['modifiers']
+        current = catalog.current_catalog()
+        if current is None or not (categories or modifiers) or not self.filters.exact(categories, modifiers):
+            return None
+        return None if current.any_filter_match(categories, modifiers) else current
+
+    def prepare_query(self, query):
+        """Preprocess a raw query and attach the categories it names"""
+        # Process query with NLP
+        with metrics.stage('preprocess'):
+            processed_query = self.preprocess_query(query)
+        logger.debug("query_preprocessed", intent=processed_query['intent'],
+                     keywords=processed_query['keywords'], modifiers=processed_query['modifiers'])
+        
+        # Extract categories directly from the query (the medicinal category also
+        # covers the old medicinal-intent special case)
+        categories = self.filters.detect_categories(query)
+        if categories:
+            processed_query['categories'] = categories
+        
+        # BM25 retrieval mode: the best text matches, scaled to the best one
+        text_scores = self.text_scores(query)
+        if text_scores is not None:
+            processed_query['text_scores'] = text_scores
+        
+        return processed_query
+
+    def text_scores(self, query):
+        """{plant_id: BM25 score / best score} from the text index; None unless retrieval mode is bm25 and an index is loaded"""
+        if not text_index.enabled():
+            return None
+        index = text_index.get_index()
+        if index is None:
+            return None
+        with metrics.stage('text_index'):
+            matches = index.top(query, config.TEXT_INDEX_CANDIDATES)
+        if not matches:
+            return {}
+        best = matches[0][1]
+        return {plant_id: score / best for plant_id, score in matches}
+
+    def build_search_sql(self, processed_query, after=None, limit=pagination.DEFAULT_PAGE_SIZE):
+        """Build the (sql, params) pair for one page of results; no I/O, shared with the async routes.
+
+        `after` is the decoded sort key (text_score, rank, eco_impact_score, name,
+        plant_id) of the previous page's last row. In BM25 mode the text score leads
+        the order, so the best text matches come first across pages, not just
+        within one; otherwise it is 0 for every row.
+        """
+        # Build dynamic query based on semantic understanding
+        search_conditions = []
+        search_params = []
+
+        # Categories named in the query: a plant matching any of them qualifies.
+        # Predicates come from the filter registry (filters.py).
+        if 'categories' in processed_query and processed_query['categories']:
+            category_condition = self.filters.category_sql(processed_query['categories'])
+            if category_condition:
+                search_conditions.append(category_condition[0])
+                search_params.extend(category_condition[1])
+
+        # 1. Direct plant mentions (HIGHEST priority - name words starting with the mention)
+        if processed_query['plant_mentions']:
+            condition, params = text_match('name, scientific_name', processed_query['plant_mentions'])
+            search_conditions.append(condition)
+            search_params.extend(params)
+
+        # 2. Check for specific plant keywords in the query
+        query_lower = processed_query['original_query'].lower()
+        direct_plant_matches = []
+        for plant_name, aliases in self.plant_aliases.items():
+            if plant_name in query_lower or any(alias in query_lower for alias in aliases):
+                direct_plant_matches.append(plant_name)
+
+        if direct_plant_matches:
+            condition, params = text_match('name, scientific_name', direct_plant_matches)
+            search_conditions.append(condition)
+            search_params.extend(params)
+
+        # 3. Apply season, difficulty and plant type filters STRICTLY
+        for condition, params in self.filters.modifier_sql(processed_query['modifiers']):
+            search_conditions.append(condition)
+            search_params.extend(params)
+
+        # 4. Only do broad keyword matching if no specific plant was found and no category filter
+        #    (BM25 retrieval mode: the plants the text index scored, when it scored any)
+        text_score_sql, text_score_params = "0", []
+        if not processed_query['plant_mentions'] and not direct_plant_matches and not ('categories' in processed_query and processed_query['categories']):
+            text_scores = processed_query.get('text_scores')
+            if text_scores:
+                search_conditions.append(f"plant_id IN ({', '.join(['%s'] * len(text_scores))})")
+                search_params.extend(text_scores)
+                text_score_sql = f"CASE plant_id {' '.join(['WHEN %s THEN %s'] * len(text_scores))} ELSE 0 END"
+                for plant_id, score in text_scores.items():
+                    text_score_params.extend([plant_id, round(score * TEXT_SCORE_SCALE)])
+            elif processed_query['keywords']:
+                keywords = [keyword for keyword in processed_query['keywords'][:2]  # Limit to 2 most important keywords
+                            if keyword not in ['plant', 'plants', 'care', 'grow']]  # Skip generic terms
+                if keywords:
+                    condition, params = text_match('name, care_instructions, medicinal_properties', keywords)
+                    search_conditions.append(condition)
+                    search_params.extend(params)
+
+        # Combine all conditions
+        where_clause = " AND ".join(search_conditions) if search_conditions else "1=1"
+
+        # Rank bucket, the first sort key: name match, beginner fit, eco-friendly, the rest
+        main_query_term = processed_query['original_query'].lower()
+        rank_params = [f"%{main_query_term}%", 'beginner' in processed_query['keywords']]
+        
+        # Keyset pagination: continue strictly after the last row of the previous page
+        keyset_clause = ""
+        keyset_params = []
+        if after:
+            text_score, rank, eco, name, plant_id = after
+            keyset_clause = """WHERE text_score < %s
+                   OR (text_score = %s AND (search_rank > %s
+                   OR (search_rank = %s AND (sort_eco < %s
+                   OR (sort_eco = %s AND (name > %s
+                   OR (name = %s AND plant_id > %s)))))))"""
+            keyset_params = [text_score, text_score, rank, rank, eco, eco, name, name, plant_id]
+
+        # Build final query with intelligent ranking
+        final_query = f"""
+            SELECT * FROM (
                 SELECT plant_id, name, scientific_name, season, climate, 
                        care_instructions, native_region, eco_impact_score, 
                        difficulty_level, cultural_significance, medicinal_properties,
                        watering_frequency_summer, watering_frequency_winter, watering_frequency_monsoon,
                        sunlight_requirement, soil_type, growth_height, growth_time_months, eco_benefits,
-                       care_tips_detailed
+                       {text_score_sql} AS text_score,
+                       CASE 
+                           WHEN name LIKE %s THEN 1
+                           WHEN difficulty_level = 'beginner' AND %s THEN 2
+                           WHEN eco_impact_score >= 7 THEN 3
+                           ELSE 4
+                       END AS search_rank,
+                       COALESCE(eco_impact_score, 0) AS sort_eco
                 FROM plants 
                 WHERE {where_clause}
-                ORDER BY 
-                    CASE 
-                        WHEN LOWER(name) LIKE %s THEN 1
-                        WHEN difficulty_level = 'beginner' AND %s THEN 2
-                        WHEN eco_impact_score >= 7 THEN 3
-                        ELSE 4
-                    END,
-                    eco_impact_score DESC,
-                    name ASC
-                LIMIT 20
-            """
-            
-            # Add ordering parameters
-            main_query_term = processed_query['original_query'].lower()
-            search_params.extend([f"%{main_query_term}%", 'beginner' in processed_query['keywords']])
-            
-            print(f"Semantic search executing with {len(search_conditions)} conditions")
-            print(f"SQL query: {final_query}")
-            print(f"Search params: {search_params}")
-            cursor.execute(final_query, search_params)
-            results = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
-            
-            # Rank results based on semantic relevance
-            ranked_results = self._rank_results(results, processed_query)
-            
-            return {
-                'plants': ranked_results,
-                'search_analysis': {
-                    'intent': processed_query['intent'],
-                    'plant_mentions': processed_query['plant_mentions'],
-                    'care_aspects': processed_query['care_aspects'],
-                    'modifiers': processed_query['modifiers'],
-                    'total_results': len(ranked_results)
-                }
-            }
-            
-        except Exception as e:
-            print(f"Semantic search error: {e}")
-            import traceback
-            traceback.print_exc()
-            return {'plants': [], 'error': str(e)}
+            ) ranked
+            {keyset_clause}
+            ORDER BY text_score DESC, search_rank, sort_eco DESC, name ASC, plant_id ASC
+            LIMIT %s
+        """
+        
+        # One extra row tells whether there is a next page
+        return final_query, text_score_params + rank_params + search_params + keyset_params + [limit + 1]
+
+    def split_page(self, rows, processed_query, limit):
+        """Drop the look-ahead row and sort-key columns; returns (rows, next_cursor)"""
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = pagination.encode_cursor(
+                [int(last['text_score']), last['search_rank'], last['sort_eco'], last['name'], last['plant_id']],
+                search_cursor_scope(processed_query['original_query']))
+        for row in rows:
+            row.pop('text_score', None)
+            row.pop('search_rank', None)
+            row.pop('sort_eco', None)
+        return rows, next_cursor
+
+    def build_search_response(self, results, processed_query, next_cursor=None, light=False):
+        """Rank fetched rows and assemble the search result payload"""
+        # Rank results based on semantic relevance
+        with metrics.stage('rank'):
+            ranked_results = self._rank_results(results, processed_query, with_metadata=not light)
+
+        response = {
+            'plants': ranked_results,
+            'search_analysis': {
+                'intent': processed_query['intent'],
+                'plant_mentions': processed_query['plant_mentions'],
+                'care_aspects': processed_query['care_aspects'],
+                'modifiers': processed_query['modifiers'],
+                'total_results': len(ranked_results)
+            },
+            'next_cursor': next_cursor
+        }
+        if light:
+            response['degraded'] = 'light'
+        return response
 
     def _get_similar_terms(self, keyword):
         """Get similar terms using fuzzy matching and synonyms"""
@@ -392,24 +446,31 @@ class FloraFindNLPSearch:
         
         return list(set(similar_terms))
 
-    def _rank_results(self, results, processed_query):
+    def _rank_results(self, results, processed_query, with_metadata=True):
         """Rank results based on semantic relevance"""
         if not results:
             return []
         
         ranked_plants = []
+        # Ranking never loads the tips index; results carry care_tips once warm-up or /tips has loaded it
+        tips_index = care_tips.current_index() if with_metadata else None
+        
+        # Name matching scores for the whole result set in one batch
+        name_scores = partial_ratio_many(processed_query['original_query'].lower(),
+                                         (plant['name'] for plant in results))
+        text_scores = processed_query.get('text_scores')
         
-        for plant in results:
+        for plant, name_similarity in zip(results, name_scores):
             relevance_score = 0
+            plant_name = normalize(plant['name'])
             
             # Name matching score
-            name_similarity = fuzz.partial_ratio(processed_query['original_query'].lower(), plant['name'].lower())
             relevance_score += name_similarity * 0.3
             
             # Plant mention bonus
             if processed_query['plant_mentions']:
                 for mention in processed_query['plant_mentions']:
-                    if mention.lower() in plant['name'].lower():
+                    if mention.lower() in plant_name:
                         relevance_score += 50
             
             # Difficulty preference
@@ -426,13 +487,20 @@ class FloraFindNLPSearch:
             if plant['eco_impact_score'] and plant['eco_impact_score'] >= 7:
                 relevance_score += 15
             
+            # Text match score (BM25 retrieval mode)
+            if text_scores:
+                relevance_score += text_scores.get(plant['plant_id'], 0) * config.TEXT_INDEX_RELEVANCE_WEIGHT
+            
             plant_dict = dict(plant)
             plant_dict['relevance_score'] = relevance_score
             
-            # Add enhanced metadata
-            plant_dict['quick_actions'] = self._generate_quick_actions(plant)
-            plant_dict['care_summary'] = self._generate_care_summary(plant)
-            plant_dict['semantic_tags'] = self._generate_semantic_tags(plant, processed_query)
+            # Add enhanced metadata (skipped when admission control is shedding load)
+            if with_metadata:
+                plant_dict['quick_actions'] = self._generate_quick_actions(plant)
+                plant_dict['care_summary'] = self._generate_care_summary(plant)
+                plant_dict['semantic_tags'] = self._generate_semantic_tags(plant, processed_query)
+                if tips_index is not None:
+                    plant_dict['care_tips'] = tips_index.season_slice(plant['plant_id'])
             
             ranked_plants.append(plant_dict)
         
@@ -520,49 +588,81 @@ class FloraFindNLPSearch:
         
         return tags
 
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_search_engine(db_config):
+    """Return the process-wide search engine for this database configuration"""
+    key = tuple(sorted(db_config.items()))
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = FloraFindNLPSearch(db_config)
+                _engines[key] = engine
+    return engine
+
+def search_cursor_scope(query):
+    """What a /query continuation token is tied to: the normalised query text"""
+    return 'query:' + ' '.join(query.lower().split())
+
+class SearchResultCache:
+    """Recent full search responses by (query, page), for serving while searches are being shed"""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query, after, limit):
+        return search_cursor_scope(query), tuple(after) if after else None, limit
+
+    def get(self, query, after, limit):
+        key = self.key(query, after, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        metrics.record_cache('search_results', entry is not None)
+        return dict(entry[0], degraded='cached') if entry is not None else None
+
+    def put(self, query, after, limit, results):
+        if 'error' in results or self.max_entries <= 0:
+            return
+        key = self.key(query, after, limit)
+        with self._lock:
+            self._entries[key] = (results, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+result_cache = SearchResultCache(config.SEARCH_RESULT_CACHE_SIZE, config.SEARCH_RESULT_CACHE_TTL)
+
 # Usage example function
-def search_plants_nlp(query, db_config):
-    """Main function to search plants using NLP"""
-    nlp_search = FloraFindNLPSearch(db_config)
-    
-    # Process query with NLP
-    processed_query = nlp_search.preprocess_query(query)
-    print(f"Processed query: {processed_query}")
-    
-    # Extract categories directly from the query
-    categories = []
-    if 'fruit' in query.lower():
-        categories.append('fruit')
-    if 'flower' in query.lower():
-        categories.append('flower')
-    if 'medicinal' in query.lower():
-        categories.append('medicinal')
-    if 'herb' in query.lower():
-        categories.append('herb')
-    if 'vegetable' in query.lower():
-        categories.append('vegetable')
-    if 'succulent' in query.lower():
-        categories.append('succulent')
-    if 'tree' in query.lower():
-        categories.append('tree')
-    if 'climber' in query.lower():
-        categories.append('climber')
-    if 'aquatic' in query.lower():
-        categories.append('aquatic')
-    if 'air purifying' in query.lower() or 'air-purifying' in query.lower():
-        categories.append('air_purifying')
+def search_plants_nlp(query, db_config, after=None, limit=pagination.DEFAULT_PAGE_SIZE, degraded=False):
+    """Main function to search plants using NLP.
+
+    degraded (admission control saturated): answer from the result cache when
+    possible, otherwise search without the per-plant metadata.
+    """
+    if degraded:
+        cached = result_cache.get(query, after, limit)
+        if cached is not None:
+            return cached
     
-    if categories:
-        processed_query['categories'] = categories
-        print(f"Detected categories: {categories}")
+    nlp_search = get_search_engine(db_config)
     
-    # Add medicinal category if medicinal intent is detected
-    if 'medicinal' in query.lower() and ('categories' not in processed_query or 'medicinal' not in processed_query.get('categories', [])):
-        processed_query.setdefault('categories', []).append('medicinal')
-        # Also add medicinal type modifier
-        processed_query.setdefault('modifiers', []).append(('type', 'medicinal'))
+    processed_query = nlp_search.prepare_query(query)
     
     # Perform semantic search
-    results = nlp_search.semantic_search(processed_query)
+    results = nlp_search.semantic_search(processed_query, after, limit, light=degraded)
+    if not degraded:
+        result_cache.put(query, after, limit, results)
     
     return results
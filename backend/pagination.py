@@ -0,0 +1,52 @@
+"""
+Keyset pagination helpers for FloraFind
+Continuation tokens are opaque to clients: URL-safe base64 of the sort key of
+the last row served, plus a fingerprint of the request they belong to so a
+token cannot be replayed against a different query.
+"""
+
+import base64
+import hashlib
+import json
+from typing import Optional, Sequence
+
+TOKEN_VERSION = 1
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """The continuation token is malformed or belongs to a different request"""
+
+
+def _scope_hash(scope: str) -> str:
+    return hashlib.sha1(scope.encode('utf-8')).hexdigest()[:10]
+
+
+def encode_cursor(key: Sequence, scope: str = '') -> str:
+    payload = json.dumps([TOKEN_VERSION, _scope_hash(scope), list(key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: Optional[str], scope: str = '', length: Optional[int] = None) -> Optional[list]:
+    """Sort key from a token (None for no token); raises InvalidCursor"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        version, scope_hash, key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor("malformed cursor")
+    if version != TOKEN_VERSION or not isinstance(key, list):
+        raise InvalidCursor("unsupported cursor")
+    if scope_hash != _scope_hash(scope):
+        raise InvalidCursor("cursor does not belong to this request")
+    if length is not None and len(key) != length:
+        raise InvalidCursor("malformed cursor")
+    return key
+
+
+def page_size(value: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    if value is None:
+        return default
+    return min(max(value, 1), MAX_PAGE_SIZE)
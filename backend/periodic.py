@@ -0,0 +1,82 @@
+"""
+In-process periodic tasks for FloraFind
+A daemon thread that calls a function every `interval_seconds`, for keeping
+per-process in-memory state fresh. Threads do not survive fork, so under
+gunicorn start tasks in each worker (startup.warm_up_database runs post-fork).
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict
+
+from structured_logging import get_logger
+
+logger = get_logger('periodic')
+
+_tasks: Dict[str, 'PeriodicTask'] = {}
+_tasks_lock = threading.Lock()
+
+
+class PeriodicTask:
+    """Run `func` every `interval_seconds` (with up to `jitter` extra) until stopped"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], object], jitter: float = 0.1):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.jitter = jitter
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, run_now: bool = False) -> 'PeriodicTask':
+        if run_now:
+            self.run_once()
+        self._thread = threading.Thread(target=self._loop, name=f'periodic-{self.name}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def run_once(self):
+        start = time.perf_counter()
+        try:
+            self.func()
+        except Exception as e:
+            self.failures += 1
+            logger.exception("periodic_task_failed", task=self.name, error=str(e))
+        else:
+            self.runs += 1
+        finally:
+            self.last_run = time.time()
+            logger.debug("periodic_task_ran", task=self.name, seconds=round(time.perf_counter() - start, 4))
+
+    def _loop(self):
+        # Jitter spreads the workers' refreshes so they do not all hit the database at once
+        while not self._stop.wait(self.interval_seconds * (1 + random.uniform(0, self.jitter))):
+            self.run_once()
+
+
+def start_task(name: str, interval_seconds: float, func: Callable[[], object], run_now: bool = False) -> PeriodicTask:
+    """Start the named task in this process unless it is already running"""
+    with _tasks_lock:
+        task = _tasks.get(name)
+        if task is not None and task.is_running():
+            return task
+        task = PeriodicTask(name, interval_seconds, func)
+        _tasks[name] = task
+    return task.start(run_now=run_now)
+
+
+def stop_all():
+    with _tasks_lock:
+        for task in _tasks.values():
+            task.stop()
+        _tasks.clear()
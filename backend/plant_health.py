@@ -0,0 +1,208 @@
+"""
+Plant health decay for FloraFind
+Completing a care task raises a plant's current_health_score; neglect lowers it.
+The health_decay job finds overdue care_schedules through the
+(is_active, next_due_date) index, works out each plant's loss for the day from
+how long each task has been overdue and what kind of task it is, and applies it
+with one set-based UPDATE per chunk of HEALTH_DECAY_CHUNK plants, committed
+chunk by chunk so no lock is held for long. Every change is recorded per plant
+and day in plant_health_history for trend charts.
+
+The job's watermark is the last day decayed, so it can run as often as it likes
+and catches up missed days (up to HEALTH_DECAY_MAX_CATCHUP_DAYS). A day
+interrupted part-way is resumed without decaying finished plants twice: their
+history row for that day already carries the decay.
+
+    python jobs.py run health_decay
+"""
+
+import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import config
+import db
+import jobs
+from structured_logging import get_logger
+
+logger = get_logger('plant_health')
+
+DECAY_JOB = 'health_decay'   # watermark: date.toordinal() of the last day decayed
+
+# Per task: (days overdue before health starts to drop, health lost per day after that)
+DECAY_RATES = {
+    'watering': (1, 4),
+    'pest_check': (3, 2),
+    'fertilizing': (7, 1),
+    'pruning': (14, 1),
+    'repotting': (30, 1),
+}
+# The daily loss doubles after a week past the grace period, and triples after two
+ESCALATION_DAYS = 7
+MAX_ESCALATION = 3
+MIN_HEALTH, MAX_HEALTH = 0, 100
+STREAM_BATCH = 5000
+MAX_HISTORY_DAYS = 365
+
+OVERDUE_SCHEDULES = """
+    SELECT user_plant_id, task_type, next_due_date FROM care_schedules
+    WHERE is_active AND next_due_date < %s
+"""
+DECAYED_ON = """
+    SELECT user_plant_id FROM plant_health_history
+    WHERE recorded_on = %s AND decay > 0 AND user_plant_id IN ({})
+"""
+APPLY_DECAY = """
+    UPDATE user_plants
+    SET current_health_score = GREATEST(%s, COALESCE(current_health_score, {max_health}) - CASE user_plant_id {cases} END)
+    WHERE user_plant_id IN ({ids})
+"""
+# The day's row keeps the latest score; decay adds up when the job and care tasks both touch it
+RECORD_HEALTH = """
+    INSERT INTO plant_health_history (user_plant_id, recorded_on, health_score, decay)
+    SELECT user_plant_id, %s, current_health_score, CASE user_plant_id {cases} END
+    FROM user_plants WHERE user_plant_id IN ({ids})
+    ON DUPLICATE KEY UPDATE health_score = VALUES(health_score), decay = decay + VALUES(decay)
+"""
+HEALTH_HISTORY = """
+    SELECT h.user_plant_id, h.recorded_on, h.health_score, h.decay
+    FROM plant_health_history h
+    JOIN user_plants up ON up.user_plant_id = h.user_plant_id
+    WHERE up.user_id = %s AND h.recorded_on >= %s
+    ORDER BY h.user_plant_id, h.recorded_on
+"""
+
+
+def _as_date(value) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def overdue_schedules(cursor, day: datetime.date) -> Dict[str, np.ndarray]:
+    """Active schedules that can be decaying on `day`, as columns: user_plant_id, grace, rate, due (ordinals)"""
+    min_grace = min(grace for grace, _ in DECAY_RATES.values())
+    cursor.execute(OVERDUE_SCHEDULES, (day - datetime.timedelta(days=min_grace),))
+    plants, graces, rates, due = [], [], [], []
+    while True:
+        rows = cursor.fetchmany(STREAM_BATCH)
+        if not rows:
+            break
+        for user_plant_id, task_type, next_due_date in rows:
+            grace, rate = DECAY_RATES.get(task_type, (7, 1))
+            plants.append(user_plant_id)
+            graces.append(grace)
+            rates.append(rate)
+            due.append(_as_date(next_due_date).toordinal())
+    return {'user_plant_id': np.array(plants, dtype=np.int64), 'grace': np.array(graces, dtype=np.int64),
+            'rate': np.array(rates, dtype=np.int64), 'due': np.array(due, dtype=np.int64)}
+
+
+def daily_decay(schedules: Dict[str, np.ndarray], day: datetime.date) -> Dict[int, int]:
+    """{user_plant_id: health lost on `day`} summed over the plant's overdue schedules"""
+    late = day.toordinal() - schedules['due'] - schedules['grace']
+    decaying = late > 0
+    if not decaying.any():
+        return {}
+    escalation = np.minimum((late[decaying] - 1) // ESCALATION_DAYS + 1, MAX_ESCALATION)
+    plant_ids, owners = np.unique(schedules['user_plant_id'][decaying], return_inverse=True)
+    totals = np.bincount(owners, weights=schedules['rate'][decaying] * escalation).astype(np.int64)
+    return dict(zip(plant_ids.tolist(), totals.tolist()))
+
+
+def _cases(values: Dict[int, int]) -> tuple:
+    """(' WHEN %s THEN %s ...', params) for a CASE over user_plant_id"""
+    return ' '.join(['WHEN %s THEN %s'] * len(values)), [value for pair in values.items() for value in pair]
+
+
+def record_health(cursor, decay: Dict[int, int], day: datetime.date):
+    """Write the plants' current scores (and `decay`, the points just lost) into the day's history"""
+    cases, case_params = _cases(decay)
+    ids = list(decay)
+    cursor.execute(RECORD_HEALTH.format(cases=cases, ids=', '.join(['%s'] * len(ids))),
+                   [day] + case_params + ids)
+
+
+def apply_decay(cursor, decay: Dict[int, int], day: datetime.date) -> int:
+    """Lower the plants' health by `decay` and record it; the caller commits"""
+    cases, case_params = _cases(decay)
+    ids = list(decay)
+    cursor.execute(APPLY_DECAY.format(max_health=MAX_HEALTH, cases=cases, ids=', '.join(['%s'] * len(ids))),
+                   [MIN_HEALTH] + case_params + ids)
+    updated = cursor.rowcount
+    record_health(cursor, decay, day)
+    return updated
+
+
+def decay_day(conn, cursor, schedules: Dict[str, np.ndarray], day: datetime.date) -> Dict[str, int]:
+    """Apply one day's decay in chunks of HEALTH_DECAY_CHUNK plants, committing after each"""
+    decay = daily_decay(schedules, day)
+    plant_ids = sorted(decay)
+    plants = points = 0
+    for start in range(0, len(plant_ids), config.HEALTH_DECAY_CHUNK):
+        chunk = plant_ids[start:start + config.HEALTH_DECAY_CHUNK]
+        cursor.execute(DECAYED_ON.format(', '.join(['%s'] * len(chunk))), [day] + chunk)
+        done = {row[0] for row in cursor.fetchall()}
+        pending = {plant_id: decay[plant_id] for plant_id in chunk if plant_id not in done}
+        if pending:
+            plants += apply_decay(cursor, pending, day)
+            points += sum(pending.values())
+        conn.commit()
+    logger.info("health_decay_day", day=str(day), plants=plants, points=points)
+    return {'plants': plants, 'points': points}
+
+
+@jobs.register(DECAY_JOB, interval_seconds=3600)
+def decay_overdue(today: Optional[datetime.date] = None) -> Dict:
+    """Lower the health of plants with overdue care, once per day since the last run"""
+    today = today or datetime.date.today()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    days = plants = points = 0
+    try:
+        seen = jobs.get_watermark(cursor, DECAY_JOB)
+        conn.commit()
+        # The first run starts today rather than decaying for days before the job existed
+        first = today.toordinal() if seen == 0 else max(
+            seen + 1, today.toordinal() - config.HEALTH_DECAY_MAX_CATCHUP_DAYS + 1)
+        if first > today.toordinal():
+            return {'days': 0, 'plants': 0, 'points': 0}
+        schedules = overdue_schedules(cursor, today)
+        for ordinal in range(first, today.toordinal() + 1):
+            result = decay_day(conn, cursor, schedules, datetime.date.fromordinal(ordinal))
+            if not jobs.advance_watermark(cursor, DECAY_JOB, seen, ordinal):
+                conn.rollback()
+                return {'days': days, 'plants': plants, 'points': points, 'skipped': 'concurrent run'}
+            conn.commit()
+            seen = ordinal
+            days += 1
+            plants += result['plants']
+            points += result['points']
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {'days': days, 'plants': plants, 'points': points}
+
+
+def history(user_id: int, days: int) -> List[Dict]:
+    """Each of the user's plants' daily health over the last `days` days, for trend charts"""
+    since = datetime.date.today() - datetime.timedelta(days=days - 1)
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(HEALTH_HISTORY, (user_id, since))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    series: Dict[int, List[Dict]] = {}
+    for row in rows:
+        series.setdefault(row['user_plant_id'], []).append(
+            {"date": str(row['recorded_on']), "health": row['health_score'], "decay": row['decay']})
+    return [{"user_plant_id": user_plant_id, "history": points} for user_plant_id, points in series.items()]
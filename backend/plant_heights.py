@@ -0,0 +1,73 @@
+"""
+Numeric plant heights for FloraFind
+growth_height is free text ("1-3 feet", "6 inches-3 feet"); searches compare
+heights, so the plant_heights job keeps plants.growth_height_cm (indexed) in
+step with it: the upper bound of the range, in centimetres.
+
+    python jobs.py run plant_heights
+"""
+
+import re
+from typing import Dict, Optional
+
+import db
+import jobs
+
+HEIGHTS_JOB = 'plant_heights'
+MAX_HEIGHT_CM = 65535  # SMALLINT UNSIGNED
+
+_CM_PER_UNIT = {
+    'cm': 1.0, 'centimeter': 1.0, 'centimeters': 1.0, 'centimetre': 1.0, 'centimetres': 1.0,
+    'm': 100.0, 'meter': 100.0, 'meters': 100.0, 'metre': 100.0, 'metres': 100.0,
+    'in': 2.54, 'inch': 2.54, 'inches': 2.54,
+    'ft': 30.48, 'foot': 30.48, 'feet': 30.48,
+}
+_MEASURE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(centimet(?:er|re)s?|cm|met(?:er|re)s?|m|inch(?:es)?|in|feet|foot|ft)?\b', re.I)
+
+
+def parse_height_cm(text: Optional[str]) -> Optional[int]:
+    """Upper bound of a free-text height in cm; a number without a unit takes the next unit ("1-3 feet")"""
+    if not text:
+        return None
+    measures = _MEASURE_PATTERN.findall(text)
+    heights, pending = [], []
+    for number, unit in measures:
+        pending.append(float(number))
+        if unit:
+            heights.extend(value * _CM_PER_UNIT[unit.lower()] for value in pending)
+            pending = []
+    if not heights:
+        return None
+    return min(int(round(max(heights))), MAX_HEIGHT_CM)
+
+
+def update_heights(cursor) -> int:
+    """Recompute growth_height_cm where it is missing or stale; returns the rows changed"""
+    cursor.execute("SELECT plant_id, growth_height, growth_height_cm FROM plants")
+    changes = []
+    for row in cursor.fetchall():
+        plant_id, growth_height, current = row if not isinstance(row, dict) else (
+            row['plant_id'], row['growth_height'], row['growth_height_cm'])
+        height = parse_height_cm(growth_height)
+        if height != current:
+            changes.append((height, plant_id))
+    if changes:
+        cursor.executemany("UPDATE plants SET growth_height_cm = %s WHERE plant_id = %s", changes)
+    return len(changes)
+
+
+@jobs.register(HEIGHTS_JOB, interval_seconds=3600)
+def refresh_heights() -> Dict:
+    """Fill plants.growth_height_cm from the free-text growth_height"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        updated = update_heights(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {'updated': updated}
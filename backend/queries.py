@@ -0,0 +1,59 @@
+"""
+SQL shared by the sync (Flask) and async (ASGI) API routes
+All statements use %s placeholders, accepted by both mysql.connector and aiomysql
+"""
+
+INSERT_SEARCH_LOG = "INSERT INTO search_logs (user_id, query, results_count, search_type) VALUES (%s, %s, %s, %s)"
+
+SEARCH_TYPES = ('text', 'voice', 'image')
+
+USER_GARDEN = """
+    SELECT up.user_plant_id, up.plant_nickname, up.location_in_garden,
+           up.date_planted, up.current_health_score, up.notes,
+           p.plant_id, p.name, p.scientific_name, p.eco_impact_score,
+           cs.task_type, cs.next_due_date, cs.frequency_days
+    FROM user_plants up
+    JOIN plants p ON up.plant_id = p.plant_id
+    LEFT JOIN care_schedules cs ON up.user_plant_id = cs.user_plant_id
+    WHERE up.user_id = %s
+    ORDER BY up.user_plant_id, cs.schedule_id
+"""
+
+# One page of a garden: the plants are limited first so care schedules never split a page
+USER_GARDEN_PAGE = """
+    SELECT up.user_plant_id, up.plant_nickname, up.location_in_garden,
+           up.date_planted, up.current_health_score, up.notes,
+           p.plant_id, p.name, p.scientific_name, p.eco_impact_score,
+           cs.task_type, cs.next_due_date, cs.frequency_days
+    FROM (SELECT * FROM user_plants
+          WHERE user_id = %s AND user_plant_id > %s
+          ORDER BY user_plant_id
+          LIMIT %s) up
+    JOIN plants p ON up.plant_id = p.plant_id
+    LEFT JOIN care_schedules cs ON up.user_plant_id = cs.user_plant_id
+    ORDER BY up.user_plant_id, cs.schedule_id
+"""
+
+ACTIVE_CHALLENGES = """SELECT * FROM plant_challenges
+                       WHERE is_active = 1 AND end_date >= CURDATE()
+                       ORDER BY start_date ASC"""
+
+LEADERBOARD = """SELECT u.username, u.plant_health_points, u.level,
+                        COUNT(up.user_plant_id) as total_plants
+                 FROM users u
+                 LEFT JOIN user_plants up ON u.user_id = up.user_id
+                 GROUP BY u.user_id
+                 ORDER BY u.plant_health_points DESC
+                 LIMIT 10"""
+
+# What care_schedule needs to size the next occurrence of a completed task
+CARE_TASK_CONTEXT = """
+    SELECT cs.seasonal_adjustment, u.location,
+           p.watering_frequency_summer, p.watering_frequency_monsoon, p.watering_frequency_winter
+    FROM user_plants up
+    JOIN plants p ON up.plant_id = p.plant_id
+    JOIN users u ON up.user_id = u.user_id
+    LEFT JOIN care_schedules cs ON cs.user_plant_id = up.user_plant_id AND cs.task_type = %s
+    WHERE up.user_plant_id = %s
+    LIMIT 1
+"""
@@ -0,0 +1,130 @@
+"""
+"Gardeners also grow" recommendations for FloraFind
+Item-item co-occurrence over user_plants: two plants are related by how many
+gardeners grow both, scaled by how many grow each (cosine over the binary
+user x plant matrix), so that plants everyone grows do not crowd out the rest.
+The plant_cooccurrence job builds the matrix a chunk of users at a time,
+accumulates plant x plant co-occurrence counts with sparse matrix products, and
+stores each plant's top-k related plants. /recommendations/<user_id> then adds
+up the related plants of everything in the user's garden in one indexed query.
+
+    python jobs.py run plant_cooccurrence
+"""
+
+from typing import Dict, List
+
+import numpy as np
+from scipy import sparse
+
+import config
+import db
+import jobs
+from structured_logging import get_logger
+
+logger = get_logger('recommendations')
+
+COOCCURRENCE_JOB = 'plant_cooccurrence'
+INSERT_CHUNK = 1000
+
+CHUNK_GARDENS = "SELECT user_id, plant_id FROM user_plants WHERE user_id BETWEEN %s AND %s"
+INSERT_RELATED = """
+    INSERT INTO plant_cooccurrence (plant_id, neighbor_rank, other_plant_id, users, score)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+# Owned plants are counted once however many of each the user grows, and never recommended
+USER_RECOMMENDATIONS = """
+    SELECT pc.other_plant_id AS plant_id, p.name, p.scientific_name, p.difficulty_level,
+           p.eco_impact_score, SUM(pc.score) AS score, COUNT(*) AS related_plants
+    FROM (SELECT DISTINCT plant_id FROM user_plants WHERE user_id = %s) owned
+    JOIN plant_cooccurrence pc ON pc.plant_id = owned.plant_id
+    JOIN plants p ON p.plant_id = pc.other_plant_id
+    WHERE pc.other_plant_id NOT IN (SELECT plant_id FROM user_plants WHERE user_id = %s)
+    GROUP BY pc.other_plant_id, p.name, p.scientific_name, p.difficulty_level, p.eco_impact_score
+    ORDER BY score DESC, pc.other_plant_id
+    LIMIT %s
+"""
+
+
+def cooccurrence_counts(cursor, plant_count: int) -> sparse.csr_matrix:
+    """Plant x plant counts of users growing both (the diagonal: users growing each), indexed by plant_id.
+
+    Gardens are read config.RECOMMENDER_USER_CHUNK users at a time into NumPy
+    arrays; only the plant x plant accumulator outlives a chunk.
+    """
+    counts = sparse.csr_matrix((plant_count, plant_count), dtype=np.int64)
+    last_id = 0
+    while True:
+        cursor.execute("SELECT user_id FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                       (last_id, config.RECOMMENDER_USER_CHUNK))
+        user_ids = [row[0] for row in cursor.fetchall()]
+        if not user_ids:
+            break
+        cursor.execute(CHUNK_GARDENS, (user_ids[0], user_ids[-1]))
+        pairs = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[pairs[:, 1] < plant_count]  # plants added since plant_count was read
+        if len(pairs):
+            gardeners, users = np.unique(pairs[:, 0], return_inverse=True)
+            gardens = sparse.csr_matrix((np.ones(len(pairs), dtype=np.int64), (users, pairs[:, 1])),
+                                        shape=(len(gardeners), plant_count))
+            gardens.data[:] = 1  # several of one plant still count as one grower
+            counts = counts + (gardens.T @ gardens).tocsr()
+        last_id = user_ids[-1]
+    return counts
+
+
+def related_plants(counts: sparse.csr_matrix, k: int, min_users: int) -> List[tuple]:
+    """(plant_id, rank, other_plant_id, users, score) rows: each plant's top-k by cosine co-occurrence"""
+    growers = counts.diagonal().astype(np.float64)
+    counts = counts.tocoo()
+    keep = (counts.row != counts.col) & (counts.data >= min_users)
+    rows, cols, together = counts.row[keep], counts.col[keep], counts.data[keep]
+    scores = together / np.sqrt(growers[rows] * growers[cols])
+
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, together, scores = rows[order], cols[order], together[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.array([], dtype=np.int64)
+    ranks = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    top = ranks < k
+    return [(int(plant), int(rank) + 1, int(other), int(users), round(float(score), 6))
+            for plant, rank, other, users, score in zip(rows[top], ranks[top], cols[top], together[top], scores[top])]
+
+
+@jobs.register(COOCCURRENCE_JOB, interval_seconds=86400)
+def rebuild() -> Dict:
+    """Rebuild "gardeners also grow" related plants from user_plants"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(plant_id), 0) FROM plants")
+        plant_count = int(cursor.fetchone()[0]) + 1
+        counts = cooccurrence_counts(cursor, plant_count)
+        related = related_plants(counts, config.RECOMMENDER_TOP_K, config.RECOMMENDER_MIN_USERS)
+
+        # Replaced in one transaction, so readers see the old table until commit
+        cursor.execute("DELETE FROM plant_cooccurrence")
+        for start in range(0, len(related), INSERT_CHUNK):
+            cursor.executemany(INSERT_RELATED, related[start:start + INSERT_CHUNK])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {'pairs': int(counts.nnz), 'stored': len(related), 'plants': len({row[0] for row in related})}
+
+
+def for_user(user_id: int, limit: int) -> List[Dict]:
+    """Plants related to the user's garden that they do not grow yet, best first"""
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(USER_RECOMMENDATIONS, (user_id, user_id, limit))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    for row in rows:
+        row['score'] = round(float(row['score']), 4)
+        row['related_plants'] = int(row['related_plants'])
+    return rows
@@ -0,0 +1,282 @@
+"""
+Search analytics for FloraFind
+Rolls new search_logs rows up into hourly and daily aggregates (searches,
+zero-result rate, top queries and terms) by log_id watermark, so analytics
+reads never scan the raw log, and prunes raw rows once they are rolled up
+and past retention.
+"""
+
+import datetime
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Optional
+
+import config
+import db
+import jobs
+from structured_logging import get_logger
+
+logger = get_logger('search_analytics')
+
+ROLLUP_JOB = 'search_rollup'
+GRANULARITIES = ('hour', 'day')
+PRUNE_CHUNK = 5000
+MAX_QUERY_LENGTH = 255
+MAX_TERM_LENGTH = 64
+
+STOP_WORDS = {
+    'the', 'and', 'for', 'with', 'that', 'this', 'what', 'which', 'how', 'are', 'can',
+    'you', 'your', 'from', 'have', 'has', 'into', 'some', 'any', 'plant', 'plants',
+    'about', 'does', 'should', 'there', 'their', 'them', 'they', 'will', 'would',
+}
+
+_TERM_PATTERN = re.compile(r"[a-z][a-z'-]{2,}")
+
+UPSERT_STATS = """
+    INSERT INTO search_stats (granularity, bucket_start, search_type, language, searches, zero_results, total_results)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE searches = searches + VALUES(searches),
+                            zero_results = zero_results + VALUES(zero_results),
+                            total_results = total_results + VALUES(total_results)
+"""
+
+UPSERT_QUERY_STATS = """
+    INSERT INTO search_query_stats (granularity, bucket_start, query, searches, zero_results)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE searches = searches + VALUES(searches),
+                            zero_results = zero_results + VALUES(zero_results)
+"""
+
+UPSERT_TERM_STATS = """
+    INSERT INTO search_term_stats (granularity, bucket_start, term, searches)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE searches = searches + VALUES(searches)
+"""
+
+
+def normalize_query(query: str) -> str:
+    return ' '.join((query or '').lower().split())[:MAX_QUERY_LENGTH]
+
+
+def query_terms(query: str):
+    """Distinct content words of a normalised query"""
+    return {term[:MAX_TERM_LENGTH] for term in _TERM_PATTERN.findall(query) if term not in STOP_WORDS}
+
+
+def bucket_start(timestamp: datetime.datetime, granularity: str) -> datetime.datetime:
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _detect_languages(texts):
+    """Language code per text ('' when undetectable); deterministic across runs.
+
+    langdetect costs milliseconds per call and popular queries repeat, so each
+    distinct text is detected once per batch.
+    """
+    try:
+        from langdetect import DetectorFactory, detect
+        from langdetect.lang_detect_exception import LangDetectException
+    except ImportError:
+        return [''] * len(texts)
+    DetectorFactory.seed = 0
+    detected = {}
+    for text in set(texts):
+        try:
+            detected[text] = detect(text)[:5]
+        except LangDetectException:
+            detected[text] = ''
+    return [detected[text] for text in texts]
+
+
+def aggregate(rows) -> Dict[str, dict]:
+    """Fold raw search_logs rows into per-bucket counters for every rollup table"""
+    stats = defaultdict(lambda: [0, 0, 0])
+    query_stats = defaultdict(lambda: [0, 0])
+    term_stats = Counter()
+    for row in rows:
+        query = normalize_query(row['query'])
+        zero = 1 if not row['results_count'] else 0
+        terms = query_terms(query)
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(row['timestamp'], granularity)
+            totals = stats[(granularity, bucket, row['search_type'] or 'text', row['language_detected'] or '')]
+            totals[0] += 1
+            totals[1] += zero
+            totals[2] += row['results_count'] or 0
+            per_query = query_stats[(granularity, bucket, query)]
+            per_query[0] += 1
+            per_query[1] += zero
+            for term in terms:
+                term_stats[(granularity, bucket, term)] += 1
+    return {'stats': stats, 'query_stats': query_stats, 'term_stats': term_stats}
+
+
+@jobs.register(ROLLUP_JOB, interval_seconds=config.SEARCH_ROLLUP_INTERVAL_SECONDS)
+def rollup_search_logs(batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> Dict:
+    """Roll new search_logs rows into the hourly/daily search aggregates"""
+    batch_size = batch_size or config.SEARCH_ROLLUP_BATCH_SIZE
+    consumed = batches = 0
+    watermark = None
+    while max_batches is None or batches < max_batches:
+        conn = db.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            previous = jobs.get_watermark(cursor, ROLLUP_JOB)
+            cursor.execute("""SELECT log_id, query, results_count, search_type, language_detected, timestamp
+                              FROM search_logs WHERE log_id > %s ORDER BY log_id LIMIT %s""",
+                           (previous, batch_size))
+            rows = cursor.fetchall()
+            watermark = previous
+            if not rows:
+                conn.commit()
+                break
+
+            # Fill in language_detected here, off the request path
+            undetected = [row for row in rows if row['language_detected'] is None]
+            if undetected and config.SEARCH_ROLLUP_DETECT_LANGUAGE:
+                by_language = defaultdict(list)
+                for row, language in zip(undetected, _detect_languages([normalize_query(r['query']) for r in undetected])):
+                    row['language_detected'] = language
+                    by_language[language].append(row['log_id'])
+                for language, log_ids in by_language.items():
+                    placeholders = ', '.join(['%s'] * len(log_ids))
+                    cursor.execute(f"UPDATE search_logs SET language_detected = %s WHERE log_id IN ({placeholders})",
+                                   [language] + log_ids)
+
+            folded = aggregate(rows)
+            cursor.executemany(UPSERT_STATS, [key + tuple(totals) for key, totals in folded['stats'].items()])
+            cursor.executemany(UPSERT_QUERY_STATS, [key + tuple(totals) for key, totals in folded['query_stats'].items()])
+            cursor.executemany(UPSERT_TERM_STATS, [key + (count,) for key, count in folded['term_stats'].items()])
+
+            current = rows[-1]['log_id']
+            if not jobs.advance_watermark(cursor, ROLLUP_JOB, previous, current):
+                conn.rollback()
+                logger.warning("search_rollup_conflict", watermark=previous)
+                break
+            conn.commit()
+            watermark = current
+            consumed += len(rows)
+            batches += 1
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        if len(rows) < batch_size:
+            break
+    return {'rows': consumed, 'batches': batches, 'watermark': watermark}
+
+
+@jobs.register('search_logs_prune', interval_seconds=24 * 3600)
+def prune_search_logs(now: Optional[datetime.datetime] = None) -> Dict:
+    """Delete rolled-up raw search_logs rows and hourly rollups past retention"""
+    now = now or datetime.datetime.now()
+    raw_cutoff = now - datetime.timedelta(days=config.SEARCH_LOG_RETENTION_DAYS)
+    hourly_cutoff = bucket_start(now - datetime.timedelta(days=config.SEARCH_HOURLY_RETENTION_DAYS), 'hour')
+
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    deleted_rows = deleted_hourly = 0
+    try:
+        watermark = jobs.get_watermark(cursor, ROLLUP_JOB)
+        # Never delete rows the rollup has not consumed yet
+        cursor.execute("""SELECT MIN(log_id) AS first_id, MAX(log_id) AS last_id FROM search_logs
+                          WHERE timestamp < %s AND log_id <= %s""", (raw_cutoff, watermark))
+        bounds = cursor.fetchone()
+        conn.commit()
+        if bounds and bounds['last_id'] is not None:
+            # Delete by primary-key range in chunks to keep each transaction and its locks short
+            for start in range(bounds['first_id'], bounds['last_id'] + 1, PRUNE_CHUNK):
+                cursor.execute("""DELETE FROM search_logs
+                                  WHERE log_id >= %s AND log_id < %s AND log_id <= %s AND timestamp < %s""",
+                               (start, start + PRUNE_CHUNK, bounds['last_id'], raw_cutoff))
+                deleted_rows += cursor.rowcount
+                conn.commit()
+
+        for table in ('search_stats', 'search_query_stats', 'search_term_stats'):
+            cursor.execute(f"DELETE FROM {table} WHERE granularity = 'hour' AND bucket_start < %s", (hourly_cutoff,))
+            deleted_hourly += cursor.rowcount
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    return {'deleted_rows': deleted_rows, 'deleted_hourly_rollups': deleted_hourly}
+
+
+def get_search_analytics(granularity: str = 'day', days: int = 7, limit: int = 20,
+                         now: Optional[datetime.datetime] = None) -> Dict:
+    """Search volume, zero-result rate, top queries and top terms over the last `days`"""
+    now = now or datetime.datetime.now()
+    since = bucket_start(now - datetime.timedelta(days=days), granularity)
+
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""SELECT bucket_start, SUM(searches) AS searches, SUM(zero_results) AS zero_results,
+                                 SUM(total_results) AS total_results
+                          FROM search_stats WHERE granularity = %s AND bucket_start >= %s
+                          GROUP BY bucket_start ORDER BY bucket_start""", (granularity, since))
+        series = cursor.fetchall()
+
+        cursor.execute("""SELECT search_type, language, SUM(searches) AS searches
+                          FROM search_stats WHERE granularity = %s AND bucket_start >= %s
+                          GROUP BY search_type, language""", (granularity, since))
+        breakdown = cursor.fetchall()
+
+        cursor.execute("""SELECT query, SUM(searches) AS searches, SUM(zero_results) AS zero_results
+                          FROM search_query_stats WHERE granularity = %s AND bucket_start >= %s
+                          GROUP BY query ORDER BY searches DESC, query LIMIT %s""", (granularity, since, limit))
+        top_queries = cursor.fetchall()
+
+        cursor.execute("""SELECT query, SUM(zero_results) AS zero_results
+                          FROM search_query_stats WHERE granularity = %s AND bucket_start >= %s
+                          GROUP BY query HAVING SUM(zero_results) > 0
+                          ORDER BY zero_results DESC, query LIMIT %s""", (granularity, since, limit))
+        zero_result_queries = cursor.fetchall()
+
+        cursor.execute("""SELECT term, SUM(searches) AS searches
+                          FROM search_term_stats WHERE granularity = %s AND bucket_start >= %s
+                          GROUP BY term ORDER BY searches DESC, term LIMIT %s""", (granularity, since, limit))
+        top_terms = cursor.fetchall()
+
+        cursor.execute("SELECT last_id, updated_at FROM job_watermarks WHERE job_name = %s", (ROLLUP_JOB,))
+        watermark = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    searches = sum(int(row['searches']) for row in series)
+    zero_results = sum(int(row['zero_results']) for row in series)
+    by_language, by_search_type = Counter(), Counter()
+    for row in breakdown:
+        by_language[row['language'] or 'unknown'] += int(row['searches'])
+        by_search_type[row['search_type']] += int(row['searches'])
+
+    return {
+        'granularity': granularity,
+        'since': str(since),
+        'totals': {
+            'searches': searches,
+            'zero_results': zero_results,
+            'zero_result_rate': round(zero_results / searches, 4) if searches else 0.0,
+            'avg_results': round(sum(int(row['total_results']) for row in series) / searches, 2) if searches else 0.0,
+        },
+        'series': [{
+            'bucket': str(row['bucket_start']),
+            'searches': int(row['searches']),
+            'zero_results': int(row['zero_results']),
+            'zero_result_rate': round(int(row['zero_results']) / int(row['searches']), 4) if row['searches'] else 0.0,
+        } for row in series],
+        'by_language': dict(by_language),
+        'by_search_type': dict(by_search_type),
+        'top_queries': [{'query': row['query'], 'searches': int(row['searches']),
+                         'zero_results': int(row['zero_results'])} for row in top_queries],
+        'zero_result_queries': [{'query': row['query'], 'zero_results': int(row['zero_results'])}
+                                for row in zero_result_queries],
+        'top_terms': [{'term': row['term'], 'searches': int(row['searches'])} for row in top_terms],
+        'rolled_up_through_log_id': watermark['last_id'] if watermark else 0,
+        'rolled_up_at': str(watermark['updated_at']) if watermark else None,
+    }
@@ -0,0 +1,32 @@
+"""
+Production entry point for FloraFind
+
+    python serve.py
+
+Runs gunicorn with gunicorn.conf.py, serving the Flask app in 'sync' mode or
+the ASGI app (asgi_app.py) on uvicorn workers in 'async' mode, as chosen by
+FLORAFIND_SERVER_MODE. Use `python app.py` for the development server.
+"""
+
+import os
+import sys
+
+import config
+
+APPS = {
+    'sync': 'app:app',
+    'async': 'asgi_app:application',
+}
+
+
+def main():
+    if config.SERVER_MODE not in APPS:
+        sys.exit(f"FLORAFIND_SERVER_MODE must be one of {', '.join(APPS)}, got {config.SERVER_MODE!r}")
+    here = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(here)
+    argv = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', APPS[config.SERVER_MODE]]
+    os.execv(sys.executable, argv)
+
+
+if __name__ == '__main__':
+    main()
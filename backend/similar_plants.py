@@ -0,0 +1,261 @@
+"""
+Similar plants for FloraFind
+"More like this" for a plant card: each plant's top-k neighbours by cosine
+similarity of attribute vectors (season, climate, difficulty, sunlight, watering
+frequencies, eco_impact_score and the BM25 text weights from text_index.py).
+The similar_plants job computes them in batches of matrix products and stores
+them in plant_similarities, so /similar/<plant_id> is an index read.
+
+Runs are incremental on plants.updated_at: only the changed plants' rows, and
+the rows whose neighbours a changed plant joins or leaves, are recomputed.
+similar_plants_rebuild recomputes every row once a week.
+
+    python jobs.py run similar_plants
+"""
+
+import datetime
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+import config
+import db
+import jobs
+import text_index
+from structured_logging import get_logger
+
+logger = get_logger('similar_plants')
+
+SIMILARITY_JOB = 'similar_plants'   # watermark: Unix time of the newest plants.updated_at consumed
+REBUILD_JOB = 'similar_plants_rebuild'
+
+SEASONS = ('spring', 'summer', 'monsoon', 'autumn', 'winter')
+DIFFICULTIES = ('beginner', 'intermediate', 'expert')
+SUNLIGHT = ('full_sun', 'partial_shade', 'full_shade')
+NUMERIC = ('watering_frequency_summer', 'watering_frequency_winter', 'watering_frequency_monsoon', 'eco_impact_score')
+# Share of each feature block in a plant's vector (each block is scaled to unit length first)
+BLOCK_WEIGHTS = {
+    'season': 1.0,
+    'climate': 1.0,
+    'difficulty': 0.5,
+    'sunlight': 1.0,
+    'numeric': 1.0,
+    'text': 2.0,
+}
+# Rows multiplied against the whole catalog at once
+BATCH_SIZE = 256
+# Past this many changed plants in one run, every row is recomputed instead
+MAX_INCREMENTAL_PLANTS = 500
+
+PLANT_FEATURES = f"""
+    SELECT plant_id, season, climate, difficulty_level, sunlight_requirement, {', '.join(NUMERIC)},
+           {', '.join(column for column, _ in text_index.FIELDS)}, updated_at
+    FROM plants ORDER BY plant_id
+"""
+STORED_NEIGHBOURS = "SELECT plant_id, similar_plant_id, score FROM plant_similarities ORDER BY plant_id, neighbor_rank"
+INSERT_NEIGHBOUR = """
+    INSERT INTO plant_similarities (plant_id, neighbor_rank, similar_plant_id, score)
+    VALUES (%s, %s, %s, %s)
+"""
+SIMILAR_PLANTS = """
+    SELECT p.plant_id, p.name, p.scientific_name, p.difficulty_level, p.sunlight_requirement,
+           p.season, p.eco_impact_score, ps.score
+    FROM plant_similarities ps
+    JOIN plants p ON p.plant_id = ps.similar_plant_id
+    WHERE ps.plant_id = %s
+    ORDER BY ps.neighbor_rank
+    LIMIT %s
+"""
+
+
+# Features
+
+def _tokens(value: Optional[str]) -> Set[str]:
+    return {token.strip().lower() for token in (value or '').split(',') if token.strip()}
+
+
+def _seasons(value: Optional[str]) -> Set[str]:
+    seasons = _tokens(value)
+    return set(SEASONS) if 'all_seasons' in seasons else seasons
+
+
+def _one_hot(values: Sequence[Set[str]], vocabulary: Optional[Sequence[str]] = None) -> sparse.csr_matrix:
+    if vocabulary is None:
+        vocabulary = sorted(set().union(*values))
+    columns = {token: index for index, token in enumerate(vocabulary)}
+    row_ids, column_ids = [], []
+    for row, tokens in enumerate(values):
+        for token in tokens:
+            if token in columns:
+                row_ids.append(row)
+                column_ids.append(columns[token])
+    return sparse.csr_matrix((np.ones(len(row_ids), dtype=np.float32), (row_ids, column_ids)),
+                             shape=(len(values), max(len(columns), 1)))
+
+
+def _standardized(rows: Sequence[Dict]) -> sparse.csr_matrix:
+    """NUMERIC columns as z-scores (missing values at the mean), scaled so a typical row has unit length"""
+    values = np.array([[row[column] if row[column] is not None else np.nan for column in NUMERIC] for row in rows],
+                      dtype=np.float64)
+    values[:, :3] = np.log1p(values[:, :3])  # watering intervals: 2 vs 4 days matters more than 20 vs 22
+    means = np.nanmean(values, axis=0) if len(rows) else np.zeros(len(NUMERIC))
+    spreads = np.nanstd(values, axis=0) if len(rows) else np.ones(len(NUMERIC))
+    means = np.where(np.isnan(means), 0, means)
+    spreads = np.where(np.isnan(spreads) | (spreads == 0), 1, spreads)
+    scores = np.nan_to_num((values - means) / spreads) / np.sqrt(len(NUMERIC))
+    return sparse.csr_matrix(scores.astype(np.float32))
+
+
+def _unit_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def feature_matrix(rows: Sequence[Dict]) -> sparse.csr_matrix:
+    """One unit-length row per plant; the dot product of two rows is their cosine similarity"""
+    _, _, text = text_index.build(rows)
+    blocks = {
+        'season': _unit_rows(_one_hot([_seasons(row['season']) for row in rows], SEASONS)),
+        'climate': _unit_rows(_one_hot([_tokens(row['climate']) for row in rows])),
+        'difficulty': _one_hot([{row['difficulty_level']} for row in rows], DIFFICULTIES),
+        'sunlight': _one_hot([{row['sunlight_requirement']} for row in rows], SUNLIGHT),
+        'numeric': _standardized(rows),
+        'text': _unit_rows(text),
+    }
+    matrix = sparse.hstack([blocks[name] * np.sqrt(weight) for name, weight in BLOCK_WEIGHTS.items()], format='csr')
+    return _unit_rows(matrix).astype(np.float32).tocsr()
+
+
+def top_neighbours(features: sparse.csr_matrix, rows: Sequence[int], k: int) -> Dict[int, List[Tuple[int, float]]]:
+    """{row: [(neighbour row, similarity), ...] best first} for `rows`, computed BATCH_SIZE rows at a time"""
+    k = min(k, features.shape[0] - 1)
+    neighbours = {}
+    if k <= 0:
+        return {row: [] for row in rows}
+    transposed = features.T.tocsc()
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = np.asarray(rows[start:start + BATCH_SIZE])
+        similarities = (features[batch] @ transposed).toarray()
+        similarities[np.arange(len(batch)), batch] = -np.inf
+        best = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        for row, candidates, scores in zip(batch, best, np.take_along_axis(similarities, best, axis=1)):
+            order = np.lexsort((candidates, -scores))
+            neighbours[int(row)] = [(int(candidates[i]), float(scores[i])) for i in order]
+    return neighbours
+
+
+# Job
+
+def _epoch(value) -> int:
+    if value is None:
+        return 0
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.fromisoformat(str(value))
+    return int(value.timestamp())
+
+
+def _affected(features: sparse.csr_matrix, changed: Sequence[int], stored: Dict[int, List[Tuple[int, float]]],
+              plant_ids: Sequence[int], k: int) -> Set[int]:
+    """Rows whose stored neighbours a changed plant may join or leave"""
+    changed_ids = {plant_ids[row] for row in changed}
+    best_changed = np.full(features.shape[0], -np.inf, dtype=np.float32)
+    for start in range(0, len(changed), BATCH_SIZE):
+        batch = list(changed[start:start + BATCH_SIZE])
+        best_changed = np.maximum(best_changed, (features[batch] @ features.T).toarray().max(axis=0))
+    wanted = min(k, features.shape[0] - 1)
+    affected = set()
+    for row, plant_id in enumerate(plant_ids):
+        current = stored.get(plant_id, [])
+        if len(current) < wanted:
+            affected.add(row)
+        elif current and (any(neighbour in changed_ids for neighbour, _ in current)
+                          or best_changed[row] > current[-1][1]):
+            affected.add(row)
+    return affected
+
+
+def refresh_similarities(full: bool = False) -> Dict:
+    """Recompute top-k neighbours for plants changed since the watermark (every plant if `full`)"""
+    k = config.SIMILAR_PLANTS_K
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        seen = jobs.get_watermark(cursor, SIMILARITY_JOB)
+        cursor.execute(PLANT_FEATURES)
+        rows = cursor.fetchall()
+        conn.commit()
+        if not rows:
+            return {'plants': 0, 'recomputed': 0}
+        plant_ids = [row['plant_id'] for row in rows]
+        updated = [_epoch(row['updated_at']) for row in rows]
+        # updated_at has one-second resolution, so the current second is left for the next run
+        upto = max(seen, min(max(updated), int(time.time()) - 1))
+        features = feature_matrix(rows)
+
+        changed = [index for index, stamp in enumerate(updated) if seen < stamp <= upto]
+        if full or seen == 0 or len(changed) > MAX_INCREMENTAL_PLANTS:
+            recompute = list(range(len(rows)))
+        elif changed:
+            stored = {}
+            cursor.execute(STORED_NEIGHBOURS)
+            for row in cursor.fetchall():
+                stored.setdefault(row['plant_id'], []).append((row['similar_plant_id'], row['score']))
+            recompute = sorted(set(changed) | _affected(features, changed, stored, plant_ids, k))
+        else:
+            recompute = []
+
+        neighbours = top_neighbours(features, recompute, k)
+        sources = [plant_ids[row] for row in recompute]
+        for start in range(0, len(sources), BATCH_SIZE):
+            batch = sources[start:start + BATCH_SIZE]
+            cursor.execute(f"DELETE FROM plant_similarities WHERE plant_id IN ({', '.join(['%s'] * len(batch))})",
+                           batch)
+        inserts = [(plant_ids[row], rank, plant_ids[neighbour], round(score, 6))
+                   for row in recompute
+                   for rank, (neighbour, score) in enumerate(neighbours[row], start=1)]
+        if inserts:
+            cursor.executemany(INSERT_NEIGHBOUR, inserts)
+
+        if upto > seen and not jobs.advance_watermark(cursor, SIMILARITY_JOB, seen, upto):
+            conn.rollback()
+            return {'plants': len(rows), 'recomputed': 0, 'skipped': 'concurrent run'}
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {'plants': len(rows), 'changed': len(changed), 'recomputed': len(recompute)}
+
+
+@jobs.register(SIMILARITY_JOB, interval_seconds=3600)
+def refresh_changed() -> Dict:
+    """Recompute similar plants around plants added or updated since the last run"""
+    return refresh_similarities()
+
+
+@jobs.register(REBUILD_JOB, interval_seconds=7 * 86400)
+def rebuild_all() -> Dict:
+    """Recompute similar plants for every plant"""
+    return refresh_similarities(full=True)
+
+
+# Serving
+
+def similar_to(plant_id: int, limit: int) -> List[Dict]:
+    """The stored neighbours of `plant_id`, most similar first"""
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(SIMILAR_PLANTS, (plant_id, limit))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    for row in rows:
+        row['score'] = round(float(row['score']), 4)
+    return rows
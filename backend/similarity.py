@@ -0,0 +1,95 @@
+"""
+String similarity for FloraFind search
+rapidfuzz-backed scoring shared by nlp_search and nlp_processor, with cached
+normalisation of choice lists and batch APIs for scoring many strings at once
+"""
+
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import Indel, Levenshtein
+
+
+@lru_cache(maxsize=8192)
+def normalize(text: Optional[str]) -> str:
+    """Lowercase; cached because the same plant names are scored on every query"""
+    return (text or '').lower()
+
+
+def partial_ratio(s1: str, s2: str) -> int:
+    """Best partial match score in 0-100, identical to fuzzywuzzy's fuzz.partial_ratio.
+
+    fuzzywuzzy aligns the shorter string against windows of the longer one taken
+    from the Levenshtein matching blocks, rather than searching every window as
+    rapidfuzz.fuzz.partial_ratio does. Search ranking was tuned against the
+    fuzzywuzzy numbers, so the same windows are used here on rapidfuzz primitives.
+    """
+    if s1 == s2:
+        return 100
+    if not s1 or not s2:
+        return 0
+    if len(s1) <= len(s2):
+        shorter, longer = s1, s2
+    else:
+        shorter, longer = s2, s1
+    best = 0.0
+    for block in Levenshtein.editops(shorter, longer).as_matching_blocks():
+        start = max(block.b - block.a, 0)
+        score = Indel.normalized_similarity(shorter, longer[start:start + len(shorter)])
+        if score > 0.995:
+            return 100
+        best = max(best, score)
+    return int(round(100 * best))
+
+
+def partial_ratio_many(query: str, choices: Iterable[str]) -> List[int]:
+    """Score one already-normalised query against many choices"""
+    return [partial_ratio(query, normalize(choice)) for choice in choices]
+
+
+class ChoiceIndex:
+    """A fixed list of choices, normalised once, for repeated matching"""
+
+    def __init__(self, choices: Sequence[str]):
+        self.choices = list(choices)
+        self.normalized = [normalize(choice) for choice in self.choices]
+
+    def extract_one(self, query: str, scorer=fuzz.WRatio, score_cutoff: float = 0) -> Optional[Tuple[str, float, int]]:
+        """Best (choice, score, index) for `query`, or None below `score_cutoff`"""
+        if not self.normalized:
+            return None
+        match = process.extractOne(normalize(query), self.normalized, scorer=scorer, score_cutoff=score_cutoff)
+        if match is None:
+            return None
+        _, score, index = match
+        return self.choices[index], score, index
+
+    def extract_many(self, queries: Sequence[str], scorer=fuzz.WRatio,
+                     score_cutoff: float = 0) -> List[Optional[Tuple[str, float, int]]]:
+        """Best match for each query, scored in a single batch"""
+        if not queries or not self.normalized:
+            return [None] * len(queries)
+        matrix = process.cdist([normalize(q) for q in queries], self.normalized, scorer=scorer, workers=1)
+        results = []
+        for row in matrix:
+            index = int(row.argmax())
+            score = float(row[index])
+            results.append((self.choices[index], score, index) if score >= score_cutoff else None)
+        return results
+
+
+@lru_cache(maxsize=256)
+def choice_index(choices: Tuple[str, ...]) -> ChoiceIndex:
+    """Shared ChoiceIndex for an immutable choice list"""
+    return ChoiceIndex(choices)
+
+
+def best_scores(queries: Sequence[str], choices: Sequence[str], scorer=fuzz.WRatio) -> List[float]:
+    """For each query, its best score against any choice (0 when there are no choices)"""
+    if not queries:
+        return []
+    if not choices:
+        return [0.0] * len(queries)
+    matrix = process.cdist(list(queries), list(choices), scorer=scorer, workers=1)
+    return [float(value) for value in matrix.max(axis=1)]
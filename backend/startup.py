@@ -0,0 +1,140 @@
+"""
+Startup and warm-up for FloraFind
+Heavy resources (spaCy models, the search engine, the catalog index, the DB pool)
+are loaded lazily on first use; warm_up() loads them explicitly, in one place,
+and records how long each phase took.
+
+Under gunicorn with preload_app, the master runs warm_up(include_db=False)
+before forking so workers share the loaded model pages copy-on-write, and each
+worker opens its own DB pool and NLP worker processes after the fork (see
+gunicorn.conf.py).
+"""
+
+import gc
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import metrics
+from structured_logging import get_logger
+
+logger = get_logger('startup')
+
+PROCESS_STARTED = time.perf_counter()
+
+_phases: Dict[str, float] = {}
+_failed: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _phase_gauge():
+    with _lock:
+        return {(('phase', name),): seconds for name, seconds in _phases.items()}
+
+
+metrics.Gauge('florafind_startup_phase_seconds', 'Time spent in each startup phase', callback=_phase_gauge)
+
+
+def record_phase(name: str, seconds: float):
+    with _lock:
+        _phases[name] = _phases.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str):
+    """Time one startup phase; failures are logged and recorded instead of aborting startup"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        with _lock:
+            _failed[name] = str(e)
+        logger.warning("startup_phase_failed", phase=name, error=str(e))
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def warm_up(include_db: bool = True) -> Dict[str, object]:
+    """Load models and indexes up front instead of on the first requests"""
+    import config
+    import filters
+    import nlp_models
+    import nlp_processor
+    import nlp_search
+
+    with phase('spacy_model'):
+        nlp_models.get_spacy_model()
+    with phase('filter_registry'):
+        filters.get_registry()
+    with phase('search_engine'):
+        nlp_search.get_search_engine(config.DB_CONFIG)
+    with phase('query_processor'):
+        nlp_processor.get_query_processor()
+    if include_db:
+        warm_up_database()
+        warm_up_nlp_pool()
+
+    report = startup_report()
+    logger.info("startup_complete", **report)
+    return report
+
+
+def warm_up_database():
+    """Open the connection pool and prime the database-backed indexes"""
+    import care_tips
+    import catalog
+    import db
+    import suggestions
+    import text_index
+    import tips
+
+    with phase('db_pool'):
+        db.get_pool()
+    with phase('catalog_index'):
+        catalog.load_catalog()
+    catalog.start_refresher()
+    with phase('care_tips'):
+        care_tips.refresh()
+    care_tips.start_refresher()
+    with phase('suggestions'):
+        suggestions.refresh()
+    suggestions.start_refresher()
+    with phase('tips'):
+        tips.refresh()
+    tips.start_refresher()
+    if text_index.enabled():
+        with phase('text_index'):
+            text_index.get_index()
+        text_index.start_refresher()
+
+
+def warm_up_nlp_pool():
+    """Start the NLP worker processes, if enabled, so their models load before traffic"""
+    import nlp_pool
+
+    pool = nlp_pool.get_pool()
+    if pool is not None:
+        with phase('nlp_pool'):
+            pool.warm_up()
+
+
+def prepare_for_fork():
+    """Move everything allocated so far out of the collector's reach.
+
+    Without this, the first gc pass in each worker touches every object header
+    and un-shares the pages the preloaded models live in.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def startup_report() -> Dict[str, object]:
+    with _lock:
+        phases = {name: round(seconds, 4) for name, seconds in _phases.items()}
+        failed = dict(_failed)
+    return {
+        'phases': phases,
+        'failed_phases': failed,
+        'since_process_start': round(time.perf_counter() - PROCESS_STARTED, 4),
+    }
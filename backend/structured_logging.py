@@ -0,0 +1,95 @@
+"""
+Structured logging for FloraFind
+Emits one JSON object per record, with per-level sampling to keep hot paths cheap
+"""
+
+import json
+import logging
+import random
+import sys
+from datetime import datetime, timezone
+
+import config
+
+_configured = False
+
+
+class JsonFormatter(logging.Formatter):
+    """Render log records as single-line JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of DEBUG/INFO records; WARNING and above always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = max(0.0, min(rate, 1.0))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class StructuredLogger:
+    """Thin wrapper so call sites pass fields as keyword arguments"""
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(name)
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields)
+
+    def exception(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+    def _log(self, level: int, event: str, fields: dict, exc_info: bool = False):
+        # Check the level first so disabled records cost no formatting at all
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, event, extra={'fields': fields}, exc_info=exc_info)
+
+
+def configure_logging():
+    """Install the JSON handler on the florafind logger tree (idempotent)"""
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(SamplingFilter(config.LOG_SAMPLE_RATE))
+
+    root = logging.getLogger('florafind')
+    root.setLevel(getattr(logging, config.LOG_LEVEL, logging.INFO))
+    root.addHandler(handler)
+    root.propagate = False
+    _configured = True
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """Get a structured logger under the florafind namespace"""
+    configure_logging()
+    return StructuredLogger(f'florafind.{name}')
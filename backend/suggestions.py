@@ -0,0 +1,208 @@
+"""
+Zero-result suggestions for FloraFind
+When a search finds nothing, suggest the plants that users who searched with the
+same modifiers (season, difficulty, type) went on to add to their gardens.
+
+The search_suggestions job rebuilds search_plant_affinity from search_logs and
+user_plants; each worker keeps the table in memory, keyed by the canonical
+modifier combination, and reloads it periodically. Combinations without enough
+data fall back to the static lists.
+"""
+
+import bisect
+import datetime
+import itertools
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+import db
+import jobs
+import nlp_search
+import periodic
+from structured_logging import get_logger
+
+logger = get_logger('suggestions')
+
+BUILD_JOB = 'search_suggestions'
+TOP_K = 5
+MAX_COMBINATION = 3
+FETCH_BATCH = 5000
+
+DEFAULT_SUGGESTIONS = ["tulsi", "neem", "rose", "mint", "sunflower"]
+STATIC_SUGGESTIONS = {
+    "summer": ["zinnia", "portulaca", "vinca", "sunflower", "marigold"],
+    "winter": ["rose", "lavender", "mint"],
+    "beginner": ["tulsi", "mint", "aloe vera", "snake plant", "peace lily"],
+    "indoor": ["snake plant", "peace lily", "aloe vera", "tulsi"],
+    "medicinal": ["tulsi", "neem", "aloe vera", "lemon balm", "chamomile"]
+}
+
+_table: Optional[Dict[str, Tuple[str, ...]]] = None
+_table_lock = threading.Lock()
+
+
+def modifier_key(modifiers: Iterable) -> str:
+    """Canonical, order-independent key for a set of (type, value) modifiers"""
+    return '|'.join(sorted({f'{kind}={value}' for kind, value in modifiers}))
+
+
+def modifier_combinations(modifiers) -> List[str]:
+    """Keys for every combination of up to MAX_COMBINATION of the modifiers"""
+    unique = sorted({(kind, value) for kind, value in modifiers})
+    keys = []
+    for size in range(1, min(len(unique), MAX_COMBINATION) + 1):
+        keys.extend(modifier_key(combo) for combo in itertools.combinations(unique, size))
+    return keys
+
+
+@lru_cache(maxsize=4096)
+def modifiers_for_query(query: str) -> Tuple[Tuple[str, str], ...]:
+    """Modifiers of a logged query, detected as live search does (on its spaCy lemmas), so the keys match"""
+    processed = nlp_search.get_search_engine(config.DB_CONFIG).preprocess_query(query)
+    return tuple(tuple(modifier) for modifier in processed['modifiers'])
+
+
+def static_suggestions(modifiers) -> List[str]:
+    """The fixed per-modifier lists; the last modifier with a list wins"""
+    suggestions = DEFAULT_SUGGESTIONS
+    for modifier_type, modifier_value in modifiers:
+        if modifier_type in ('difficulty', 'season', 'type') and modifier_value in STATIC_SUGGESTIONS:
+            suggestions = STATIC_SUGGESTIONS[modifier_value]
+    return suggestions
+
+
+def suggest(modifiers) -> Tuple[List[str], str]:
+    """Suggested plant names for a zero-result search and where they came from ('popular' or 'static')"""
+    modifiers = [tuple(modifier) for modifier in modifiers]
+    if modifiers:
+        table = get_table()
+        names = table.get(modifier_key(modifiers))
+        if names is None:
+            # The full combination is too rare: try single modifiers, last first
+            for modifier in reversed(modifiers):
+                names = table.get(modifier_key([modifier]))
+                if names:
+                    break
+        if names:
+            # Top up short lists from the static ones so there are always a few to choose from
+            padded = list(names)
+            padded.extend(name for name in static_suggestions(modifiers) if name not in names)
+            return padded[:TOP_K], 'popular'
+    return static_suggestions(modifiers), 'static'
+
+
+def get_table() -> Dict[str, Tuple[str, ...]]:
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                try:
+                    refresh()
+                except Exception as e:
+                    logger.warning("suggestion_table_unavailable", error=str(e))
+                    _set_table({})
+    return _table
+
+
+def _set_table(table):
+    global _table
+    _table = table
+
+
+def refresh() -> int:
+    """Reload the affinity table into memory; returns the number of modifier keys"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""SELECT a.modifier_key, p.name FROM search_plant_affinity a
+                          JOIN plants p ON p.plant_id = a.plant_id
+                          ORDER BY a.modifier_key, a.position""")
+        grouped = defaultdict(list)
+        for key, name in cursor.fetchall():
+            grouped[key].append(name.lower())
+    finally:
+        cursor.close()
+        conn.close()
+    # Swap in the new table whole so readers never see a partial one
+    _set_table({key: tuple(names) for key, names in grouped.items()})
+    logger.debug("suggestion_table_loaded", keys=len(grouped))
+    return len(grouped)
+
+
+def start_refresher():
+    """Reload the table every FLORAFIND_SUGGESTION_REFRESH seconds in this process"""
+    return periodic.start_task('suggestions', config.SUGGESTION_REFRESH_SECONDS, refresh)
+
+
+def _stream(cursor):
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH)
+        if not rows:
+            return
+        yield from rows
+
+
+@jobs.register(BUILD_JOB, interval_seconds=config.SUGGESTION_REFRESH_SECONDS)
+def build_affinity(now: Optional[datetime.datetime] = None) -> Dict:
+    """Rebuild search_plant_affinity from recent searches and garden additions"""
+    now = now or datetime.datetime.now()
+    since = now - datetime.timedelta(days=config.SUGGESTION_LOOKBACK_DAYS)
+    window = datetime.timedelta(hours=config.SUGGESTION_WINDOW_HOURS)
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""SELECT user_id, plant_id, created_at FROM user_plants
+                          WHERE created_at >= %s ORDER BY user_id, created_at""", (since,))
+        added_times, added_plants = defaultdict(list), defaultdict(list)
+        for user_id, plant_id, created_at in cursor.fetchall():
+            added_times[user_id].append(created_at)
+            added_plants[user_id].append(plant_id)
+
+        # Only searches by users who have added plants since then can count
+        cursor.execute("""SELECT user_id, query, timestamp FROM search_logs
+                          WHERE timestamp >= %s AND user_id IN (
+                              SELECT user_id FROM user_plants WHERE created_at >= %s)""", (since, since))
+        users = defaultdict(set)
+        searches = 0
+        for user_id, query, searched_at in _stream(cursor):
+            searches += 1
+            times = added_times.get(user_id)
+            if not times:
+                continue
+            modifiers = modifiers_for_query(query)
+            if not modifiers:
+                continue
+            start = bisect.bisect_left(times, searched_at)
+            end = bisect.bisect_left(times, searched_at + window, lo=start)
+            if start == end:
+                continue
+            keys = modifier_combinations(modifiers)
+            for plant_id in added_plants[user_id][start:end]:
+                for key in keys:
+                    users[(key, plant_id)].add(user_id)
+
+        by_key = defaultdict(list)
+        for (key, plant_id), user_ids in users.items():
+            if len(user_ids) >= config.SUGGESTION_MIN_USERS:
+                by_key[key].append((len(user_ids), plant_id))
+        rows = []
+        for key, plants in by_key.items():
+            plants.sort(key=lambda item: (-item[0], item[1]))
+            rows.extend((key, plant_id, count, position)
+                        for position, (count, plant_id) in enumerate(plants[:TOP_K]))
+
+        cursor.execute("DELETE FROM search_plant_affinity")
+        if rows:
+            cursor.executemany("""INSERT INTO search_plant_affinity (modifier_key, plant_id, users, position)
+                                  VALUES (%s, %s, %s, %s)""", rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return {'searches': searches, 'keys': len(by_key), 'rows': len(rows)}
@@ -0,0 +1,256 @@
+"""
+BM25 text index for FloraFind
+A sparse plant x term matrix of BM25 weights over the descriptive plant text
+(name, care_instructions, eco_benefits, medicinal_properties and
+cultural_significance). The text_index_build job builds it offline and writes it
+under TEXT_INDEX_PATH as plain .npy arrays. Each worker memory-maps the arrays,
+so all workers on a host share one copy of the pages, and scores a query with
+one sparse matrix-vector product.
+
+With SEARCH_RETRIEVAL_MODE = 'bm25' the search engine (nlp_search.py) takes its
+candidates from here instead of LIKE-matching the first two keywords.
+
+    python jobs.py run text_index_build
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+import config
+import db
+import jobs
+import periodic
+from structured_logging import get_logger
+
+logger = get_logger('text_index')
+
+BUILD_JOB = 'text_index_build'
+
+# Indexed columns and how much a term occurrence in each counts towards its frequency
+FIELDS = (
+    ('name', 3.0),
+    ('care_instructions', 1.0),
+    ('eco_benefits', 1.0),
+    ('medicinal_properties', 1.0),
+    ('cultural_significance', 1.0),
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Versions kept on disk: the current one and the one workers may still have mapped
+KEEP_VERSIONS = 2
+CURRENT_FILE = 'CURRENT'
+ARRAYS = ('data', 'indices', 'indptr', 'plant_ids')
+
+TOKEN = re.compile(r'[a-z]+')
+STOPWORDS = frozenset("""
+    a about an and any are as at be by can do does for from good has have how i in is it its
+    me my need of on or some something that the their them these they this to want was what
+    when which will with you your
+""".split())
+# One suffix is stripped per word, so 'shady' and 'shade' (and 'watering' and 'water') meet
+SUFFIXES = ('ing', 'ed', 'es', 's', 'y', 'e')
+MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    if word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def analyze(text: Optional[str]) -> List[str]:
+    """Index terms of `text`: lowercased words without stopwords, stemmed"""
+    if not text:
+        return []
+    return [stem(word) for word in TOKEN.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+@dataclass
+class TextIndex:
+    version: str
+    plant_ids: np.ndarray
+    terms: Dict[str, int]
+    matrix: sparse.csr_matrix    # plants x terms, BM25 weight of each term in each plant
+
+    def query_vector(self, text: str) -> Optional[np.ndarray]:
+        """Term counts of `text` over the vocabulary; None when no term is indexed"""
+        counts = Counter(self.terms[term] for term in analyze(text) if term in self.terms)
+        if not counts:
+            return None
+        vector = np.zeros(len(self.terms), dtype=np.float32)
+        vector[list(counts)] = list(counts.values())
+        return vector
+
+    def scores(self, text: str) -> np.ndarray:
+        """BM25 score of every plant for `text`, in plant_ids order"""
+        vector = self.query_vector(text)
+        if vector is None:
+            return np.zeros(len(self.plant_ids), dtype=np.float32)
+        return self.matrix @ vector
+
+    def top(self, text: str, limit: int) -> List[Tuple[int, float]]:
+        """Up to `limit` (plant_id, score) pairs with a positive score, best first"""
+        scores = self.scores(text)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        matched = matched[np.lexsort((self.plant_ids[matched], -scores[matched]))]
+        return [(int(self.plant_ids[row]), float(scores[row])) for row in matched]
+
+
+# Building
+
+def build(rows: Iterable[Dict]) -> Tuple[np.ndarray, List[str], sparse.csr_matrix]:
+    """(plant_ids, terms, BM25 matrix) from plant rows holding plant_id and the FIELDS columns"""
+    plant_ids, documents = [], []
+    for row in rows:
+        frequencies = Counter()
+        for column, weight in FIELDS:
+            for term in analyze(row.get(column)):
+                frequencies[term] += weight
+        plant_ids.append(row['plant_id'])
+        documents.append(frequencies)
+
+    terms = sorted({term for frequencies in documents for term in frequencies})
+    term_ids = {term: index for index, term in enumerate(terms)}
+    lengths = np.array([sum(frequencies.values()) for frequencies in documents], dtype=np.float64)
+    average_length = lengths.mean() if len(lengths) and lengths.mean() > 0 else 1.0
+
+    row_ids, column_ids, frequencies = [], [], []
+    for row, document in enumerate(documents):
+        for term, frequency in document.items():
+            row_ids.append(row)
+            column_ids.append(term_ids[term])
+            frequencies.append(frequency)
+    row_ids = np.array(row_ids, dtype=np.int32)
+    column_ids = np.array(column_ids, dtype=np.int32)
+    frequencies = np.array(frequencies, dtype=np.float64)
+
+    documents_with_term = np.bincount(column_ids, minlength=len(terms))
+    idf = np.log1p((len(documents) - documents_with_term + 0.5) / (documents_with_term + 0.5))
+    norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+    weights = idf[column_ids] * frequencies * (BM25_K1 + 1) / (frequencies + norms[row_ids])
+
+    matrix = sparse.csr_matrix((weights.astype(np.float32), (row_ids, column_ids)),
+                               shape=(len(documents), len(terms)))
+    matrix.sort_indices()
+    return np.array(plant_ids, dtype=np.int64), terms, matrix
+
+
+def write(path: str, plant_ids: np.ndarray, terms: Sequence[str], matrix: sparse.csr_matrix) -> str:
+    """Write a new index version under `path`, make it current, and return its version"""
+    version = str(time.time_ns())
+    directory = os.path.join(path, version)
+    os.makedirs(directory)
+    # Index arrays keep the dtype scipy chose, so mapping them back does not copy them
+    arrays = {'data': matrix.data, 'indices': matrix.indices, 'indptr': matrix.indptr, 'plant_ids': plant_ids}
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f'{name}.npy'), array)
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump({'version': version, 'shape': list(matrix.shape), 'terms': list(terms),
+                   'k1': BM25_K1, 'b': BM25_B, 'fields': dict(FIELDS)}, f)
+
+    pointer = os.path.join(path, CURRENT_FILE)
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(version)
+    os.replace(pointer + '.tmp', pointer)
+
+    versions = sorted(name for name in os.listdir(path) if name.isdigit())
+    for stale in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(path, stale), ignore_errors=True)
+    return version
+
+
+@jobs.register(BUILD_JOB, interval_seconds=86400)
+def build_index() -> Dict:
+    """Rebuild the BM25 plant text index from the plants table"""
+    columns = ['plant_id'] + [column for column, _ in FIELDS]
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT {', '.join(columns)} FROM plants ORDER BY plant_id")
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    plant_ids, terms, matrix = build(rows)
+    version = write(config.TEXT_INDEX_PATH, plant_ids, terms, matrix)
+    return {'plants': len(plant_ids), 'terms': len(terms), 'nonzero': int(matrix.nnz), 'version': version}
+
+
+# Serving
+
+def current_version(path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load(path: str, version: str) -> TextIndex:
+    """Memory-map one written index version"""
+    directory = os.path.join(path, version)
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+    matrix = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                               shape=tuple(meta['shape']), copy=False)
+    return TextIndex(version, arrays['plant_ids'], {term: index for index, term in enumerate(meta['terms'])}, matrix)
+
+
+_index: Optional[TextIndex] = None
+_first_load_tried = False
+_lock = threading.Lock()
+
+
+def refresh() -> Optional[TextIndex]:
+    """Map the current index version if it is not the one already loaded"""
+    global _index
+    version = current_version(config.TEXT_INDEX_PATH)
+    if version is None:
+        if _index is None:
+            logger.warning("text_index_missing", path=config.TEXT_INDEX_PATH, hint=f"python jobs.py run {BUILD_JOB}")
+        return _index
+    if _index is not None and _index.version == version:
+        return _index
+    index = load(config.TEXT_INDEX_PATH, version)
+    with _lock:
+        _index = index
+    logger.info("text_index_loaded", version=version, plants=len(index.plant_ids), terms=len(index.terms))
+    return index
+
+
+def get_index() -> Optional[TextIndex]:
+    """The loaded index, mapped on first use; None when none has been built (never blocks on a rebuild)"""
+    global _first_load_tried
+    if _index is None and not _first_load_tried:
+        _first_load_tried = True
+        try:
+            refresh()
+        except Exception as e:
+            logger.exception("text_index_load_failed", error=str(e))
+    return _index
+
+
+def enabled() -> bool:
+    return config.SEARCH_RETRIEVAL_MODE == 'bm25'
+
+
+def start_refresher():
+    """Pick up rebuilt index versions every FLORAFIND_TEXT_INDEX_REFRESH seconds in this process"""
+    return periodic.start_task('text_index', config.TEXT_INDEX_REFRESH_SECONDS, refresh)
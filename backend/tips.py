@@ -0,0 +1,327 @@
+"""
+Community tips for FloraFind
+Submissions are checked against every open tip for the same plant with MinHash
+signatures over character shingles and an LSH band index, so spotting a near-duplicate
+costs a few dictionary lookups however many tips exist. Votes are counted in
+memory and written by a background flush every TIP_VOTE_FLUSH_SECONDS as one
+batch of increments, so a popular tip's row is locked once per flush rather
+than once per vote. Approved tips are served per plant from an in-memory
+index that each worker reloads every TIP_REFRESH_SECONDS.
+"""
+
+import atexit
+import threading
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+import config
+import db
+import metrics
+import periodic
+from structured_logging import get_logger
+
+logger = get_logger('tips')
+
+SHINGLE_SIZE = 5               # characters per shingle: robust to one-word edits in short tips
+MERSENNE_PRIME = (1 << 31) - 1  # keeps a * hash + b inside int64
+MINHASH_SEED = 20240601         # fixed, so every worker computes the same signatures
+
+TIP_DUPLICATES = metrics.Counter('florafind_tip_duplicates_total', 'Tip submissions refused as near-duplicates')
+TIP_VOTES_FLUSHED = metrics.Counter('florafind_tip_votes_flushed_total', 'Buffered tip votes written to the database')
+
+OPEN_TIPS = """
+    SELECT submission_id, user_id, plant_name, care_tip, location, status, votes_up, votes_down, submission_date
+    FROM plant_submissions WHERE status <> 'rejected'
+"""
+INSERT_TIP = """INSERT INTO plant_submissions (user_id, plant_name, care_tip, location)
+                VALUES (%s, %s, %s, %s)"""
+FLUSH_VOTES = """UPDATE plant_submissions SET votes_up = votes_up + %s, votes_down = votes_down + %s
+                 WHERE submission_id = %s"""
+
+
+def plant_key(plant_name: Optional[str]) -> str:
+    return ' '.join((plant_name or '').lower().split())
+
+
+def shingles(text: Optional[str]) -> Set[str]:
+    """Overlapping SHINGLE_SIZE-character sequences of the normalised text (the whole text if shorter)"""
+    normalised = ' '.join(''.join(ch if ch.isalnum() else ' ' for ch in (text or '').lower()).split())
+    if len(normalised) <= SHINGLE_SIZE:
+        return {normalised} if normalised else set()
+    return {normalised[i:i + SHINGLE_SIZE] for i in range(len(normalised) - SHINGLE_SIZE + 1)}
+
+
+class MinHasher:
+    """MinHash signatures: for each of `permutations` hash functions, the smallest shingle hash"""
+
+    def __init__(self, permutations: int, seed: int = MINHASH_SEED):
+        rng = np.random.default_rng(seed)
+        self.permutations = permutations
+        self._a = rng.integers(1, MERSENNE_PRIME, permutations, dtype=np.int64)[:, None]
+        self._b = rng.integers(0, MERSENNE_PRIME, permutations, dtype=np.int64)[:, None]
+
+    def signature(self, text: Optional[str]) -> np.ndarray:
+        hashes = np.array([zlib.crc32(shingle.encode('utf-8')) % MERSENNE_PRIME for shingle in shingles(text)],
+                          dtype=np.int64)
+        if not len(hashes):
+            return np.full(self.permutations, MERSENNE_PRIME, dtype=np.int64)
+        return ((self._a * hashes[None, :] + self._b) % MERSENNE_PRIME).min(axis=1)
+
+
+def estimated_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return float(np.mean(first == second))
+
+
+class LSHIndex:
+    """Signatures split into `bands` bands; tips sharing any band for the same plant are candidates"""
+
+    def __init__(self, bands: int):
+        self.bands = bands
+        self._buckets: Dict[tuple, Set[int]] = defaultdict(set)
+        self._signatures: Dict[int, Tuple[str, np.ndarray]] = {}
+
+    def _keys(self, scope: str, signature: np.ndarray):
+        for band, rows in enumerate(np.array_split(signature, self.bands)):
+            yield scope, band, rows.tobytes()
+
+    def add(self, tip_id: int, scope: str, signature: np.ndarray):
+        self._signatures[tip_id] = (scope, signature)
+        for key in self._keys(scope, signature):
+            self._buckets[key].add(tip_id)
+
+    def signature(self, tip_id: int) -> Optional[np.ndarray]:
+        entry = self._signatures.get(tip_id)
+        return entry[1] if entry else None
+
+    def nearest(self, scope: str, signature: np.ndarray, threshold: float) -> Optional[Tuple[int, float]]:
+        """(tip_id, similarity) of the most similar indexed tip at or above `threshold`, if any"""
+        candidates = set()
+        for key in self._keys(scope, signature):
+            candidates.update(self._buckets.get(key, ()))
+        best = None
+        for tip_id in candidates:
+            similarity = estimated_similarity(signature, self._signatures[tip_id][1])
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (tip_id, similarity)
+        return best
+
+
+@dataclass
+class Tip:
+    submission_id: int
+    user_id: int
+    plant_name: str
+    care_tip: str
+    location: str
+    votes_up: int
+    votes_down: int
+    submitted: str
+
+    def to_dict(self, pending: Tuple[int, int] = (0, 0)) -> Dict:
+        return {
+            "submission_id": self.submission_id,
+            "user_id": self.user_id,
+            "plant_name": self.plant_name,
+            "care_tip": self.care_tip,
+            "location": self.location,
+            "votes_up": self.votes_up + pending[0],
+            "votes_down": self.votes_down + pending[1],
+            "submitted": self.submitted,
+        }
+
+
+class VoteBuffer:
+    """Vote increments per tip, waiting for the next flush"""
+
+    def __init__(self):
+        self._pending: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, submission_id: int, up: int, down: int) -> int:
+        with self._lock:
+            counts = self._pending.setdefault(submission_id, [0, 0])
+            counts[0] += up
+            counts[1] += down
+            return len(self._pending)
+
+    def pending(self, submission_id: int) -> Tuple[int, int]:
+        with self._lock:
+            counts = self._pending.get(submission_id)
+            return (counts[0], counts[1]) if counts else (0, 0)
+
+    def drain(self) -> Dict[int, List[int]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, drained: Dict[int, List[int]]):
+        """Put back increments a failed flush did not write"""
+        for submission_id, (up, down) in drained.items():
+            self.add(submission_id, up, down)
+
+
+class TipStore:
+    """The duplicate index over open tips and the approved tips by plant, swapped whole on refresh"""
+
+    def __init__(self, hasher: MinHasher, index: LSHIndex, approved: Dict[str, List[Tip]]):
+        self.hasher = hasher
+        self.index = index
+        self.approved = approved
+        self.approved_by_id = {tip.submission_id: tip for tips in approved.values() for tip in tips}
+
+
+_hasher = MinHasher(config.TIP_MINHASH_PERMUTATIONS)
+_votes = VoteBuffer()
+_store: Optional[TipStore] = None
+_store_lock = threading.Lock()
+
+
+def refresh() -> int:
+    """Reload open tips into a new duplicate index and approved feed; returns the open tips indexed"""
+    global _store
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(OPEN_TIPS)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    previous = _store
+    index = LSHIndex(config.TIP_LSH_BANDS)
+    approved: Dict[str, List[Tip]] = defaultdict(list)
+    for row in rows:
+        key = plant_key(row['plant_name'])
+        # Signatures never change, so reuse the ones already computed
+        signature = previous.index.signature(row['submission_id']) if previous else None
+        index.add(row['submission_id'], key, signature if signature is not None else _hasher.signature(row['care_tip']))
+        if row['status'] == 'approved':
+            approved[key].append(Tip(row['submission_id'], row['user_id'], row['plant_name'], row['care_tip'],
+                                     row['location'] or '', row['votes_up'] or 0, row['votes_down'] or 0,
+                                     str(row['submission_date'])))
+    with _store_lock:
+        _store = TipStore(_hasher, index, dict(approved))
+    logger.debug("tips_loaded", open=len(rows), plants=len(approved))
+    return len(rows)
+
+
+def get_store() -> TipStore:
+    if _store is None:
+        refresh()
+    return _store
+
+
+# Submissions
+
+def find_duplicate(plant_name: str, care_tip: str) -> Optional[Tuple[int, float]]:
+    """(submission_id, similarity) of an open tip for the same plant that says nearly the same thing"""
+    store = get_store()
+    return store.index.nearest(plant_key(plant_name), store.hasher.signature(care_tip), config.TIP_DUPLICATE_THRESHOLD)
+
+
+def submit(user_id: int, plant_name: str, care_tip: str, location: str = '') -> Tuple[Optional[int], Optional[Tuple[int, float]]]:
+    """Store a tip unless it near-duplicates an open one; returns (submission_id, duplicate)"""
+    store = get_store()
+    key, signature = plant_key(plant_name), store.hasher.signature(care_tip)
+    duplicate = store.index.nearest(key, signature, config.TIP_DUPLICATE_THRESHOLD)
+    if duplicate is not None:
+        TIP_DUPLICATES.inc()
+        logger.info("tip_duplicate", user_id=user_id, duplicate_of=duplicate[0], similarity=round(duplicate[1], 3))
+        return None, duplicate
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(INSERT_TIP, (user_id, plant_name, care_tip, location))
+        submission_id = cursor.lastrowid
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    # Visible to this worker's duplicate checks now, to the others after their next refresh
+    with _store_lock:
+        _store.index.add(submission_id, key, signature)
+    return submission_id, None
+
+
+# Votes
+
+def record_vote(submission_id: int, up: bool) -> Optional[Dict]:
+    """Buffer a vote on an approved tip; returns its tallies including unflushed votes (None if unknown)"""
+    tip = get_store().approved_by_id.get(submission_id)
+    if tip is None:
+        return None
+    periodic.start_task('tip_votes', config.TIP_VOTE_FLUSH_SECONDS, flush_votes)
+    waiting = _votes.add(submission_id, 1 if up else 0, 0 if up else 1)
+    if waiting >= config.TIP_VOTE_BUFFER_MAX:
+        try:
+            flush_votes()
+        except Exception as e:
+            logger.warning("tip_votes_flush_failed", error=str(e))  # kept in the buffer for the next flush
+    return tip.to_dict(_votes.pending(submission_id))
+
+
+def flush_votes() -> int:
+    """Write buffered votes as one batch of increments; returns the tips updated"""
+    drained = _votes.drain()
+    if not drained:
+        return 0
+    # Ascending ids, so concurrent flushes from other workers lock rows in the same order
+    updates = [(up, down, submission_id) for submission_id, (up, down) in sorted(drained.items())]
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(FLUSH_VOTES, updates)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        _votes.restore(drained)
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    # Keep the feed's tallies current until the next reload
+    store = _store
+    for up, down, submission_id in updates:
+        tip = store.approved_by_id.get(submission_id) if store else None
+        if tip is not None:
+            tip.votes_up += up
+            tip.votes_down += down
+        TIP_VOTES_FLUSHED.inc(up + down)
+    logger.debug("tip_votes_flushed", tips=len(updates))
+    return len(updates)
+
+
+def _flush_at_exit():
+    try:
+        flush_votes()
+    except Exception as e:
+        logger.warning("tip_votes_lost", error=str(e))
+
+
+atexit.register(_flush_at_exit)
+
+
+# Feed
+
+def approved_tips(plant_name: str, limit: int) -> List[Dict]:
+    """A plant's approved tips, best voted first"""
+    tips = [tip.to_dict(_votes.pending(tip.submission_id)) for tip in get_store().approved.get(plant_key(plant_name), ())]
+    tips.sort(key=lambda tip: (tip['votes_up'] - tip['votes_down'], tip['submission_id']), reverse=True)
+    return tips[:limit]
+
+
+def start_refresher():
+    """Reload tips every TIP_REFRESH_SECONDS and flush votes every TIP_VOTE_FLUSH_SECONDS in this process"""
+    periodic.start_task('tip_votes', config.TIP_VOTE_FLUSH_SECONDS, flush_votes)
+    return periodic.start_task('tips', config.TIP_REFRESH_SECONDS, refresh)
@@ -0,0 +1,303 @@
+"""
+User stats read model for FloraFind
+Points, level, badge count, plant count and care streak for the header widget,
+held in a per-worker write-through cache. The endpoints that change them
+(complete_care_task, add_to_garden, garden import) call update() inside their
+own transaction and publish() the result after commit, so /user_stats is a
+memory lookup. On a miss it reads one row of the denormalized user_stats table,
+which update() builds from the base tables the first time a user's stats change;
+until then (or with USER_STATS_TABLE off) a read computes them from the base
+tables without writing.
+
+Other workers' caches catch up within USER_STATS_CACHE_TTL seconds.
+"""
+
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import config
+import db
+import metrics
+from structured_logging import get_logger
+
+logger = get_logger('user_stats')
+
+# Activity days read back when rebuilding a streak; longer streaks are capped at this
+STREAK_LOOKBACK_DAYS = 366
+
+STATS_COLUMNS = ('user_id', 'points', 'level', 'badges', 'plants', 'streak', 'last_activity', 'version')
+BASE_STATS = """
+    SELECT u.user_id, u.plant_health_points AS points, u.level,
+           (SELECT COUNT(*) FROM user_badges ub WHERE ub.user_id = u.user_id) AS badges,
+           (SELECT COUNT(*) FROM user_plants up WHERE up.user_id = u.user_id) AS plants
+    FROM users u WHERE u.user_id = %s
+"""
+# From the daily rollup (activity.py), which outlives compacted care_activities rows
+ACTIVITY_DAYS = """
+    SELECT DISTINCT activity_date AS completed_date
+    FROM user_activity_daily
+    WHERE user_id = %s
+    ORDER BY activity_date DESC
+    LIMIT %s
+"""
+STATS_ROW = """
+    SELECT user_id, points, level, badge_count AS badges, plant_count AS plants,
+           streak_days AS streak, last_activity_date AS last_activity, version
+    FROM user_stats WHERE user_id = %s
+"""
+INSERT_STATS_ROW = """
+    INSERT IGNORE INTO user_stats
+        (user_id, points, level, badge_count, plant_count, streak_days, last_activity_date, version)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, 1)
+"""
+# Each column is re-read from its base table in the writer's transaction, so the
+# row cannot drift from users/user_plants/user_badges however the writes interleave
+SYNC_POINTS = ("points = (SELECT plant_health_points FROM users WHERE user_id = %s), "
+               "level = (SELECT level FROM users WHERE user_id = %s)")
+SYNC_PLANTS = "plant_count = (SELECT COUNT(*) FROM user_plants WHERE user_id = %s)"
+SYNC_BADGES = "badge_count = (SELECT COUNT(*) FROM user_badges WHERE user_id = %s)"
+# streak_days is assigned before last_activity_date: MySQL applies SET clauses left to right
+RECORD_ACTIVITY = """streak_days = CASE WHEN last_activity_date >= %s THEN streak_days
+                                        WHEN last_activity_date = %s THEN streak_days + 1
+                                        ELSE 1 END,
+                     last_activity_date = CASE WHEN last_activity_date >= %s THEN last_activity_date ELSE %s END"""
+
+
+@dataclass
+class UserStats:
+    user_id: int
+    points: int = 0
+    level: int = 1
+    badges: int = 0
+    plants: int = 0
+    streak: int = 0        # consecutive days with a care task, ending at last_activity
+    last_activity: Optional[datetime.date] = None
+    version: int = 0       # user_stats.version; a publish never replaces a newer entry
+
+    def current_streak(self, today: Optional[datetime.date] = None) -> int:
+        """The streak as of `today`: it survives until a full day passes without care"""
+        today = today or datetime.date.today()
+        if self.last_activity is None or (today - self.last_activity).days > 1:
+            return 0
+        return self.streak
+
+    def to_dict(self) -> Dict:
+        return {
+            "points": self.points,
+            "level": self.level,
+            "badges": self.badges,
+            "plants": self.plants,
+            "streak": self.current_streak(),
+        }
+
+
+def default_stats(user_id: int) -> UserStats:
+    """What /user_stats reports for a user with no row"""
+    return UserStats(user_id)
+
+
+def _as_date(value) -> Optional[datetime.date]:
+    if value is None or isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def _from_row(row) -> UserStats:
+    row = row if isinstance(row, dict) else dict(zip(STATS_COLUMNS, row))
+    return UserStats(
+        user_id=row['user_id'],
+        points=int(row['points'] or 0),
+        level=int(row['level'] or 1),
+        badges=int(row['badges'] or 0),
+        plants=int(row['plants'] or 0),
+        streak=int(row.get('streak') or 0),
+        last_activity=_as_date(row.get('last_activity')),
+        version=int(row.get('version') or 0),
+    )
+
+
+def streak_from_days(days: Sequence) -> tuple:
+    """(streak, last_activity) from distinct activity days, newest first"""
+    days = [_as_date(day) for day in days]
+    if not days:
+        return 0, None
+    streak = 1
+    for newer, older in zip(days, days[1:]):
+        if (newer - older).days != 1:
+            break
+        streak += 1
+    return streak, days[0]
+
+
+class StatsCache:
+    """UserStats by user_id, the `max_entries` most recently used, each for up to `ttl` seconds"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserStats]:
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is None:
+                return None
+            stats, stored_at = cached
+            if time.monotonic() - stored_at >= self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return stats
+
+    def put(self, stats: UserStats):
+        with self._lock:
+            cached = self._entries.get(stats.user_id)
+            if cached is not None and cached[0].version > stats.version:
+                return  # a writer published newer stats while this one was being read
+            self._entries[stats.user_id] = (stats, time.monotonic())
+            self._entries.move_to_end(stats.user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+_cache = StatsCache(config.USER_STATS_CACHE_SIZE, config.USER_STATS_CACHE_TTL)
+
+
+# Database
+
+def load_from_base(cursor, user_id: int) -> Optional[UserStats]:
+    """Stats from users, user_badges, user_plants and the daily activity rollup; None for an unknown user"""
+    cursor.execute(BASE_STATS, (user_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    stats = _from_row(row)
+    cursor.execute(ACTIVITY_DAYS, (user_id, STREAK_LOOKBACK_DAYS))
+    stats.streak, stats.last_activity = streak_from_days(
+        [day['completed_date'] if isinstance(day, dict) else day[0] for day in cursor.fetchall()])
+    return stats
+
+
+def _insert_row(cursor, stats: UserStats):
+    cursor.execute(INSERT_STATS_ROW, (stats.user_id, stats.points, stats.level, stats.badges,
+                                      stats.plants, stats.streak, stats.last_activity))
+
+
+def load(cursor, user_id: int) -> Optional[UserStats]:
+    """The user's stats row, building it from the base tables if there is none (the caller commits)"""
+    if not config.USER_STATS_TABLE:
+        return load_from_base(cursor, user_id)
+    cursor.execute(STATS_ROW, (user_id,))
+    row = cursor.fetchone()
+    if row is not None:
+        return _from_row(row)
+    stats = load_from_base(cursor, user_id)
+    if stats is not None:
+        _insert_row(cursor, stats)
+        stats.version = 1
+    return stats
+
+
+def read(cursor, user_id: int) -> Optional[UserStats]:
+    """The user's stats row, else the same figures computed from the base tables; never writes"""
+    if config.USER_STATS_TABLE:
+        cursor.execute(STATS_ROW, (user_id,))
+        row = cursor.fetchone()
+        if row is not None:
+            return _from_row(row)
+    return load_from_base(cursor, user_id)
+
+
+def update(cursor, user_id: int, points: bool = False, plants: bool = False, badges: bool = False,
+           activity_day: Optional[datetime.date] = None) -> Optional[UserStats]:
+    """Bring the user's stats up to date with the writes already made on `cursor`'s transaction.
+
+    Call before commit with the columns the caller changed (and the day of
+    any completed care task), then publish() the result after commit.
+    """
+    if not config.USER_STATS_TABLE:
+        return load_from_base(cursor, user_id)
+    assignments, params = [], []
+    if points:
+        assignments.append(SYNC_POINTS)
+        params.extend([user_id, user_id])
+    if plants:
+        assignments.append(SYNC_PLANTS)
+        params.append(user_id)
+    if badges:
+        assignments.append(SYNC_BADGES)
+        params.append(user_id)
+    if activity_day is not None:
+        assignments.append(RECORD_ACTIVITY)
+        params.extend([activity_day, activity_day - datetime.timedelta(days=1), activity_day, activity_day])
+    assignments.append("version = version + 1")
+    cursor.execute(f"UPDATE user_stats SET {', '.join(assignments)} WHERE user_id = %s", params + [user_id])
+    if cursor.rowcount:
+        cursor.execute(STATS_ROW, (user_id,))
+        return _from_row(cursor.fetchone())
+    # No row yet: build it from the base tables, which already include this transaction's writes
+    return load(cursor, user_id)
+
+
+# Cache
+
+def publish(user_id: int, stats: Optional[UserStats]):
+    """After commit: make `stats` (from update()) what this worker serves"""
+    if stats is None:
+        _cache.invalidate(user_id)
+    else:
+        _cache.put(stats)
+
+
+def get(user_id: int) -> UserStats:
+    """The user's stats from this worker's cache, else from the database (never writes; update() creates the row)"""
+    stats = _cache.get(user_id)
+    metrics.record_cache('user_stats', stats is not None)
+    if stats is not None:
+        return stats
+
+    conn = db.get_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        stats = read(cursor, user_id)
+    finally:
+        cursor.close()
+        conn.close()
+    if stats is None:
+        return default_stats(user_id)
+    _cache.put(stats)
+    return stats
+
+
+async def get_async(user_id: int) -> UserStats:
+    """get() for the event loop, through the aiomysql pool"""
+    import async_db
+
+    stats = _cache.get(user_id)
+    metrics.record_cache('user_stats', stats is not None)
+    if stats is not None:
+        return stats
+
+    row = await async_db.fetchone(STATS_ROW, (user_id,)) if config.USER_STATS_TABLE else None
+    if row is not None:
+        stats = _from_row(row)
+    else:
+        row = await async_db.fetchone(BASE_STATS, (user_id,))
+        if row is None:
+            return default_stats(user_id)
+        stats = _from_row(row)
+        days = await async_db.fetchall(ACTIVITY_DAYS, (user_id, STREAK_LOOKBACK_DAYS))
+        stats.streak, stats.last_activity = streak_from_days([day['completed_date'] for day in days])
+    _cache.put(stats)
+    return stats